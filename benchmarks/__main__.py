@@ -0,0 +1,71 @@
+"""Run the benchmarks: python -m benchmarks [micro|load|all] [options]
+
+Each run builds the app on a fresh SQLite database with the same seeded
+fixtures, prints a table and, with --out, saves the results as JSON.
+--compare prints the changes against a saved run and exits 1 if any
+benchmark regressed by more than --threshold. The run also exits 1 if
+a load scenario got unexpected statuses; its numbers are marked invalid.
+"""
+import argparse
+import os
+import sys
+
+from benchmarks import load, micro
+from benchmarks.common import (
+    compare, environment, invalid_results, make_app, print_table, save_results, seed, workdir
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Linkak benchmarks')
+    parser.add_argument('suite', nargs='?', choices=('micro', 'load', 'all'), default='all')
+    parser.add_argument('--out', help='Save the results to this JSON file')
+    parser.add_argument('--compare', metavar='BASELINE', help='Compare with a saved results file')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Regression threshold as a fraction (default 0.10)')
+    parser.add_argument('--only', action='append', help='Only run benchmarks/scenarios with this name (repeatable)')
+    parser.add_argument('--repeat', type=int, default=50, help='Timed batches per micro-benchmark')
+    parser.add_argument('--requests', type=int, default=500, help='Requests per load scenario')
+    parser.add_argument('--concurrency', type=int, default=4, help='Threads sending requests')
+    parser.add_argument('--driver', action='append', choices=sorted(load.DRIVERS), help='Load driver (default: all)')
+    args = parser.parse_args(argv)
+
+    # Paths given relative to where the command was run, before the app chdirs
+    out = os.path.abspath(args.out) if args.out else None
+    baseline = os.path.abspath(args.compare) if args.compare else None
+
+    results = {
+        'environment': environment(),
+        'parameters': {
+            'repeat': args.repeat,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+        },
+    }
+    with workdir() as directory:
+        app = make_app(directory)
+        fixtures = seed(app)
+
+        if args.suite in ('micro', 'all'):
+            results['micro'] = micro.run(app, fixtures, repeat=args.repeat, only=args.only)
+            print_table('Micro-benchmarks (per call)', results['micro'])
+        if args.suite in ('load', 'all'):
+            results['load'] = load.run(
+                app, fixtures, drivers=args.driver or sorted(load.DRIVERS),
+                requests=args.requests, concurrency=args.concurrency, only=args.only
+            )
+            print_table(f"Load (concurrency {args.concurrency}, per request)", results['load'])
+        os.chdir(os.path.dirname(directory))
+
+    if out:
+        save_results(out, results)
+        print(f"\nSaved results to {out}")
+    invalid = invalid_results(results)
+    if invalid:
+        print(f"\nInvalid (unexpected statuses): {', '.join(invalid)}")
+    if baseline and compare(baseline, results, threshold=args.threshold):
+        return 1
+    return 1 if invalid else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""Shared fixtures, statistics and result files for the benchmarks"""
+from datetime import datetime
+import json
+import logging
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import TestingConfig
+
+SEED = 1234
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0 Safari/537.36',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 13_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.6 Safari/605.1.15',
+    'Mozilla/5.0 (X11; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/118.0',
+    'Mozilla/5.0 (Linux; Android 13; Pixel 7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (iPad; CPU OS 16_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.6 Mobile/15E148 Safari/604.1',
+    'curl/8.1.2',
+]
+
+
+class BenchmarkConfig(TestingConfig):
+    TESTING = False  # Errors become 500 responses, as in production
+    METRICS_ENABLED = False
+    SQL_PROFILER = False
+
+
+def make_app(workdir):
+    """App on a fresh SQLite file in workdir (which becomes the working directory)
+
+    Views that write files relative to the working directory (QR codes)
+    then write into workdir.
+    """
+    from src.main import create_app
+
+    os.chdir(workdir)
+    uri = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    class Config(BenchmarkConfig):
+        SQLALCHEMY_DATABASE_URI = uri
+        SQLITE_JOURNAL_MODE = 'WAL'
+
+    app = create_app(Config)
+    # Failed requests are counted per scenario rather than logged one by one
+    app.logger.setLevel(logging.CRITICAL)
+    return app
+
+
+def seed(app, urls=200, links=20, categories=6, items=8, clicks=500):
+    """Deterministic fixture data, returns the ids and credentials the scenarios need"""
+    from src.extensions import db
+    from src.models.user import User, Link
+    from src.models.shorturl import ShortURL, URLAnalytics
+    from src.models.menu import Menu, MenuCategory, MenuItem
+    from src.services.ordering import even_keys
+    from src.services.tokens import issue_token
+
+    rng = random.Random(SEED)
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', password='benchmark-password', full_name='Bench User')
+        db.session.add(user)
+        db.session.commit()
+
+        for i, key in enumerate(even_keys(links)):
+            link = Link(title=f"Link {i}", url=f"https://example.com/{i}", user_id=user.id,
+                        category=rng.choice(['Social', 'Work', 'Personal']), is_featured=i < 3, display_order=i)
+            link.sort_key = key
+            db.session.add(link)
+        short_urls = [
+            ShortURL(f"https://example.com/articles/{i}?ref=bench", user_id=user.id, custom_alias=f"b{i:05d}")
+            for i in range(urls)
+        ]
+        db.session.add_all(short_urls)
+
+        menu = Menu('Bench menu', user.id, 'Bench Bistro', custom_url='bench-bistro')
+        menu.is_published = True
+        db.session.add(menu)
+        db.session.flush()
+        for c in range(categories):
+            category = MenuCategory(f"Category {c}", menu.id, display_order=c)
+            db.session.add(category)
+            db.session.flush()
+            db.session.add_all([
+                MenuItem(f"Item {c}.{i}", category.id, description='House special', price=round(rng.uniform(3, 30), 2), display_order=i)
+                for i in range(items)
+            ])
+
+        _, token = issue_token(user.id, 'benchmark')
+        db.session.commit()
+
+        db.session.add_all([
+            URLAnalytics(short_urls[0].id, referrer='https://news.example.com', user_agent=rng.choice(USER_AGENTS), ip_address='203.0.113.7')
+            for _ in range(clicks)
+        ])
+        db.session.commit()
+
+        return {
+            'username': user.username,
+            'token': token,
+            'short_codes': [short_url.short_code for short_url in short_urls],
+            'url_id': short_urls[0].id,
+            'menu_id': menu.id,
+        }
+
+
+def workdir():
+    """Temporary directory for one benchmark run"""
+    return tempfile.TemporaryDirectory(prefix='linkak-bench-')
+
+
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return None
+    index = min(len(sorted_samples) - 1, max(0, math.ceil(fraction * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+def summarize(samples, elapsed, errors=0, statuses=None):
+    """Throughput and latency percentiles (milliseconds) for per-operation durations in seconds"""
+    ordered = sorted(samples)
+    result = {
+        'count': len(ordered),
+        'errors': errors,
+        'throughput': len(ordered) / elapsed if elapsed else None,
+        'mean_ms': sum(ordered) / len(ordered) * 1000 if ordered else None,
+        'p50_ms': _ms(percentile(ordered, 0.50)),
+        'p95_ms': _ms(percentile(ordered, 0.95)),
+        'p99_ms': _ms(percentile(ordered, 0.99)),
+        'max_ms': _ms(ordered[-1] if ordered else None),
+    }
+    if statuses is not None:
+        result['statuses'] = {str(status): count for status, count in sorted(statuses.items())}
+    return result
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 4) if seconds is not None else None
+
+
+def environment():
+    """What the numbers were measured on, stored with the results"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'commit': commit,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'seed': SEED,
+    }
+
+
+def print_table(title, results):
+    """Human-readable summary of {name: summary}"""
+    print(f"\n{title}")
+    print(f"{'name':<34}{'ops/s':>11}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, result in results.items():
+        print(f"{name:<34}{_fmt(result['throughput'], 1):>11}{_fmt(result['p50_ms'], 3):>10}"
+              f"{_fmt(result['p95_ms'], 3):>10}{_fmt(result['p99_ms'], 3):>10}{result['errors']:>8}")
+        if result.get('statuses') and result['errors']:
+            print(f"{'':<34}INVALID, unexpected statuses: {result['statuses']}")
+
+
+def _fmt(value, digits):
+    return '-' if value is None else f"{value:.{digits}f}"
+
+
+def save_results(path, results):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def compare(baseline_path, results, threshold=0.10):
+    """Print p95 and throughput changes against a saved run, returns the regressed names
+
+    A benchmark regresses when its p95 rose or its throughput fell by more
+    than threshold (a fraction). Invalid load scenarios (unexpected
+    statuses) in either run are not compared.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    regressed = []
+    print(f"\nCompared with {baseline_path} ({baseline.get('environment', {}).get('commit')})")
+    for suite in ('micro', 'load'):
+        for name, new in results.get(suite, {}).items():
+            old = baseline.get(suite, {}).get(name)
+            if not old:
+                continue
+            if old.get('valid') is False or new.get('valid') is False:
+                print(f"{suite + '.' + name:<40}not compared, invalid run")
+                continue
+            p95 = _change(old['p95_ms'], new['p95_ms'])
+            throughput = _change(old['throughput'], new['throughput'])
+            flag = ''
+            if (p95 is not None and p95 > threshold) or (throughput is not None and throughput < -threshold):
+                regressed.append(f"{suite}.{name}")
+                flag = '  REGRESSED'
+            print(f"{suite + '.' + name:<40}p95 {_pct(p95):>8}  ops/s {_pct(throughput):>8}{flag}")
+    return regressed
+
+
+def invalid_results(results):
+    """Names of load scenarios that got unexpected statuses"""
+    return [f"load.{name}" for name, result in results.get('load', {}).items() if result.get('valid') is False]
+
+
+def _change(old, new):
+    if not old or new is None:
+        return None
+    return (new - old) / old
+
+
+def _pct(change):
+    return '-' if change is None else f"{change * 100:+.1f}%"
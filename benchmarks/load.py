@@ -0,0 +1,148 @@
+"""In-process load harness for the hot endpoints
+
+Two drivers send the same scenarios:
+
+  client  Flask test client (WSGI call, no sockets) from worker threads
+  http    real HTTP requests from worker threads to a local threaded
+          werkzeug server running the app
+"""
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import make_server
+import http.client
+import itertools
+import json
+import logging
+import threading
+import time
+
+from benchmarks.common import USER_AGENTS, summarize
+
+
+def scenarios(fixtures):
+    """name -> (method, path for request i, JSON body for request i or None, authenticated, expected statuses)"""
+    codes = fixtures['short_codes']
+    return {
+        'redirect': ('GET', lambda i: f"/{codes[i % len(codes)]}", None, False, (302,)),
+        'profile': ('GET', lambda i: f"/{fixtures['username']}", None, False, (200,)),
+        'menu': ('GET', lambda i: f"/menu/{fixtures['menu_id']}", None, False, (200,)),
+        'shorten': ('POST', lambda i: '/api/shorten', lambda i: {'url': f"https://example.com/new/{i}"}, True, (201,)),
+        'url_details': ('GET', lambda i: f"/api/urls/{fixtures['url_id']}", None, True, (200,)),
+    }
+
+
+class ClientDriver:
+    """Requests through the Flask test client, one client per thread"""
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def request(self, method, path, body, headers):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body, headers=headers)
+        response.close()
+        return response.status_code
+
+
+class HTTPDriver:
+    """Requests over TCP to the app served by a threaded werkzeug server on a free port"""
+
+    def __init__(self, app):
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)  # No access log per request
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        return False
+
+    def request(self, method, path, body, headers):
+        connection = http.client.HTTPConnection('127.0.0.1', self.server.port, timeout=30)
+        try:
+            if body is not None:
+                headers = dict(headers, **{'Content-Type': 'application/json'})
+                body = json.dumps(body)
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        finally:
+            connection.close()
+
+
+DRIVERS = {'client': ClientDriver, 'http': HTTPDriver}
+
+
+def run_scenario(driver, fixtures, scenario, requests=500, concurrency=4, warmup=20):
+    """Send requests (after warmup unmeasured ones) from concurrency threads, returns a summary"""
+    method, path, body, authenticated, expected = scenario
+    agents = itertools.cycle(USER_AGENTS)
+    counter = itertools.count()  # next() is atomic under the GIL
+    lock = threading.Lock()
+    samples = []
+    statuses = Counter()
+
+    def send(i):
+        headers = {'User-Agent': next(agents)}
+        if authenticated:
+            headers['Authorization'] = f"Bearer {fixtures['token']}"
+        started = time.perf_counter()
+        status = driver.request(method, path(i), body(i) if body else None, headers)
+        return time.perf_counter() - started, status
+
+    for _ in range(warmup):
+        send(next(counter))
+
+    def worker(count):
+        local_samples = []
+        local_statuses = Counter()
+        for _ in range(count):
+            elapsed, status = send(next(counter))
+            local_samples.append(elapsed)
+            local_statuses[status] += 1
+        with lock:
+            samples.extend(local_samples)
+            statuses.update(local_statuses)
+
+    shares = [requests // concurrency + (1 if n < requests % concurrency else 0) for n in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker, share) for share in shares]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    errors = sum(count for status, count in statuses.items() if status not in expected)
+    result = summarize(samples, elapsed, errors=errors, statuses=statuses)
+    result['concurrency'] = concurrency
+    # Timings of error responses don't measure the endpoint
+    result['valid'] = not errors
+    return result
+
+
+def run(app, fixtures, drivers=('client', 'http'), requests=500, concurrency=4, only=None):
+    """Every scenario under every driver, keyed '<driver>.<scenario>'"""
+    results = {}
+    for driver_name in drivers:
+        with DRIVERS[driver_name](app) as driver:
+            for name, scenario in scenarios(fixtures).items():
+                if only and name not in only:
+                    continue
+                results[f"{driver_name}.{name}"] = run_scenario(
+                    driver, fixtures, scenario, requests=requests, concurrency=concurrency
+                )
+    return results
@@ -0,0 +1,77 @@
+"""Gunicorn settings: gunicorn -c gunicorn.conf.py src.wsgi:app
+
+Every setting below can be overridden through the environment.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+
+# sync:    one request at a time per worker, simplest and most predictable
+# gthread: a thread pool per worker (GUNICORN_THREADS), good for I/O-bound views
+# gevent:  cooperative greenlets (needs the gevent package), for many slow clients
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# Import the app once in the master so workers fork with the code already
+# loaded. Off by default for gevent, which must monkey-patch before the app
+# imports its libraries.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '0' if worker_class == 'gevent' else '1') == '1'
+
+# Recycle workers to cap memory growth; the jitter keeps them from all
+# restarting at the same moment
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+# Prometheus multiprocess mode: workers write their metrics to files in this
+# directory and /metrics sums them. It is set here, when the master reads
+# this file, so it happens before the app (and prometheus_client) is
+# imported. Unless PROMETHEUS_MULTIPROC_DIR is given, each master gets its
+# own directory, so masters overlapping during a deploy don't mix or wipe
+# each other's samples.
+own_metrics_dir = None
+if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+    own_metrics_dir = os.path.join(tempfile.gettempdir(), f"linkak-metrics-{os.getpid()}")
+    shutil.rmtree(own_metrics_dir, ignore_errors=True)  # Left over by an earlier process with this pid
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = own_metrics_dir
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+
+def post_fork(server, worker):
+    """Warm each worker before it accepts connections
+
+    Runs in the new worker process: gives it its own database pools,
+    compiles the templates and loads the most-clicked short URLs into the
+    redirect cache.
+    """
+    from src.services.warmup import warm_worker
+
+    # With preload_app this is the app imported by the master; otherwise
+    # the worker imports it here and gunicorn reuses it afterwards
+    app = worker.app.wsgi()
+    stats = warm_worker(app)
+    server.log.info("Worker %s warmed: %s redirects, %s templates", worker.pid, stats['redirects'], stats['templates'])
+
+
+def on_exit(server):
+    """Remove the metrics directory created for this master"""
+    if own_metrics_dir:
+        shutil.rmtree(own_metrics_dir, ignore_errors=True)
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges (e.g. its click queue depth)"""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
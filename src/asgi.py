@@ -0,0 +1,193 @@
+"""ASGI fast path for redirects
+
+Serves GET/HEAD /<short_code> and /l/<username>/<link_id> from the redirect
+cache without going through Flask, flask-login or the blueprints; every
+other request (including 404/410 answers, so their pages stay identical)
+is handed to the Flask app. Run with e.g.
+
+    uvicorn src.asgi:app --workers 4
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.main import create_app
+from src.services.redirects import NOT_CACHED, ClickBuffer, peek_short_code, resolve_short_code, peek_link, resolve_link
+from src.services.metrics import record_request
+from werkzeug.urls import iri_to_uri
+from io import BytesIO
+import asyncio
+import time
+
+
+class WSGIFallback:
+    """Minimal ASGI -> WSGI bridge; the WSGI app runs on the default thread pool
+
+    Request and response bodies are buffered, which is fine for the pages
+    and JSON the Flask app serves.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return
+
+        body = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            body.append(message.get('body', b''))
+            more_body = message.get('more_body', False)
+
+        environ = self._environ(scope, b''.join(body))
+        status, headers, content = await asyncio.get_running_loop().run_in_executor(None, self._run, environ)
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': content})
+
+    def _environ(self, scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name == 'CONTENT_TYPE' or name == 'CONTENT_LENGTH':
+                key = name
+            else:
+                key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    def _run(self, environ):
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            content = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return response['status'], response['headers'], content
+
+
+class RedirectApp:
+    """ASGI app answering cached redirects itself and everything else through Flask"""
+
+    def __init__(self, flask_app, fallback=None):
+        self.flask_app = flask_app
+        self.fallback = fallback or WSGIFallback(flask_app)
+        lag, max_delay = flask_app.config.get('ETL_LAG_SECONDS', 30), flask_app.config.get('CLICK_MAX_DELAY', 15)
+        # A click written after the ETL passed its click_time would never be counted (a lag of 0 opts out)
+        if lag and max_delay >= lag:
+            raise ValueError(f"CLICK_MAX_DELAY ({max_delay}) must be below ETL_LAG_SECONDS ({lag})")
+        self.clicks = ClickBuffer(
+            flask_app, interval=flask_app.config.get('CLICK_FLUSH_INTERVAL', 0.5), max_delay=max_delay
+        )
+        # Static single-segment routes (/login, /dashboard, ...) outrank /<short_code> in Flask
+        self.reserved = {rule.rule for rule in flask_app.url_map.iter_rules() if not rule.arguments}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+            if await self._redirect(scope, send):
+                return
+        await self.fallback(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_running_loop().run_in_executor(None, self.clicks.stop)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _route(self, path):
+        """('url', code) or ('link', username, link_id) for fast-path URLs, else None"""
+        if path in self.reserved:
+            return None
+        parts = path[1:].split('/')
+        if len(parts) == 1 and parts[0]:
+            return 'url', parts[0]
+        if len(parts) == 3 and parts[0] == 'l' and parts[1] and parts[2].isdigit() and parts[2].isascii():
+            return 'link', parts[1], int(parts[2])
+        return None
+
+    async def _redirect(self, scope, send):
+        """Send a 302 for a known, active target; False hands the request to Flask"""
+        route = self._route(scope['path'])
+        if route is None:
+            return False
+        started = time.perf_counter()
+
+        # Only the in-process tier here; a shared cache tier is read in the executor
+        if route[0] == 'url':
+            resolved = peek_short_code(route[1], local_only=True)
+        else:
+            resolved = peek_link(route[1], route[2], local_only=True)
+        if resolved is NOT_CACHED:
+            resolved = await asyncio.get_running_loop().run_in_executor(None, self._resolve, route)
+        if resolved is None or resolved[0] != 302:
+            return False
+
+        headers = dict(scope.get('headers', []))
+        client = scope.get('client') or (None, 0)
+        referrer = headers.get(b'referer')
+        user_agent = headers.get(b'user-agent', b'')
+        if route[0] == 'url':
+            _, target_id, location = resolved
+            owner_id = None
+        else:
+            _, target_id, owner_id, location = resolved
+        self.clicks.start().add(
+            route[0], target_id, owner_id=owner_id,
+            referrer=referrer.decode('latin-1') if referrer else None,
+            user_agent=user_agent.decode('latin-1'),
+            ip_address=client[0]
+        )
+
+        await send({
+            'type': 'http.response.start',
+            'status': 302,
+            'headers': [
+                (b'location', iri_to_uri(location, safe_conversion=True).encode('latin-1')),
+                (b'content-length', b'0'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': b''})
+        record_request(f"fastpath.{route[0]}", scope['method'], 302, time.perf_counter() - started)
+        return True
+
+    def _resolve(self, route):
+        with self.flask_app.app_context():
+            if route[0] == 'url':
+                return resolve_short_code(route[1])
+            return resolve_link(route[1], route[2])
+
+
+app = RedirectApp(create_app())
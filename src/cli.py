@@ -0,0 +1,234 @@
+from flask import current_app
+from flask.cli import with_appcontext
+from src.extensions import db
+from src.services.storage import collect_garbage
+from src.services.ordering import migrate_link_sort_keys
+from src.services.rollups import rebuild_rollups
+from src.services.analytics_etl import run_etl, start_etl_worker
+from src.services.scheduler import run_due_jobs, start_scheduler
+from src.services.recommendations import run_recommendations, start_recommendation_worker
+from src.services.migrations import upgrade, pending_migrations, explain_hot_queries
+from src.services.demo import create_demo_data
+from src.services.datagen import generate_dataset
+from src.services.startup import startup_report
+from src.services.assets import build_assets
+from src.services.respserver import RespServer
+import click
+import threading
+
+@click.command('gc-uploads')
+@with_appcontext
+@click.option('--grace', default=3600, help='Keep files modified within this many seconds')
+@click.option('--dry-run', is_flag=True, help='Report what would be removed without deleting')
+def gc_uploads(grace, dry_run):
+    """Remove uploaded blobs that no model references any more"""
+    stats = collect_garbage(grace_seconds=grace, dry_run=dry_run)
+    click.echo(f"Scanned {stats['scanned']} files, removed {stats['removed']} "
+               f"({stats['bytes_freed']} bytes){' [dry run]' if dry_run else ''}")
+
+@click.command('migrate-link-order')
+@with_appcontext
+def migrate_link_order():
+    """Backfill fractional link ordering keys from display_order"""
+    count = migrate_link_sort_keys()
+    click.echo(f"Assigned ordering keys to {count} links")
+
+@click.command('rebuild-rollups')
+@with_appcontext
+@click.option('--user-id', type=int, default=None, help='Only rebuild rollups for this user')
+def rebuild_analytics_rollups(user_id):
+    """Recompute weekly/monthly analytics rollups from the daily rows"""
+    count = rebuild_rollups(user_id=user_id)
+    click.echo(f"Rebuilt rollups from {count} daily rows")
+
+@click.command('run-analytics-etl')
+@with_appcontext
+@click.option('--chunk-size', default=5000, help='Click events processed per transaction')
+def run_analytics_etl(chunk_size):
+    """Aggregate new click events into daily analytics and rollups"""
+    count = run_etl(chunk_size=chunk_size)
+    click.echo(f"Processed {count} click events")
+
+@click.command('run-scheduled')
+@with_appcontext
+@click.option('--batch-size', default=1000, help='Scheduled jobs applied per transaction')
+def run_scheduled(batch_size):
+    """Apply every scheduled content change that is due"""
+    count = run_due_jobs(batch_size=batch_size)
+    click.echo(f"Executed {count} scheduled jobs")
+
+@click.command('generate-recommendations')
+@with_appcontext
+@click.option('--force', is_flag=True, help='Regenerate even if the input data has not changed')
+@click.option('--processes', type=int, default=None, help='Worker processes (default: CPU count)')
+def generate_all_recommendations(force, processes):
+    """Regenerate recommendations for every user whose links or analytics changed"""
+    stats = run_recommendations(force=force, max_workers=processes)
+    click.echo(f"Generated {stats['generated']} recommendation sets, skipped {stats['skipped']} unchanged")
+
+@click.command('sync-replicas')
+@with_appcontext
+def sync_replicas():
+    """Copy the SQLite primary into the SQLite replica files (stands in for replication locally)"""
+    primary = db.get_engine(current_app)
+    if primary.dialect.name != 'sqlite':
+        raise click.ClickException('sync-replicas only copies SQLite databases')
+    source = primary.raw_connection()
+    try:
+        for bind in current_app.config.get('SQLALCHEMY_REPLICA_BINDS') or []:
+            target = db.get_engine(current_app, bind=bind).raw_connection()
+            try:
+                source.connection.backup(target.connection)
+            finally:
+                target.close()
+            click.echo(f"Synced {bind}")
+    finally:
+        source.close()
+
+@click.command('db-upgrade')
+@with_appcontext
+@click.option('--dry-run', is_flag=True, help='List pending migrations without applying them')
+def db_upgrade(dry_run):
+    """Apply pending schema migrations"""
+    if dry_run:
+        for version, description, _ in pending_migrations():
+            click.echo(f"{version} {description}")
+        return
+    applied = upgrade()
+    click.echo(f"Applied {len(applied)} migrations{': ' + ', '.join(applied) if applied else ''}")
+
+@click.command('explain-queries')
+@with_appcontext
+@click.option('--user-id', type=int, default=1, help='Sample user id bound into the queries')
+@click.option('--strict', is_flag=True, help='Exit with an error if any hot query scans a whole table')
+def explain_queries(user_id, strict):
+    """Show the query plan of every hot query and flag full table scans"""
+    report = explain_hot_queries({'user_id': user_id})
+    for entry in report:
+        click.echo(f"{'FULL SCAN' if entry['full_scan'] else 'ok':9}  {entry['name']}")
+        for line in entry['plan']:
+            click.echo(f"           {line}")
+    scans = [entry['name'] for entry in report if entry['full_scan']]
+    if strict and scans:
+        raise click.ClickException(f"Full table scans in: {', '.join(scans)}")
+
+@click.command('seed-demo')
+@with_appcontext
+def seed_demo():
+    """Apply migrations and create the demo account with sample content"""
+    upgrade()
+    if create_demo_data():
+        click.echo("Demo data created successfully!")
+    else:
+        click.echo("Demo user already exists")
+
+@click.command('startup-report')
+@click.option('--budget-ms', type=float, default=None, help='Fail if cold start takes longer (default: STARTUP_BUDGET_MS)')
+@click.option('--top', default=15, help='Number of packages and modules to list')
+@with_appcontext
+def startup_report_command(budget_ms, top):
+    """Measure worker cold start: import time per package/module and create_app time"""
+    budget_ms = budget_ms if budget_ms is not None else current_app.config.get('STARTUP_BUDGET_MS')
+    report = startup_report(top=top)
+    click.echo(f"Cold start {report['total_ms']} ms (imports {report['import_ms']} ms, "
+               f"create_app {report['create_app_ms']} ms)")
+    click.echo("Heaviest packages (self time):")
+    for name, ms in report['packages']:
+        click.echo(f"  {ms:8.1f} ms  {name}")
+    click.echo("Heaviest modules (self time):")
+    for name, ms in report['modules']:
+        click.echo(f"  {ms:8.1f} ms  {name}")
+    if budget_ms and report['total_ms'] > budget_ms:
+        raise click.ClickException(f"Cold start {report['total_ms']} ms is over the {budget_ms} ms budget")
+
+@click.command('generate-data')
+@with_appcontext
+@click.option('--users', default=1000, help='Accounts to create')
+@click.option('--links-per-user', default=10, help='Profile links per account')
+@click.option('--urls-per-user', default=20, help='Short URLs per account')
+@click.option('--menus', default=200, help='Menus, owned by random accounts')
+@click.option('--categories', default=6, help='Categories per menu')
+@click.option('--items', default=10, help='Items per category')
+@click.option('--clicks', default=1_000_000, help='Short URL clicks (URLAnalytics rows)')
+@click.option('--zipf', default=1.1, help='Zipf exponent of short URL popularity')
+@click.option('--days', default=90, help='Clicks are spread over this many past days')
+@click.option('--seed', default=42, help='Random seed; the same options give the same data')
+@click.option('--batch-size', default=5000, help='Rows per INSERT batch')
+@click.option('--processes', type=int, default=None, help='Click generator processes (default: 1 for SQLite, else CPU count up to 8)')
+def generate_data(users, links_per_user, urls_per_user, menus, categories, items, clicks, zipf, days, seed,
+                  batch_size, processes):
+    """Bulk load a synthetic, production-sized dataset for scale testing"""
+    upgrade()
+    counts = generate_dataset(
+        users=users, links_per_user=links_per_user, urls_per_user=urls_per_user, menus=menus,
+        categories=categories, items=items, clicks=clicks, zipf=zipf, days=days, seed=seed,
+        batch_size=batch_size, processes=processes
+    )
+    seconds = counts.pop('seconds')
+    click.echo(', '.join(f"{count} {name}" for name, count in counts.items()) + f" in {seconds}s")
+    click.echo(f"Accounts are user<id> with password 'password'; run 'flask run-analytics-etl' to aggregate the clicks")
+
+@click.command('build-assets')
+@with_appcontext
+@click.option('--clean', is_flag=True, help='Remove fingerprinted files the new build no longer uses')
+def build_static_assets(clean):
+    """Fingerprint and precompress the static assets (writes static/dist/)"""
+    stats = build_assets(current_app.static_folder, clean=clean)
+    click.echo(f"{stats['files']} assets, built {stats['built']} ({stats['bytes']} bytes "
+               f"plus {stats['compressed_bytes']} bytes of .gz/.br variants)")
+    if clean:
+        click.echo(f"Removed {stats['removed']} stale files")
+
+@click.command('cache-server')
+@click.option('--host', default='127.0.0.1', help='Interface to listen on')
+@click.option('--port', default=6379, help='Port to listen on (0 picks a free one)')
+def cache_server(host, port):
+    """Run an in-memory Redis-protocol server for testing CACHE_REDIS_URL locally"""
+    server = RespServer(host, port)
+    click.echo(f"Serving {server.url} (in-memory, for development only); Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+@click.command('run-workers')
+@with_appcontext
+@click.option('--etl-interval', type=int, default=60, envvar='ANALYTICS_ETL_INTERVAL',
+              help='Seconds between analytics ETL runs (0 disables)')
+@click.option('--scheduler/--no-scheduler', default=True, envvar='SCHEDULER_ENABLED',
+              help='Apply scheduled content changes when they are due')
+@click.option('--recommendations-interval', type=int, default=3600, envvar='RECOMMENDATIONS_INTERVAL',
+              help='Seconds between recommendation refreshes (0 disables)')
+def run_workers(etl_interval, scheduler, recommendations_interval):
+    """Run the background jobs until interrupted; one such process per deployment"""
+    app = current_app._get_current_object()
+    started = []
+    if etl_interval:
+        start_etl_worker(app, interval=etl_interval)
+        started.append(f"analytics ETL every {etl_interval}s")
+    if scheduler:
+        start_scheduler(app)
+        started.append('scheduler')
+    if recommendations_interval:
+        start_recommendation_worker(app, interval=recommendations_interval)
+        started.append(f"recommendations every {recommendations_interval}s")
+    if not started:
+        raise click.UsageError('Every background job is disabled')
+    click.echo(f"Running {', '.join(started)}; Ctrl+C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+COMMANDS = (
+    gc_uploads, migrate_link_order, rebuild_analytics_rollups, run_analytics_etl, run_scheduled,
+    generate_all_recommendations, sync_replicas, db_upgrade, explain_queries, seed_demo, generate_data,
+    startup_report_command, build_static_assets, cache_server, run_workers,
+)
+
+def register_commands(app):
+    """Add the management commands to the app's flask CLI"""
+    for command in COMMANDS:
+        app.cli.add_command(command)
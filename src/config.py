@@ -0,0 +1,167 @@
+import os
+
+# Connection pool defaults for server databases (MySQL). SQLite uses
+# SQLAlchemy's own per-thread pooling and ignores these.
+POOL_SIZE = 10
+POOL_MAX_OVERFLOW = 20
+POOL_TIMEOUT = 30
+POOL_RECYCLE = 280  # Below MySQL's default wait_timeout on managed hosts
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def database_uri():
+    """Database URL from the environment, defaulting to the local SQLite file
+
+    SQLALCHEMY_DATABASE_URI or DATABASE_URL take a full URL (mysql:// URLs
+    are switched to the pymysql driver); otherwise DB_HOST, DB_PORT,
+    DB_USERNAME, DB_PASSWORD and DB_NAME build a MySQL URL.
+    """
+    uri = os.environ.get('SQLALCHEMY_DATABASE_URI') or os.environ.get('DATABASE_URL')
+    if uri:
+        if uri.startswith('mysql://'):
+            uri = 'mysql+pymysql://' + uri[len('mysql://'):]
+        return uri
+
+    if os.environ.get('DB_HOST'):
+        return "mysql+pymysql://{user}:{password}@{host}:{port}/{name}?charset=utf8mb4".format(
+            user=os.environ.get('DB_USERNAME', 'root'),
+            password=os.environ.get('DB_PASSWORD', ''),
+            host=os.environ['DB_HOST'],
+            port=os.environ.get('DB_PORT', '3306'),
+            name=os.environ.get('DB_NAME', 'linkak')
+        )
+
+    return 'sqlite:///linkak.db'
+
+
+def replica_uris():
+    """Read replica URLs from DATABASE_REPLICA_URLS (comma separated)"""
+    uris = [uri.strip() for uri in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if uri.strip()]
+    return ['mysql+pymysql://' + uri[len('mysql://'):] if uri.startswith('mysql://') else uri for uri in uris]
+
+
+def replica_binds(uris):
+    """SQLALCHEMY_BINDS entries for the replicas, keyed replica_0, replica_1, ..."""
+    return {f"replica_{index}": uri for index, uri in enumerate(uris)}
+
+
+def engine_options(uri):
+    """SQLAlchemy engine options for a database URL"""
+    if uri.startswith('sqlite'):
+        return {}
+    return {
+        'pool_size': _env_int('DB_POOL_SIZE', POOL_SIZE),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', POOL_MAX_OVERFLOW),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', POOL_TIMEOUT),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', POOL_RECYCLE),
+        'pool_pre_ping': True,
+    }
+
+
+class Config:
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'dev_key_for_testing')
+
+    SQLALCHEMY_DATABASE_URI = database_uri()
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Views marked @replica_reads query one of these; writes and everything
+    # else use the primary. After a write, the user's reads stay on the
+    # primary for DB_STICKY_SECONDS (read-your-writes).
+    SQLALCHEMY_BINDS = replica_binds(replica_uris())
+    SQLALCHEMY_REPLICA_BINDS = list(SQLALCHEMY_BINDS)
+    DB_STICKY_SECONDS = _env_int('DB_STICKY_SECONDS', 5)
+
+    # Applied to every SQLite connection: WAL lets readers run alongside the
+    # writer, NORMAL sync is safe with WAL, and busy_timeout makes writers
+    # wait for the lock instead of failing with "database is locked"
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT = _env_int('SQLITE_BUSY_TIMEOUT', 5000)
+
+    RESULT_CACHE_SIZE = _env_int('RESULT_CACHE_SIZE', 1024)
+    # Without a shared cache, version bumps only reach the process that made
+    # them; other workers serve their cached results for up to this long
+    RESULT_CACHE_TTL = _env_int('RESULT_CACHE_TTL', 30)
+    # Without a shared cache, other workers see revoked collaboration grants only once this expires
+    ACL_CACHE_TTL = _env_int('ACL_CACHE_TTL', 5)
+    IDENTITY_CACHE_SIZE = _env_int('IDENTITY_CACHE_SIZE', 4096)
+    IDENTITY_CACHE_TTL = _env_int('IDENTITY_CACHE_TTL', 60)
+    REDIRECT_CACHE_SIZE = _env_int('REDIRECT_CACHE_SIZE', 10000)
+    REDIRECT_CACHE_TTL = _env_int('REDIRECT_CACHE_TTL', 60)
+    # Set to share the result, identity and redirect caches between processes
+    # and nodes (services/shared_cache.py). Each process keeps entries for up
+    # to CACHE_LOCAL_TTL seconds; writes anywhere evict them through pub/sub
+    # on CACHE_CHANNEL. CACHE_SHARED_TTL applies to entries without a TTL.
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+    CACHE_LOCAL_TTL = _env_int('CACHE_LOCAL_TTL', 30)
+    CACHE_SHARED_TTL = _env_int('CACHE_SHARED_TTL', 86400)
+    CACHE_KEY_PREFIX = os.environ.get('CACHE_KEY_PREFIX', 'linkak:')
+    CACHE_CHANNEL = os.environ.get('CACHE_CHANNEL', 'linkak:cache-invalidation')
+    CLICK_FLUSH_INTERVAL = float(os.environ.get('CLICK_FLUSH_INTERVAL', 0.5))
+    # Cached URL details and analytics reflect new clicks after at most this many seconds
+    CLICK_BUMP_INTERVAL = float(os.environ.get('CLICK_BUMP_INTERVAL', 1.0))
+    # The analytics ETL leaves clicks younger than this for its next run, so
+    # transactions that commit out of id order are never skipped
+    ETL_LAG_SECONDS = _env_int('ETL_LAG_SECONDS', 30)
+    # Buffered clicks (ASGI server) not written this many seconds after the
+    # click are dropped. Must be below ETL_LAG_SECONDS; the difference bounds
+    # how long the write itself may take.
+    CLICK_MAX_DELAY = _env_int('CLICK_MAX_DELAY', 15)
+    WARMUP_REDIRECTS = _env_int('WARMUP_REDIRECTS', 1000)  # Top short URLs loaded into each new worker
+
+    # Prometheus /metrics; set METRICS_TOKEN to require 'Authorization: Bearer <token>'
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # Opt-in SQL profiling (services/profiler.py): per-request query reports,
+    # N+1 warnings for statements repeated more than SQL_PROFILER_N_PLUS_ONE
+    # times and a slow query log (SLOW_QUERY_LOG file, else the app's logging)
+    SQL_PROFILER = os.environ.get('SQL_PROFILER', '0') == '1'
+    SQL_PROFILER_N_PLUS_ONE = _env_int('SQL_PROFILER_N_PLUS_ONE', 5)
+    SQL_PROFILER_HEADER = True  # X-Query-Count response header
+    SLOW_QUERY_MS = _env_int('SLOW_QUERY_MS', 100)
+    SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG')
+
+    # url_for('static') points at the fingerprinted copies written by
+    # flask build-assets, when a build exists
+    ASSET_FINGERPRINTS = os.environ.get('ASSET_FINGERPRINTS', '1') == '1'
+
+    IMAGE_WORKERS = _env_int('IMAGE_WORKERS', 2)
+
+    # Cold start budget for a worker (import + create_app), checked by flask startup-report
+    STARTUP_BUDGET_MS = _env_int('STARTUP_BUDGET_MS', 1500)
+
+
+class DevelopmentConfig(Config):
+    pass
+
+
+class ProductionConfig(Config):
+    SQL_PROFILER_HEADER = False
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'sqlite://')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    SQLITE_JOURNAL_MODE = None  # In-memory databases can't use WAL
+    CACHE_REDIS_URL = os.environ.get('TEST_CACHE_REDIS_URL')
+    ETL_LAG_SECONDS = 0
+    CLICK_BUMP_INTERVAL = 0
+
+
+CONFIGS = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+}
+
+
+def get_config(name=None):
+    """Config class by name, defaulting to the APP_CONFIG environment variable"""
+    return CONFIGS[name or os.environ.get('APP_CONFIG', 'development')]
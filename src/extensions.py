@@ -0,0 +1,167 @@
+from flask import g, has_request_context, session as cookie_session, _request_ctx_stack
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import event, orm
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import Select
+from functools import wraps
+from werkzeug.exceptions import NotFound
+import random
+import sqlite3
+import threading
+import time
+
+
+class RoutingSession(SignallingSession):
+    """Session that sends reads of replica-enabled views to a read replica
+
+    A query goes to a replica only when the current view opted in with
+    @replica_reads, the statement is a plain SELECT, nothing has been
+    written in this session yet and the user is not inside their
+    read-your-writes window. Everything else, including all flushes,
+    uses the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind
+        replicas = self.app.config.get('SQLALCHEMY_REPLICA_BINDS')
+        if replicas and self._reads_from_replica(clause):
+            # One replica per session so a request sees a single snapshot
+            bind_key = self.info.setdefault('replica', random.choice(replicas))
+            g.db_replica_used = True
+            return self.db.get_engine(self.app, bind=bind_key)
+        return super().get_bind(mapper, clause)
+
+    def _reads_from_replica(self, clause):
+        if self._flushing or self.info.get('wrote'):
+            return False
+        if clause is None or not isinstance(clause, Select):
+            # Raw connections and INSERT/UPDATE/DELETE statements are writes
+            self.info['wrote'] = True
+            return False
+        if clause._for_update_arg is not None:
+            return False
+        if not has_request_context() or not g.get('db_read_replica'):
+            return False
+        return not is_sticky()
+
+    @property
+    def db(self):
+        return _db_for(self.app)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+# The single SQLAlchemy instance shared by every model and blueprint
+db = RoutingSQLAlchemy()
+
+
+def _db_for(app):
+    return app.extensions['sqlalchemy'].db
+
+
+# PRAGMA name -> value applied to every new SQLite connection
+_sqlite_pragmas = {}
+
+
+def init_db(app):
+    """Bind the shared db to the app and configure per-connection SQLite settings"""
+    _sqlite_pragmas.clear()
+    for name, key in (('journal_mode', 'SQLITE_JOURNAL_MODE'),
+                      ('synchronous', 'SQLITE_SYNCHRONOUS'),
+                      ('busy_timeout', 'SQLITE_BUSY_TIMEOUT')):
+        if app.config.get(key) is not None:
+            _sqlite_pragmas[name] = app.config[key]
+
+    db.init_app(app)
+    return db
+
+
+# Registered on the Engine class so it also covers engines that
+# Flask-SQLAlchemy recreates when the database URI changes
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection) or not _sqlite_pragmas:
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in _sqlite_pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+# Read-your-writes: after a logged-in user commits a write, their reads stay
+# on the primary for DB_STICKY_SECONDS. The deadline is kept in the session
+# cookie (works across workers) and, for cookie-less API clients, in a
+# per-process map keyed by user id.
+
+_sticky_users = {}
+_sticky_lock = threading.Lock()
+
+
+def _request_user_id():
+    # Only use a user flask-login already loaded; never trigger a load here
+    user = getattr(_request_ctx_stack.top, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.id
+    return None
+
+
+def is_sticky():
+    """Is the current request inside its read-your-writes window"""
+    now = time.time()
+    if cookie_session.get('_db_primary_until', 0) > now:
+        return True
+    user_id = _request_user_id()
+    return user_id is not None and _sticky_users.get(user_id, 0) > now
+
+
+def mark_sticky(seconds):
+    """Start a read-your-writes window for the current user"""
+    user_id = _request_user_id()
+    if user_id is None:
+        return
+    until = time.time() + seconds
+    cookie_session['_db_primary_until'] = until
+    with _sticky_lock:
+        _sticky_users[user_id] = until
+        if len(_sticky_users) > 10000:
+            now = time.time()
+            for stale in [key for key, value in _sticky_users.items() if value <= now]:
+                del _sticky_users[stale]
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _note_write(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _start_sticky_window(session):
+    if session.info.get('wrote') and has_request_context() and session.app.config.get('SQLALCHEMY_REPLICA_BINDS'):
+        mark_sticky(session.app.config.get('DB_STICKY_SECONDS', 5))
+
+
+def replica_reads(view):
+    """Let a read-mostly view query a read replica
+
+    A 404 raised after reading from a replica is retried once on the
+    primary, so rows that haven't replicated yet (e.g. a short URL created
+    a moment ago) are still found.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_replica = True
+        try:
+            return view(*args, **kwargs)
+        except NotFound:
+            if not g.pop('db_replica_used', False):
+                raise
+            db.session.rollback()
+            g.db_read_replica = False
+            return view(*args, **kwargs)
+        finally:
+            g.db_read_replica = False
+    return wrapper
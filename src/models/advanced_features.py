@@ -1,8 +1,7 @@
-from flask_sqlalchemy import SQLAlchemy
+from src.extensions import db
 from datetime import datetime
 import json
 
-db = SQLAlchemy()
 
 class AIRecommendation(db.Model):
     __tablename__ = 'ai_recommendations'
@@ -48,8 +47,30 @@ class AIRecommendation(db.Model):
         }
 
 
+# Fingerprint of the inputs a recommendation type was last generated from
+class RecommendationRun(db.Model):
+    __tablename__ = 'recommendation_runs'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'recommendation_type', name='uq_recommendation_runs_type'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    recommendation_type = db.Column(db.String(50), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    generated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __init__(self, user_id, recommendation_type, fingerprint):
+        self.user_id = user_id
+        self.recommendation_type = recommendation_type
+        self.fingerprint = fingerprint
+
+
 class AdvancedAnalytics(db.Model):
     __tablename__ = 'advanced_analytics'
+    __table_args__ = (
+        db.Index('ix_advanced_analytics_user_date', 'user_id', 'date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -145,8 +166,77 @@ class AdvancedAnalytics(db.Model):
         }
 
 
+# Progress marker for incremental jobs (e.g. the analytics ETL's last processed click id)
+class ETLCheckpoint(db.Model):
+    __tablename__ = 'etl_checkpoints'
+    
+    name = db.Column(db.String(100), primary_key=True)
+    high_water_mark = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __init__(self, name, high_water_mark=0):
+        self.name = name
+        self.high_water_mark = high_water_mark
+
+
+# Weekly/monthly totals maintained incrementally from AdvancedAnalytics daily rows
+class AnalyticsRollup(db.Model):
+    __tablename__ = 'analytics_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'period', 'period_start', name='uq_analytics_rollups_period'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    period = db.Column(db.String(10), nullable=False)  # 'week' or 'month'
+    period_start = db.Column(db.Date, nullable=False)  # Monday of the week / first of the month
+    total_views = db.Column(db.Integer, default=0)
+    unique_visitors = db.Column(db.Integer, default=0)
+    bounce_rate_sum = db.Column(db.Float, default=0.0)  # Sum of daily bounce rates
+    time_on_page_sum = db.Column(db.Float, default=0.0)  # Sum of daily average time on page
+    day_count = db.Column(db.Integer, default=0)  # Number of daily rows folded in
+    
+    def __init__(self, user_id, period, period_start):
+        self.user_id = user_id
+        self.period = period
+        self.period_start = period_start
+        self.total_views = 0
+        self.unique_visitors = 0
+        self.bounce_rate_sum = 0.0
+        self.time_on_page_sum = 0.0
+        self.day_count = 0
+
+
+# Normalized (period, dimension, key, count) breakdowns for daily, weekly and monthly buckets
+class AnalyticsDimension(db.Model):
+    __tablename__ = 'analytics_dimensions'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'period', 'period_start', 'dimension', 'key', name='uq_analytics_dimensions_key'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    period = db.Column(db.String(10), nullable=False)  # 'day', 'week' or 'month'
+    period_start = db.Column(db.Date, nullable=False)
+    dimension = db.Column(db.String(20), nullable=False)  # 'device', 'location', 'referrer'
+    key = db.Column(db.String(255), nullable=False)
+    count = db.Column(db.Integer, default=0)
+    
+    def __init__(self, user_id, period, period_start, dimension, key, count=0):
+        self.user_id = user_id
+        self.period = period
+        self.period_start = period_start
+        self.dimension = dimension
+        self.key = key
+        self.count = count
+
+
 class ScheduledContent(db.Model):
     __tablename__ = 'scheduled_content'
+    __table_args__ = (
+        # Due-queue lookups: pending jobs ordered by time
+        db.Index('ix_scheduled_content_due', 'is_executed', 'scheduled_time'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -157,6 +247,8 @@ class ScheduledContent(db.Model):
     is_executed = db.Column(db.Boolean, default=False)
     execution_time = db.Column(db.DateTime, nullable=True)
     content_data = db.Column(db.Text, nullable=True)  # JSON string of content data for updates
+    claimed_by = db.Column(db.String(100), nullable=True)  # Scheduler worker holding the lease
+    lease_until = db.Column(db.DateTime, nullable=True)  # Claim expires after this time
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -209,6 +301,10 @@ class ScheduledContent(db.Model):
 
 class Collaboration(db.Model):
     __tablename__ = 'collaborations'
+    __table_args__ = (
+        # Permission checks load a collaborator's grants by resource
+        db.Index('ix_collaborations_collaborator_resource', 'collaborator_id', 'resource_type', 'resource_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     owner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -1,11 +1,13 @@
-from flask_sqlalchemy import SQLAlchemy
+from src.extensions import db
 from datetime import datetime
 import json
 
-db = SQLAlchemy()
 
 class Menu(db.Model):
     __tablename__ = 'menus'
+    __table_args__ = (
+        db.Index('ix_menus_user_created', 'user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -58,6 +60,9 @@ class Menu(db.Model):
 
 class MenuCategory(db.Model):
     __tablename__ = 'menu_categories'
+    __table_args__ = (
+        db.Index('ix_menu_categories_menu_order', 'menu_id', 'display_order'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -91,12 +96,16 @@ class MenuCategory(db.Model):
 
 class MenuItem(db.Model):
     __tablename__ = 'menu_items'
+    __table_args__ = (
+        db.Index('ix_menu_items_category_order', 'category_id', 'display_order'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
     price = db.Column(db.Float, nullable=True)
     image = db.Column(db.String(255), nullable=True)  # Path to item image
+    image_variants = db.Column(db.Text, nullable=True)  # JSON string of resized image variants
     category_id = db.Column(db.Integer, db.ForeignKey('menu_categories.id'), nullable=False)
     is_available = db.Column(db.Boolean, default=True)
     is_featured = db.Column(db.Boolean, default=False)
@@ -131,6 +140,15 @@ class MenuItem(db.Model):
                 return {}
         return {}
     
+    def get_image_variants(self):
+        """Get image variants as a dictionary"""
+        if self.image_variants:
+            try:
+                return json.loads(self.image_variants)
+            except json.JSONDecodeError:
+                return {}
+        return {}
+    
     def to_dict(self):
         """Convert item to dictionary"""
         return {
@@ -139,6 +157,7 @@ class MenuItem(db.Model):
             'description': self.description,
             'price': self.price,
             'image': self.image,
+            'image_variants': self.get_image_variants(),
             'is_available': self.is_available,
             'is_featured': self.is_featured,
             'display_order': self.display_order,
@@ -1,16 +1,17 @@
-from flask_sqlalchemy import SQLAlchemy
+from src.extensions import db
 from datetime import datetime
 import string
 import random
-import qrcode
 from io import BytesIO
 import base64
 import os
 
-db = SQLAlchemy()
 
 class ShortURL(db.Model):
     __tablename__ = 'short_urls'
+    __table_args__ = (
+        db.Index('ix_short_urls_user_created', 'user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     original_url = db.Column(db.String(2048), nullable=False)
@@ -65,6 +66,8 @@ class ShortURL(db.Model):
     
     def generate_qr_code(self, size=200):
         """Generate a QR code for the shortened URL"""
+        import qrcode  # Loaded on first use; it pulls in PIL
+        
         qr = qrcode.QRCode(
             version=1,
             error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -86,7 +89,8 @@ class ShortURL(db.Model):
             # Create directory if it doesn't exist
             os.makedirs('src/static/qrcodes', exist_ok=True)
             path = f"src/static/qrcodes/{self.short_code}.png"
-            
+        
+        import qrcode
         qr = qrcode.QRCode(
             version=1,
             error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -116,8 +120,55 @@ class ShortURL(db.Model):
         }
 
 
+def detect_client(user_agent):
+    """Detect (device type, browser, OS) from a user agent string"""
+    # This is a simplified version - in production you'd use a proper UA parser library
+    ua_lower = user_agent.lower()
+    
+    # Detect device type
+    if 'mobile' in ua_lower or 'android' in ua_lower or 'iphone' in ua_lower:
+        device_type = 'mobile'
+    elif 'tablet' in ua_lower or 'ipad' in ua_lower:
+        device_type = 'tablet'
+    else:
+        device_type = 'desktop'
+    
+    # Detect browser
+    if 'chrome' in ua_lower:
+        browser = 'Chrome'
+    elif 'firefox' in ua_lower:
+        browser = 'Firefox'
+    elif 'safari' in ua_lower:
+        browser = 'Safari'
+    elif 'edge' in ua_lower:
+        browser = 'Edge'
+    elif 'opera' in ua_lower:
+        browser = 'Opera'
+    else:
+        browser = 'Other'
+    
+    # Detect OS
+    if 'windows' in ua_lower:
+        os_name = 'Windows'
+    elif 'mac' in ua_lower:
+        os_name = 'MacOS'
+    elif 'linux' in ua_lower:
+        os_name = 'Linux'
+    elif 'android' in ua_lower:
+        os_name = 'Android'
+    elif 'ios' in ua_lower or 'iphone' in ua_lower or 'ipad' in ua_lower:
+        os_name = 'iOS'
+    else:
+        os_name = 'Other'
+    
+    return device_type, browser, os_name
+
+
 class URLAnalytics(db.Model):
     __tablename__ = 'url_analytics'
+    __table_args__ = (
+        db.Index('ix_url_analytics_short_url_click_time', 'short_url_id', 'click_time'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     short_url_id = db.Column(db.Integer, db.ForeignKey('short_urls.id'), nullable=False)
@@ -147,44 +198,7 @@ class URLAnalytics(db.Model):
     
     def parse_user_agent(self, user_agent):
         """Parse user agent string to extract device, browser and OS info"""
-        # This is a simplified version - in production you'd use a proper UA parser library
-        ua_lower = user_agent.lower()
-        
-        # Detect device type
-        if 'mobile' in ua_lower or 'android' in ua_lower or 'iphone' in ua_lower:
-            self.device_type = 'mobile'
-        elif 'tablet' in ua_lower or 'ipad' in ua_lower:
-            self.device_type = 'tablet'
-        else:
-            self.device_type = 'desktop'
-        
-        # Detect browser
-        if 'chrome' in ua_lower:
-            self.browser = 'Chrome'
-        elif 'firefox' in ua_lower:
-            self.browser = 'Firefox'
-        elif 'safari' in ua_lower:
-            self.browser = 'Safari'
-        elif 'edge' in ua_lower:
-            self.browser = 'Edge'
-        elif 'opera' in ua_lower:
-            self.browser = 'Opera'
-        else:
-            self.browser = 'Other'
-        
-        # Detect OS
-        if 'windows' in ua_lower:
-            self.os = 'Windows'
-        elif 'mac' in ua_lower:
-            self.os = 'MacOS'
-        elif 'linux' in ua_lower:
-            self.os = 'Linux'
-        elif 'android' in ua_lower:
-            self.os = 'Android'
-        elif 'ios' in ua_lower or 'iphone' in ua_lower or 'ipad' in ua_lower:
-            self.os = 'iOS'
-        else:
-            self.os = 'Other'
+        self.device_type, self.browser, self.os = detect_client(user_agent)
     
     def get_geolocation(self, ip_address):
         """Get geolocation data from IP address"""
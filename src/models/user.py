@@ -1,10 +1,10 @@
-from flask_sqlalchemy import SQLAlchemy
+from src.extensions import db
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from src.models.shorturl import detect_client
 from datetime import datetime
 import json
 
-db = SQLAlchemy()
 
 class User(db.Model, UserMixin):
     __tablename__ = 'users'
@@ -16,7 +16,9 @@ class User(db.Model, UserMixin):
     full_name = db.Column(db.String(100), nullable=True)
     bio = db.Column(db.Text, nullable=True)
     profile_image = db.Column(db.String(255), nullable=True)
+    profile_image_variants = db.Column(db.Text, nullable=True)  # JSON string of resized image variants
     is_active = db.Column(db.Boolean, default=True)
+    is_public = db.Column(db.Boolean, default=True)  # Profile page and links visible; the account stays usable
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -73,6 +75,15 @@ class User(db.Model, UserMixin):
         if isinstance(settings_dict, dict):
             self.profile_settings = json.dumps(settings_dict)
     
+    def get_profile_image_variants(self):
+        """Get profile image variants as a dictionary"""
+        if self.profile_image_variants:
+            try:
+                return json.loads(self.profile_image_variants)
+            except json.JSONDecodeError:
+                return {}
+        return {}
+    
     def to_dict(self, include_private=False):
         """Convert user to dictionary"""
         data = {
@@ -81,6 +92,7 @@ class User(db.Model, UserMixin):
             'full_name': self.full_name,
             'bio': self.bio,
             'profile_image': self.profile_image,
+            'profile_image_variants': self.get_profile_image_variants(),
             'theme': self.theme,
             'social_links': self.get_social_links(),
             'custom_domain': self.custom_domain,
@@ -91,6 +103,7 @@ class User(db.Model, UserMixin):
             data.update({
                 'email': self.email,
                 'is_active': self.is_active,
+                'is_public': self.is_public,
                 'is_admin': self.is_admin,
                 'profile_settings': self.get_profile_settings(),
                 'updated_at': self.updated_at.isoformat() if self.updated_at else None
@@ -101,6 +114,9 @@ class User(db.Model, UserMixin):
 
 class Link(db.Model):
     __tablename__ = 'links'
+    __table_args__ = (
+        db.Index('ix_links_user_sort_key', 'user_id', 'sort_key'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
@@ -113,6 +129,7 @@ class Link(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     is_featured = db.Column(db.Boolean, default=False)
     display_order = db.Column(db.Integer, default=0)
+    sort_key = db.Column(db.String(255), nullable=True)  # Fractional ordering key, see services/ordering.py
     click_count = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -126,6 +143,9 @@ class Link(db.Model):
     # Additional settings
     settings = db.Column(db.Text, nullable=True)  # JSON string of link settings
     
+    # Relationships
+    clicks = db.relationship('LinkClick', backref='link', lazy=True, cascade="all, delete-orphan")
+    
     def __init__(self, title, url, user_id, description=None, icon=None, custom_image=None, 
                  category=None, is_featured=False, display_order=0, link_type='standard', reference_id=None):
         self.title = title
@@ -172,6 +192,7 @@ class Link(db.Model):
             'is_active': self.is_active,
             'is_featured': self.is_featured,
             'display_order': self.display_order,
+            'sort_key': self.sort_key,
             'click_count': self.click_count,
             'link_type': self.link_type,
             'reference_id': self.reference_id,
@@ -179,3 +200,74 @@ class Link(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+
+
+class LinkClick(db.Model):
+    __tablename__ = 'link_clicks'
+    __table_args__ = (
+        db.Index('ix_link_clicks_user_click_time', 'user_id', 'click_time'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    link_id = db.Column(db.Integer, db.ForeignKey('links.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # Owner of the link
+    click_time = db.Column(db.DateTime, default=datetime.utcnow)
+    referrer = db.Column(db.String(255), nullable=True)
+    user_agent = db.Column(db.String(255), nullable=True)
+    ip_address = db.Column(db.String(45), nullable=True)  # IPv6 can be up to 45 chars
+    country = db.Column(db.String(2), nullable=True)
+    device_type = db.Column(db.String(20), nullable=True)  # mobile, desktop, tablet
+    
+    def __init__(self, link_id, user_id, referrer=None, user_agent=None, ip_address=None):
+        self.link_id = link_id
+        self.user_id = user_id
+        self.referrer = referrer[:255] if referrer else None
+        self.user_agent = user_agent[:255] if user_agent else None
+        self.ip_address = ip_address
+        
+        if user_agent:
+            self.device_type = detect_client(user_agent)[0]
+    
+    def to_dict(self):
+        """Convert object to dictionary"""
+        return {
+            'id': self.id,
+            'link_id': self.link_id,
+            'click_time': self.click_time.isoformat() if self.click_time else None,
+            'referrer': self.referrer,
+            'ip_address': self.ip_address,
+            'country': self.country,
+            'device_type': self.device_type
+        }
+
+
+class APIToken(db.Model):
+    __tablename__ = 'api_tokens'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=False)
+    prefix = db.Column(db.String(16), unique=True, nullable=False)  # Public token id; the secret part is an HMAC signature
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=True)
+    revoked_at = db.Column(db.DateTime, nullable=True)
+    
+    # Relationships
+    user = db.relationship('User', backref=db.backref('api_tokens', lazy=True, cascade="all, delete-orphan"))
+    
+    def __init__(self, user_id, name, prefix, expires_at=None):
+        self.user_id = user_id
+        self.name = name
+        self.prefix = prefix
+        self.expires_at = expires_at
+    
+    def to_dict(self):
+        """Convert object to dictionary (the token itself is only shown once, on creation)"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'prefix': self.prefix,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'revoked_at': self.revoked_at.isoformat() if self.revoked_at else None
+        }
@@ -0,0 +1,89 @@
+from flask import Blueprint, render_template, redirect, url_for, request, jsonify
+from flask_login import login_user, logout_user, login_required, current_user
+from src.models.user import User, db
+from src.services.cache import result_cache
+
+core_bp = Blueprint('core', __name__)
+
+@core_bp.route('/')
+def index():
+    return render_template('index.html')
+
+@core_bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('core.dashboard'))
+    
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+        
+        user = User.query.filter_by(username=username).first()
+        
+        if user and user.check_password(password):
+            login_user(user)
+            return redirect(url_for('core.dashboard'))
+        
+        return render_template('login.html', error='Invalid username or password')
+    
+    return render_template('login.html')
+
+@core_bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if current_user.is_authenticated:
+        return redirect(url_for('core.dashboard'))
+    
+    if request.method == 'POST':
+        username = request.form.get('username')
+        email = request.form.get('email')
+        password = request.form.get('password')
+        confirm_password = request.form.get('confirm_password')
+        
+        if password != confirm_password:
+            return render_template('register.html', error='Passwords do not match')
+        
+        existing_user = User.query.filter((User.username == username) | (User.email == email)).first()
+        if existing_user:
+            return render_template('register.html', error='Username or email already exists')
+        
+        new_user = User(username=username, email=email, password=password)
+        db.session.add(new_user)
+        db.session.commit()
+        
+        login_user(new_user)
+        return redirect(url_for('core.dashboard'))
+    
+    return render_template('register.html')
+
+@core_bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    return redirect(url_for('core.index'))
+
+@core_bp.route('/dashboard')
+@login_required
+def dashboard():
+    return redirect(url_for('user.dashboard'))
+
+@core_bp.route('/api/health')
+def health_check():
+    return jsonify({'status': 'ok', 'version': '1.0.0'})
+
+@core_bp.route('/api/cache/stats')
+@login_required
+def cache_stats():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
+    return jsonify({
+        'success': True,
+        'data': result_cache.stats()
+    })
+
+@core_bp.app_errorhandler(404)
+def page_not_found(e):
+    return render_template('errors/404.html'), 404
+
+@core_bp.app_errorhandler(500)
+def server_error(e):
+    return render_template('errors/500.html'), 500
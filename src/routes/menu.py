@@ -1,15 +1,50 @@
-from flask import Blueprint, request, render_template, jsonify, abort, url_for, current_app
+from flask import Blueprint, request, render_template, jsonify, abort, url_for
 from src.models.menu import Menu, MenuCategory, MenuItem, db
+from src.services.images import enqueue_image_processing
+from src.services.storage import store_upload
+from src.services.permissions import has_permission
+from src.services.cache import result_cache
+from src.extensions import replica_reads
 from flask_login import login_required, current_user
 import json
-import os
-from werkzeug.utils import secure_filename
-from datetime import datetime
 
 menu_bp = Blueprint('menu', __name__)
 
+# Owners and collaborators are authorized against the menu; categories and
+# items inherit the permissions of the menu they belong to.
+
+def get_menu_or_404(menu_id, permission):
+    """Load a menu the current user may access with the given permission"""
+    menu = Menu.query.get_or_404(menu_id)
+    if not has_permission(current_user.id, permission, 'menu', menu.id, menu.user_id):
+        abort(404)
+    return menu
+
+def get_category_or_404(category_id, permission):
+    """Load a menu category the current user may access with the given permission"""
+    category, owner_id = MenuCategory.query.join(Menu).add_columns(Menu.user_id).filter(
+        MenuCategory.id == category_id
+    ).first_or_404()
+    if not has_permission(current_user.id, permission, 'menu', category.menu_id, owner_id):
+        abort(404)
+    return category
+
+def get_item_or_404(item_id, permission):
+    """Load a menu item the current user may access with the given permission"""
+    item, menu_id, owner_id = MenuItem.query.join(
+        MenuCategory, MenuItem.category_id == MenuCategory.id
+    ).join(
+        Menu, MenuCategory.menu_id == Menu.id
+    ).add_columns(Menu.id, Menu.user_id).filter(
+        MenuItem.id == item_id
+    ).first_or_404()
+    if not has_permission(current_user.id, permission, 'menu', menu_id, owner_id):
+        abort(404)
+    return item
+
 @menu_bp.route('/api/menus', methods=['GET'])
 @login_required
+@replica_reads
 def get_user_menus():
     """API endpoint to get user's menus"""
     menus = Menu.query.filter_by(user_id=current_user.id).order_by(Menu.created_at.desc()).all()
@@ -53,7 +88,7 @@ def create_menu():
 @login_required
 def get_menu(menu_id):
     """API endpoint to get a specific menu"""
-    menu = Menu.query.filter_by(id=menu_id, user_id=current_user.id).first_or_404()
+    menu = get_menu_or_404(menu_id, 'view')
     return jsonify({
         'success': True,
         'data': menu.to_dict()
@@ -63,7 +98,7 @@ def get_menu(menu_id):
 @login_required
 def update_menu(menu_id):
     """API endpoint to update a menu"""
-    menu = Menu.query.filter_by(id=menu_id, user_id=current_user.id).first_or_404()
+    menu = get_menu_or_404(menu_id, 'edit')
     
     data = request.get_json()
     if not data:
@@ -105,7 +140,7 @@ def update_menu(menu_id):
 @login_required
 def delete_menu(menu_id):
     """API endpoint to delete a menu"""
-    menu = Menu.query.filter_by(id=menu_id, user_id=current_user.id).first_or_404()
+    menu = get_menu_or_404(menu_id, 'admin')
     
     try:
         db.session.delete(menu)
@@ -119,7 +154,7 @@ def delete_menu(menu_id):
 @login_required
 def create_category(menu_id):
     """API endpoint to create a new menu category"""
-    menu = Menu.query.filter_by(id=menu_id, user_id=current_user.id).first_or_404()
+    menu = get_menu_or_404(menu_id, 'edit')
     
     data = request.get_json()
     if not data or 'name' not in data:
@@ -148,10 +183,7 @@ def create_category(menu_id):
 @login_required
 def update_category(category_id):
     """API endpoint to update a menu category"""
-    category = MenuCategory.query.join(Menu).filter(
-        MenuCategory.id == category_id,
-        Menu.user_id == current_user.id
-    ).first_or_404()
+    category = get_category_or_404(category_id, 'edit')
     
     data = request.get_json()
     if not data:
@@ -181,10 +213,7 @@ def update_category(category_id):
 @login_required
 def delete_category(category_id):
     """API endpoint to delete a menu category"""
-    category = MenuCategory.query.join(Menu).filter(
-        MenuCategory.id == category_id,
-        Menu.user_id == current_user.id
-    ).first_or_404()
+    category = get_category_or_404(category_id, 'edit')
     
     try:
         db.session.delete(category)
@@ -198,12 +227,10 @@ def delete_category(category_id):
 @login_required
 def create_item(category_id):
     """API endpoint to create a new menu item"""
-    category = MenuCategory.query.join(Menu).filter(
-        MenuCategory.id == category_id,
-        Menu.user_id == current_user.id
-    ).first_or_404()
+    category = get_category_or_404(category_id, 'edit')
     
     # Handle form data with file upload
+    file_path = None
     if request.content_type and 'multipart/form-data' in request.content_type:
         data = request.form.to_dict()
         image_file = request.files.get('image')
@@ -211,20 +238,7 @@ def create_item(category_id):
         # Save image if provided
         image_path = None
         if image_file and image_file.filename:
-            filename = secure_filename(image_file.filename)
-            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-            filename = f"{timestamp}_{filename}"
-            
-            # Create directory if it doesn't exist
-            upload_dir = os.path.join(current_app.static_folder, 'uploads', 'menu_items')
-            os.makedirs(upload_dir, exist_ok=True)
-            
-            # Save file
-            file_path = os.path.join(upload_dir, filename)
-            image_file.save(file_path)
-            
-            # Store relative path
-            image_path = f"/static/uploads/menu_items/{filename}"
+            file_path, image_path = store_upload(image_file)
         
         # Parse options if provided
         options = None
@@ -258,6 +272,9 @@ def create_item(category_id):
         db.session.add(item)
         db.session.commit()
         
+        if file_path:
+            enqueue_image_processing(MenuItem, item.id, 'image', 'image_variants', file_path, image_path)
+        
         return jsonify({
             'success': True,
             'data': item.to_dict()
@@ -270,32 +287,18 @@ def create_item(category_id):
 @login_required
 def update_item(item_id):
     """API endpoint to update a menu item"""
-    item = MenuItem.query.join(MenuCategory, Menu).filter(
-        MenuItem.id == item_id,
-        Menu.user_id == current_user.id
-    ).first_or_404()
+    item = get_item_or_404(item_id, 'edit')
     
     # Handle form data with file upload
+    file_path = None
     if request.content_type and 'multipart/form-data' in request.content_type:
         data = request.form.to_dict()
         image_file = request.files.get('image')
         
         # Save image if provided
         if image_file and image_file.filename:
-            filename = secure_filename(image_file.filename)
-            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-            filename = f"{timestamp}_{filename}"
-            
-            # Create directory if it doesn't exist
-            upload_dir = os.path.join(current_app.static_folder, 'uploads', 'menu_items')
-            os.makedirs(upload_dir, exist_ok=True)
-            
-            # Save file
-            file_path = os.path.join(upload_dir, filename)
-            image_file.save(file_path)
-            
-            # Store relative path
-            item.image = f"/static/uploads/menu_items/{filename}"
+            file_path, item.image = store_upload(image_file)
+            item.image_variants = None
         
         # Parse options if provided
         if 'options' in data:
@@ -311,6 +314,7 @@ def update_item(item_id):
         
         if 'image' in data:
             item.image = data['image']
+            item.image_variants = None
         
         if 'options' in data:
             item.options = json.dumps(data['options']) if data['options'] else None
@@ -336,6 +340,10 @@ def update_item(item_id):
     
     try:
         db.session.commit()
+        
+        if file_path:
+            enqueue_image_processing(MenuItem, item.id, 'image', 'image_variants', file_path, item.image)
+        
         return jsonify({
             'success': True,
             'data': item.to_dict()
@@ -348,10 +356,7 @@ def update_item(item_id):
 @login_required
 def delete_item(item_id):
     """API endpoint to delete a menu item"""
-    item = MenuItem.query.join(MenuCategory, Menu).filter(
-        MenuItem.id == item_id,
-        Menu.user_id == current_user.id
-    ).first_or_404()
+    item = get_item_or_404(item_id, 'edit')
     
     try:
         db.session.delete(item)
@@ -361,13 +366,18 @@ def delete_item(item_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+# Public menu pages are cached per viewer until the menu, its categories or
+# items change (see services/pages.py); misses read from the primary so a
+# lagging replica is never cached
 @menu_bp.route('/menu/<custom_url>', methods=['GET'])
+@result_cache.cached('menu_by_url', 'menu_url', lambda custom_url: custom_url, vary=lambda: current_user.get_id())
 def view_menu_by_custom_url(custom_url):
     """Public endpoint to view a menu by custom URL"""
     menu = Menu.query.filter_by(custom_url=custom_url, is_published=True).first_or_404()
     return render_template('menu/view.html', menu=menu)
 
 @menu_bp.route('/menu/<int:menu_id>', methods=['GET'])
+@result_cache.cached('menu', 'menu', lambda menu_id: menu_id, vary=lambda: current_user.get_id())
 def view_menu(menu_id):
     """Public endpoint to view a menu by ID"""
     menu = Menu.query.filter_by(id=menu_id, is_published=True).first_or_404()
@@ -383,5 +393,5 @@ def menu_dashboard():
 @login_required
 def edit_menu(menu_id):
     """Dashboard page for editing a specific menu"""
-    menu = Menu.query.filter_by(id=menu_id, user_id=current_user.id).first_or_404()
+    menu = get_menu_or_404(menu_id, 'edit')
     return render_template('dashboard/menu_edit.html', menu=menu)
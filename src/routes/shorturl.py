@@ -1,8 +1,12 @@
 from flask import Blueprint, request, redirect, render_template, jsonify, abort, url_for, current_app
 from src.models.shorturl import ShortURL, URLAnalytics, db
 from src.models.user import User
+from src.services.clicks import record_url_click
+from src.services.cache import result_cache
+from src.services.redirects import resolve_short_code, invalidate_short_code
+from src.extensions import replica_reads
+from src.routes.user import view_profile
 from datetime import datetime, timedelta
-import validators
 from flask_login import login_required, current_user
 import json
 
@@ -21,7 +25,8 @@ def shorten_url():
     domain = data.get('domain')
     expires_days = data.get('expires_days')
     
-    # Validate URL
+    # Validate URL (validators is slow to import, so load it on first use)
+    import validators
     if not validators.url(original_url):
         return jsonify({'error': 'Invalid URL format'}), 400
     
@@ -52,6 +57,8 @@ def shorten_url():
         )
         db.session.add(short_url)
         db.session.commit()
+        # The code may have been looked up (and cached as unknown) before
+        invalidate_short_code(short_url.short_code)
         
         # Generate QR code
         qr_code_path = short_url.save_qr_code()
@@ -72,32 +79,30 @@ def shorten_url():
         return jsonify({'error': str(e)}), 500
 
 @shorturl_bp.route('/<short_code>')
+@replica_reads
 def redirect_to_url(short_code):
     """Redirect to the original URL from a short code"""
-    # Find the short URL
-    short_url = ShortURL.query.filter_by(short_code=short_code).first_or_404()
+    # Short codes and usernames share the top-level path; codes win and
+    # anything else is a profile (see src/asgi.py for the same rule)
+    resolved = resolve_short_code(short_code)
+    if resolved is None:
+        return view_profile(username=short_code)
+    status, short_url_id, original_url = resolved
     
-    # Check if URL is active and not expired
-    if not short_url.is_active:
+    # Inactive or expired
+    if status == 410:
         abort(410)  # Gone
     
-    if short_url.expires_at and short_url.expires_at < datetime.utcnow():
-        abort(410)  # Gone
-    
-    # Record analytics
-    analytics = URLAnalytics(
-        short_url_id=short_url.id,
+    # Record analytics and increment click count
+    record_url_click(
+        short_url_id,
         referrer=request.referrer,
         user_agent=request.user_agent.string,
         ip_address=request.remote_addr
     )
-    db.session.add(analytics)
-    
-    # Increment click count
-    short_url.increment_click()
     
     # Redirect to the original URL
-    return redirect(short_url.original_url)
+    return redirect(original_url)
 
 @shorturl_bp.route('/dashboard/urls', methods=['GET'])
 @login_required
@@ -108,6 +113,7 @@ def user_urls():
 
 @shorturl_bp.route('/api/urls', methods=['GET'])
 @login_required
+@replica_reads
 def get_user_urls():
     """API endpoint to get user's shortened URLs"""
     user_urls = ShortURL.query.filter_by(user_id=current_user.id).order_by(ShortURL.created_at.desc()).all()
@@ -118,6 +124,7 @@ def get_user_urls():
 
 @shorturl_bp.route('/api/urls/<int:url_id>', methods=['GET'])
 @login_required
+@result_cache.cached('url_details', 'url', lambda url_id: url_id, vary=lambda: current_user.id)
 def get_url_details(url_id):
     """API endpoint to get details of a specific shortened URL"""
     url = ShortURL.query.filter_by(id=url_id, user_id=current_user.id).first_or_404()
@@ -172,6 +179,7 @@ def get_url_details(url_id):
 def update_url(url_id):
     """API endpoint to update a shortened URL"""
     url = ShortURL.query.filter_by(id=url_id, user_id=current_user.id).first_or_404()
+    old_code = url.short_code
     
     data = request.get_json()
     if not data:
@@ -200,6 +208,9 @@ def update_url(url_id):
     
     try:
         db.session.commit()
+        result_cache.bump('url', url.id)
+        invalidate_short_code(old_code)
+        invalidate_short_code(url.short_code)
         return jsonify({
             'success': True,
             'data': url.to_dict()
@@ -213,10 +224,13 @@ def update_url(url_id):
 def delete_url(url_id):
     """API endpoint to delete a shortened URL"""
     url = ShortURL.query.filter_by(id=url_id, user_id=current_user.id).first_or_404()
+    short_code = url.short_code
     
     try:
         db.session.delete(url)
         db.session.commit()
+        result_cache.bump('url', url_id)
+        invalidate_short_code(short_code)
         return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
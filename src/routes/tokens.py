@@ -0,0 +1,80 @@
+from flask import Blueprint, request, jsonify, g
+from src.models.user import APIToken, db
+from src.services.tokens import issue_token, revoke_token, revocations_changed
+from flask_login import login_required, current_user
+
+tokens_bp = Blueprint('tokens', __name__)
+
+def session_only():
+    """Token management needs a browser session, so a leaked token can't mint new ones"""
+    if g.get('api_token_prefix'):
+        return jsonify({'error': 'API tokens cannot manage API tokens'}), 403
+    return None
+
+@tokens_bp.route('/api/tokens', methods=['GET'])
+@login_required
+def get_tokens():
+    """API endpoint to list the user's API tokens"""
+    denied = session_only()
+    if denied:
+        return denied
+
+    tokens = APIToken.query.filter_by(user_id=current_user.id).order_by(APIToken.created_at.desc()).all()
+    return jsonify({
+        'success': True,
+        'data': [token.to_dict() for token in tokens]
+    })
+
+@tokens_bp.route('/api/tokens', methods=['POST'])
+@login_required
+def create_token():
+    """API endpoint to create an API token; the token is only returned once"""
+    denied = session_only()
+    if denied:
+        return denied
+
+    data = request.get_json()
+    if not data or not data.get('name'):
+        return jsonify({'error': 'Missing required fields'}), 400
+
+    expires_days = data.get('expires_days')
+    if expires_days is not None and (not isinstance(expires_days, int) or expires_days <= 0):
+        return jsonify({'error': 'expires_days must be a positive integer'}), 400
+
+    try:
+        token, secret = issue_token(current_user.id, data['name'][:100], expires_days)
+        db.session.commit()
+
+        data = token.to_dict()
+        data['token'] = secret
+        return jsonify({
+            'success': True,
+            'data': data
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@tokens_bp.route('/api/tokens/<int:token_id>', methods=['DELETE'])
+@login_required
+def delete_token(token_id):
+    """API endpoint to revoke an API token"""
+    denied = session_only()
+    if denied:
+        return denied
+
+    token = APIToken.query.filter_by(id=token_id, user_id=current_user.id).first_or_404()
+    if token.revoked_at:
+        return jsonify({'success': True, 'data': token.to_dict()})
+
+    try:
+        revoke_token(token)
+        db.session.commit()
+        revocations_changed()
+        return jsonify({
+            'success': True,
+            'data': token.to_dict()
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -2,11 +2,16 @@ from flask import Blueprint, request, render_template, jsonify, redirect, url_fo
 from src.models.user import User, Link, db
 from src.models.menu import Menu
 from src.models.shorturl import ShortURL
+from src.services.images import enqueue_image_processing
+from src.services.storage import store_upload
+from src.services.clicks import record_link_click
+from src.services.cache import result_cache
+from src.services.redirects import resolve_link, invalidate_user_links
+from src.services.ordering import LINK_ORDER, bulk_reorder_links, move_link, next_link_key
+from src.services.pages import invalidate_profiles
+from src.extensions import replica_reads
 from flask_login import login_required, current_user
 import json
-import os
-from werkzeug.utils import secure_filename
-from datetime import datetime
 
 user_bp = Blueprint('user', __name__)
 
@@ -27,30 +32,33 @@ def update_profile():
     if not data:
         return jsonify({'error': 'No data provided'}), 400
     
+    # current_user is a cached snapshot; changes go through the real row
+    user = User.query.get_or_404(current_user.id)
+    
     # Update fields
     if 'full_name' in data:
-        current_user.full_name = data['full_name']
+        user.full_name = data['full_name']
     
     if 'bio' in data:
-        current_user.bio = data['bio']
+        user.bio = data['bio']
     
     if 'theme' in data:
-        current_user.theme = data['theme']
+        user.theme = data['theme']
     
     if 'social_links' in data:
-        current_user.set_social_links(data['social_links'])
+        user.set_social_links(data['social_links'])
     
     if 'custom_domain' in data:
-        current_user.custom_domain = data['custom_domain']
+        user.custom_domain = data['custom_domain']
     
     if 'profile_settings' in data:
-        current_user.set_profile_settings(data['profile_settings'])
+        user.set_profile_settings(data['profile_settings'])
     
     try:
         db.session.commit()
         return jsonify({
             'success': True,
-            'data': current_user.to_dict(include_private=True)
+            'data': user.to_dict(include_private=True)
         })
     except Exception as e:
         db.session.rollback()
@@ -67,39 +75,35 @@ def update_profile_image():
     if image_file.filename == '':
         return jsonify({'error': 'No image file selected'}), 400
     
-    # Save image
-    filename = secure_filename(image_file.filename)
-    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-    filename = f"{timestamp}_{filename}"
-    
-    # Create directory if it doesn't exist
-    upload_dir = os.path.join('src/static/uploads/profiles')
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Save file
-    file_path = os.path.join(upload_dir, filename)
-    image_file.save(file_path)
+    # Save the original; resized variants are generated in the background
+    file_path, public_path = store_upload(image_file)
     
     # Update user profile
-    current_user.profile_image = f"/static/uploads/profiles/{filename}"
+    user = User.query.get_or_404(current_user.id)
+    user.profile_image = public_path
+    user.profile_image_variants = None
     
     try:
         db.session.commit()
-        return jsonify({
-            'success': True,
-            'data': {
-                'profile_image': current_user.profile_image
-            }
-        })
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
+    
+    enqueue_image_processing(User, user.id, 'profile_image', 'profile_image_variants', file_path, public_path)
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'profile_image': user.profile_image
+        }
+    })
 
 @user_bp.route('/api/links', methods=['GET'])
 @login_required
+@replica_reads
 def get_user_links():
     """API endpoint to get user's links"""
-    links = Link.query.filter_by(user_id=current_user.id).order_by(Link.display_order).all()
+    links = Link.query.filter_by(user_id=current_user.id).order_by(*LINK_ORDER).all()
     return jsonify({
         'success': True,
         'data': [link.to_dict() for link in links]
@@ -134,8 +138,10 @@ def create_link():
         if 'settings' in data:
             link.set_settings(data['settings'])
         
+        link.sort_key = next_link_key(current_user.id)
         db.session.add(link)
         db.session.commit()
+        result_cache.bump('user', current_user.id)
         
         return jsonify({
             'success': True,
@@ -194,6 +200,8 @@ def update_link(link_id):
     
     try:
         db.session.commit()
+        result_cache.bump('user', current_user.id)
+        invalidate_user_links(current_user.id)
         return jsonify({
             'success': True,
             'data': link.to_dict()
@@ -211,6 +219,8 @@ def delete_link(link_id):
     try:
         db.session.delete(link)
         db.session.commit()
+        result_cache.bump('user', current_user.id)
+        invalidate_user_links(current_user.id)
         return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
@@ -219,23 +229,40 @@ def delete_link(link_id):
 @user_bp.route('/api/links/reorder', methods=['POST'])
 @login_required
 def reorder_links():
-    """API endpoint to reorder links"""
+    """API endpoint to reorder links
+    
+    Accepts either a single move ({"link_id", "after_id"/"before_id"}), which
+    only rewrites the moved link, or a full list ({"links": [{"id", "display_order"}]}).
+    """
     data = request.get_json()
     
-    if not data or 'links' not in data:
+    if not data or ('links' not in data and 'link_id' not in data):
         return jsonify({'error': 'Missing links data'}), 400
     
+    link = None
+    if 'link_id' in data:
+        link = Link.query.filter_by(id=data['link_id'], user_id=current_user.id).first_or_404()
+    
     try:
-        for item in data['links']:
-            link_id = item.get('id')
-            display_order = item.get('display_order')
+        if link:
+            if move_link(link, before_id=data.get('before_id'), after_id=data.get('after_id')) is None:
+                return jsonify({'error': 'Anchor link not found'}), 404
             
-            if link_id and display_order is not None:
-                link = Link.query.filter_by(id=link_id, user_id=current_user.id).first()
-                if link:
-                    link.display_order = display_order
+            db.session.commit()
+            return jsonify({
+                'success': True,
+                'data': {'id': link.id, 'sort_key': link.sort_key}
+            })
+        
+        orders = [
+            (item.get('id'), item.get('display_order'))
+            for item in data['links']
+            if item.get('id') and item.get('display_order') is not None
+        ]
+        bulk_reorder_links(current_user.id, orders)
         
         db.session.commit()
+        invalidate_profiles([current_user.id])
         return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
@@ -270,8 +297,10 @@ def add_menu_to_profile():
             reference_id=menu.id
         )
         
+        link.sort_key = next_link_key(current_user.id)
         db.session.add(link)
         db.session.commit()
+        result_cache.bump('user', current_user.id)
         
         return jsonify({
             'success': True,
@@ -310,8 +339,10 @@ def add_shorturl_to_profile():
             reference_id=shorturl.id
         )
         
+        link.sort_key = next_link_key(current_user.id)
         db.session.add(link)
         db.session.commit()
+        result_cache.bump('user', current_user.id)
         
         return jsonify({
             'success': True,
@@ -322,12 +353,17 @@ def add_shorturl_to_profile():
         return jsonify({'error': str(e)}), 500
 
 @user_bp.route('/<username>', methods=['GET'])
+@result_cache.cached('profile', 'profile', lambda username: username, vary=lambda: current_user.get_id())
 def view_profile(username):
-    """Public endpoint to view a user's profile"""
-    user = User.query.filter_by(username=username, is_active=True).first_or_404()
+    """Public endpoint to view a user's profile
+
+    Cached per viewer until the profile changes (see services/pages.py).
+    Misses read from the primary so a lagging replica is never cached.
+    """
+    user = User.query.filter_by(username=username, is_active=True, is_public=True).first_or_404()
     
     # Get active links ordered by display_order
-    links = Link.query.filter_by(user_id=user.id, is_active=True).order_by(Link.display_order).all()
+    links = Link.query.filter_by(user_id=user.id, is_active=True).order_by(*LINK_ORDER).all()
     
     # Get featured links
     featured_links = [link for link in links if link.is_featured]
@@ -349,18 +385,22 @@ def view_profile(username):
 @user_bp.route('/l/<username>/<int:link_id>', methods=['GET'])
 def redirect_link(username, link_id):
     """Redirect to a link and track click"""
-    link = Link.query.join(User).filter(
-        Link.id == link_id,
-        User.username == username,
-        Link.is_active == True,
-        User.is_active == True
-    ).first_or_404()
-    
-    # Increment click count
-    link.increment_click()
+    resolved = resolve_link(username, link_id)
+    if resolved is None:
+        abort(404)
+    _, link_id, owner_id, url = resolved
+    
+    # Record the click event and increment click count
+    record_link_click(
+        link_id,
+        owner_id,
+        referrer=request.referrer,
+        user_agent=request.user_agent.string,
+        ip_address=request.remote_addr
+    )
     
     # Redirect to the URL
-    return redirect(link.url)
+    return redirect(url)
 
 @user_bp.route('/dashboard', methods=['GET'])
 @login_required
@@ -0,0 +1,170 @@
+from src.models.advanced_features import AdvancedAnalytics, db
+from src.models.user import Link, LinkClick
+from sqlalchemy import func
+from datetime import timedelta
+import numpy as np
+
+MOVING_AVERAGE_WINDOWS = (7, 28)
+SHARE_PERCENTILES = (50, 75, 90, 99)
+
+# Extra history loaded before the window so the first days of the range
+# already have full moving-average and week-over-week values
+LOOKBACK_DAYS = max(MOVING_AVERAGE_WINDOWS + (8,)) - 1
+
+
+def load_daily_series(user_id, start_date, end_date):
+    """Dense per-day arrays for [start_date, end_date] from one range query
+
+    Days without a row are zero (NaN for bounce rate).
+    """
+    rows = db.session.query(
+        AdvancedAnalytics.date,
+        AdvancedAnalytics.total_views,
+        AdvancedAnalytics.unique_visitors,
+        AdvancedAnalytics.bounce_rate
+    ).filter(
+        AdvancedAnalytics.user_id == user_id,
+        AdvancedAnalytics.date >= start_date,
+        AdvancedAnalytics.date <= end_date
+    ).all()
+
+    length = (end_date - start_date).days + 1
+    series = {
+        'dates': np.arange(np.datetime64(start_date), np.datetime64(end_date + timedelta(days=1))),
+        'views': np.zeros(length),
+        'visitors': np.zeros(length),
+        'bounce_rate': np.full(length, np.nan)
+    }
+    if rows:
+        dates, views, visitors, bounce_rates = zip(*rows)
+        index = (np.array(dates, dtype='datetime64[D]') - series['dates'][0]).astype(int)
+        series['views'][index] = np.array(views, dtype=float)
+        series['visitors'][index] = np.array(visitors, dtype=float)
+        series['bounce_rate'][index] = np.array(bounce_rates, dtype=float)
+    return series
+
+
+def moving_average(values, window):
+    """Trailing moving average; NaN until a full window is available"""
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        cumulative = np.cumsum(np.concatenate(([0.0], values)))
+        result[window - 1:] = (cumulative[window:] - cumulative[:-window]) / window
+    return result
+
+
+def week_over_week(values):
+    """Absolute and relative change against the same weekday one week earlier"""
+    delta = np.full(len(values), np.nan)
+    change = np.full(len(values), np.nan)
+    if len(values) > 7:
+        previous = values[:-7]
+        delta[7:] = values[7:] - previous
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change[7:] = np.where(previous > 0, delta[7:] / previous, np.nan)
+    return delta, change
+
+
+def link_click_share(user_id, start_date, end_date):
+    """Each link's share of the user's link clicks with its percentile rank, plus share percentiles
+
+    Clicks are the only thing recorded per link (profile views aren't), so
+    this is a share of clicks rather than a click-through rate; both sides
+    come from link_clicks for the same range.
+    """
+    links = Link.query.with_entities(Link.id, Link.title).filter(Link.user_id == user_id).all()
+    if not links:
+        return {'percentiles': {}, 'links': []}
+
+    clicks = dict(db.session.query(LinkClick.link_id, func.count(LinkClick.id)).filter(
+        LinkClick.user_id == user_id,
+        LinkClick.click_time >= start_date,
+        LinkClick.click_time < end_date + timedelta(days=1)
+    ).group_by(LinkClick.link_id).all())
+
+    link_ids = np.array([link_id for link_id, _ in links])
+    click_counts = np.array([clicks.get(link_id, 0) for link_id, _ in links], dtype=float)
+    total_clicks = click_counts.sum()
+    share = click_counts / total_clicks if total_clicks else np.zeros(len(links))
+
+    # Percentile rank = share of links with a click share at or below this one
+    ranks = np.searchsorted(np.sort(share), share, side='right') / len(share) * 100
+    percentiles = np.percentile(share, SHARE_PERCENTILES)
+
+    titles = [title for _, title in links]
+    return {
+        'percentiles': {f"p{p}": round(float(value), 4) for p, value in zip(SHARE_PERCENTILES, percentiles)},
+        'links': [
+            {'id': int(link_id), 'title': title, 'clicks': int(count), 'share': round(float(rate), 4), 'percentile': round(float(rank), 1)}
+            for link_id, title, count, rate, rank in zip(link_ids, titles, click_counts, share, ranks)
+        ]
+    }
+
+
+def _to_json(values, decimals=4):
+    """Array -> list with NaN replaced by None"""
+    rounded = np.round(values.astype(float), decimals)
+    return np.where(np.isnan(rounded), None, rounded).tolist()
+
+
+def _window_totals(series, window):
+    """Totals over a slice of the series"""
+    views = series['views'][window]
+    bounce = series['bounce_rate'][window]
+    return {
+        'views': float(views.sum()),
+        'visitors': float(series['visitors'][window].sum()),
+        'avg_bounce_rate': float(np.nanmean(bounce)) if np.any(~np.isnan(bounce)) else None
+    }
+
+
+def compute_time_series(user_id, start_date, end_date, compare=None):
+    """Time series with moving averages and week-over-week deltas
+
+    With compare='previous_period' the preceding window of the same length
+    is loaded in the same query and summarized alongside the current one.
+    """
+    length = (end_date - start_date).days + 1
+    history = LOOKBACK_DAYS + (length if compare == 'previous_period' else 0)
+    series = load_daily_series(user_id, start_date - timedelta(days=history), end_date)
+
+    views = series['views']
+    averages = {window: moving_average(views, window) for window in MOVING_AVERAGE_WINDOWS}
+    wow_delta, wow_change = week_over_week(views)
+
+    current = slice(len(views) - length, None)
+    time_series = [
+        dict(zip(('date', 'views', 'visitors', 'bounce_rate', 'views_ma7', 'views_ma28', 'views_wow_delta', 'views_wow_change'), values))
+        for values in zip(
+            np.datetime_as_string(series['dates'][current]).tolist(),
+            series['views'][current].astype(int).tolist(),
+            series['visitors'][current].astype(int).tolist(),
+            _to_json(series['bounce_rate'][current]),
+            _to_json(averages[7][current]),
+            _to_json(averages[28][current]),
+            _to_json(wow_delta[current]),
+            _to_json(wow_change[current])
+        )
+    ]
+
+    result = {
+        'time_series': time_series,
+        'totals': _window_totals(series, current)
+    }
+
+    if compare == 'previous_period':
+        previous = slice(len(views) - 2 * length, len(views) - length)
+        current_totals = result['totals']
+        previous_totals = _window_totals(series, previous)
+        result['comparison'] = {
+            'previous_start': (start_date - timedelta(days=length)).isoformat(),
+            'previous_end': (start_date - timedelta(days=1)).isoformat(),
+            'previous': previous_totals,
+            'change': {
+                key: (current_totals[key] - previous_totals[key]) / previous_totals[key]
+                if previous_totals[key] else None
+                for key in ('views', 'visitors')
+            }
+        }
+
+    return result
@@ -0,0 +1,225 @@
+from flask import current_app
+from src.models.advanced_features import AdvancedAnalytics, ETLCheckpoint, db
+from src.models.shorturl import ShortURL, URLAnalytics
+from src.models.user import LinkClick
+from src.services.rollups import apply_deltas, diff, snapshot
+from src.services.cache import result_cache
+from src.services import workers
+from sqlalchemy import distinct, func, union_all
+from collections import Counter
+from datetime import date, datetime, timedelta
+from urllib.parse import urlparse
+
+URL_SOURCE = 'analytics_etl.url_analytics'
+LINK_SOURCE = 'analytics_etl.link_clicks'
+
+
+def _url_clicks():
+    """Short URL clicks attributed to the URL owner"""
+    return db.session.query(
+        URLAnalytics.id.label('id'),
+        ShortURL.user_id.label('user_id'),
+        URLAnalytics.click_time.label('click_time'),
+        URLAnalytics.device_type.label('device_type'),
+        URLAnalytics.country.label('country'),
+        URLAnalytics.referrer.label('referrer')
+    ).join(ShortURL, URLAnalytics.short_url_id == ShortURL.id).filter(ShortURL.user_id.isnot(None))
+
+
+def _link_clicks():
+    """Profile link clicks attributed to the link owner"""
+    return db.session.query(
+        LinkClick.id.label('id'),
+        LinkClick.user_id.label('user_id'),
+        LinkClick.click_time.label('click_time'),
+        LinkClick.device_type.label('device_type'),
+        LinkClick.country.label('country'),
+        LinkClick.referrer.label('referrer')
+    )
+
+
+# Checkpoint name -> (query factory, id column used as the high-water mark)
+SOURCES = {
+    URL_SOURCE: (_url_clicks, URLAnalytics.id),
+    LINK_SOURCE: (_link_clicks, LinkClick.id),
+}
+
+
+def referrer_label(referrer):
+    """Group referrers by host so the breakdown stays small"""
+    if not referrer:
+        return 'Direct'
+    host = urlparse(referrer).netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    return host or 'Other'
+
+
+def high_water_marks():
+    """Current checkpoint of every source, creating missing checkpoints at 0"""
+    marks = {
+        checkpoint.name: checkpoint.high_water_mark
+        for checkpoint in ETLCheckpoint.query.filter(ETLCheckpoint.name.in_(list(SOURCES)))
+    }
+    missing = [name for name in SOURCES if name not in marks]
+    if missing:
+        for name in missing:
+            db.session.add(ETLCheckpoint(name))
+            marks[name] = 0
+        db.session.commit()
+    return marks
+
+
+def datetime_floor(day):
+    """Midnight at the start of day"""
+    return datetime.combine(day, datetime.min.time())
+
+
+def _unique_visitors(user_ids, first_day, last_day, marks):
+    """Distinct visitor IPs per (user, day) across both click sources, up to the given marks"""
+    start = datetime_floor(first_day)
+    end = datetime_floor(last_day + timedelta(days=1))
+
+    url_visits = db.session.query(
+        ShortURL.user_id.label('user_id'),
+        func.date(URLAnalytics.click_time).label('day'),
+        URLAnalytics.ip_address.label('ip_address')
+    ).join(ShortURL, URLAnalytics.short_url_id == ShortURL.id).filter(
+        URLAnalytics.id <= marks[URL_SOURCE],
+        ShortURL.user_id.in_(user_ids),
+        URLAnalytics.click_time >= start,
+        URLAnalytics.click_time < end
+    )
+    link_visits = db.session.query(
+        LinkClick.user_id.label('user_id'),
+        func.date(LinkClick.click_time).label('day'),
+        LinkClick.ip_address.label('ip_address')
+    ).filter(
+        LinkClick.id <= marks[LINK_SOURCE],
+        LinkClick.user_id.in_(user_ids),
+        LinkClick.click_time >= start,
+        LinkClick.click_time < end
+    )
+
+    visits = union_all(url_visits.statement, link_visits.statement).subquery()
+    rows = db.session.query(
+        visits.c.user_id, visits.c.day, func.count(distinct(visits.c.ip_address))
+    ).group_by(visits.c.user_id, visits.c.day).all()
+
+    # SQLite returns date() as text, MySQL as a date
+    return {(user_id, date.fromisoformat(str(day)[:10])): count for user_id, day, count in rows}
+
+
+def _merge_counts(current, counts):
+    """Add a Counter into a JSON breakdown dictionary"""
+    merged = dict(current)
+    for key, count in counts.items():
+        merged[key] = merged.get(key, 0) + count
+    return merged
+
+
+def process_chunk(name, marks, chunk_size=5000, lag_seconds=None):
+    """Aggregate the next chunk of clicks from one source into daily rows and rollups
+
+    Returns the number of click events consumed. The checkpoint, daily rows
+    and rollups are committed together, and the checkpoint only advances if
+    no other worker moved it first, so concurrent runs never double count.
+
+    Ids are assigned at INSERT but transactions may commit out of order, so a
+    lower id can become visible after a higher one. The chunk therefore stops
+    at the first click younger than lag_seconds (ETL_LAG_SECONDS); a later
+    run picks up from there once the writers before it have committed.
+    Buffered clicks carry the time of the click, not of the write, so the
+    ASGI server drops those it can't write within CLICK_MAX_DELAY, which
+    it requires to be below the lag.
+    """
+    if lag_seconds is None:
+        lag_seconds = current_app.config.get('ETL_LAG_SECONDS', 30)
+    cutoff = datetime.utcnow() - timedelta(seconds=lag_seconds)
+
+    query, id_column = SOURCES[name]
+    rows = query().filter(id_column > marks[name]).order_by(id_column).limit(chunk_size).all()
+    for index, row in enumerate(rows):
+        if row.click_time >= cutoff:
+            rows = rows[:index]
+            break
+    if not rows:
+        return 0
+
+    new_mark = rows[-1].id
+
+    # Aggregate events per (user, day)
+    groups = {}
+    for row in rows:
+        key = (row.user_id, row.click_time.date())
+        group = groups.setdefault(key, {'views': 0, 'device': Counter(), 'location': Counter(), 'referrer': Counter()})
+        group['views'] += 1
+        group['device'][row.device_type or 'unknown'] += 1
+        group['location'][row.country or 'Unknown'] += 1
+        group['referrer'][referrer_label(row.referrer)] += 1
+
+    user_ids = {user_id for user_id, _ in groups}
+    days = {day for _, day in groups}
+    visitors = _unique_visitors(user_ids, min(days), max(days), dict(marks, **{name: new_mark}))
+
+    existing = {
+        (record.user_id, record.date): record
+        for record in AdvancedAnalytics.query.filter(
+            AdvancedAnalytics.user_id.in_(user_ids),
+            AdvancedAnalytics.date.in_(days)
+        )
+    }
+
+    deltas = []
+    for key, group in groups.items():
+        record = existing.get(key)
+        previous = snapshot(record) if record else None
+        if record is None:
+            record = AdvancedAnalytics(user_id=key[0], date=key[1])
+            db.session.add(record)
+
+        record.total_views = (record.total_views or 0) + group['views']
+        record.unique_visitors = visitors.get(key, record.unique_visitors or 0)
+        record.set_device_data(_merge_counts(record.get_device_data(), group['device']))
+        record.set_location_data(_merge_counts(record.get_location_data(), group['location']))
+        record.set_referrer_data(_merge_counts(record.get_referrer_data(), group['referrer']))
+
+        deltas.append((key[0], key[1], diff(snapshot(record), previous)))
+
+    apply_deltas(deltas)
+
+    # Advance the checkpoint only if nobody else did (several workers may run the job)
+    advanced = ETLCheckpoint.query.filter_by(name=name, high_water_mark=marks[name]).update(
+        {ETLCheckpoint.high_water_mark: new_mark, ETLCheckpoint.updated_at: datetime.utcnow()},
+        synchronize_session=False
+    )
+    if advanced != 1:
+        db.session.rollback()
+        marks.update(high_water_marks())
+        return 0
+
+    db.session.commit()
+    marks[name] = new_mark
+
+    # New daily rows and rollups are visible: invalidate cached analytics
+    for user_id in user_ids:
+        result_cache.bump('user', user_id)
+    return len(rows)
+
+
+def run_etl(chunk_size=5000, lag_seconds=None):
+    """Process every click recorded since the last run (and at least lag_seconds ago), chunk by chunk"""
+    marks = high_water_marks()
+    processed = 0
+    for name in SOURCES:
+        while True:
+            count = process_chunk(name, marks, chunk_size, lag_seconds)
+            if not count:
+                break
+            processed += count
+    return processed
+
+
+def start_etl_worker(app, interval=60, chunk_size=5000):
+    """Run the ETL periodically on a background thread"""
+    return workers.start_periodic('analytics-etl', app, run_etl, interval, chunk_size=chunk_size)
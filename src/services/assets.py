@@ -0,0 +1,202 @@
+from flask import current_app, request, send_from_directory
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+
+# Fingerprinted static assets. `flask build-assets` copies every asset to
+# static/dist/ under a name containing a hash of its content, writes .gz
+# and .br siblings for text assets and records the names in
+# static/dist/manifest.json. url_for('static', filename=...) then points
+# at the fingerprinted copy. Those copies never change, so they are
+# served with a one year immutable Cache-Control and in the best
+# precompressed encoding the client accepts.
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+SKIP_DIRS = {DIST_DIR, 'uploads', 'qrcodes'}  # Build output and user content
+ASSET_EXTENSIONS = {'.css', '.js', '.svg', '.png', '.jpg', '.jpeg', '.gif', '.webp', '.ico', '.woff', '.woff2', '.json'}
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.ico'}
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))  # Preferred first
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+_CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def _source_files(static_folder):
+    """Paths (relative, '/' separated) of the assets to build, CSS last"""
+    found = []
+    for root, dirs, files in os.walk(static_folder):
+        if root == static_folder:
+            dirs[:] = [name for name in dirs if name not in SKIP_DIRS]
+        for name in files:
+            if os.path.splitext(name)[1].lower() in ASSET_EXTENSIONS:
+                found.append(os.path.relpath(os.path.join(root, name), static_folder).replace(os.sep, '/'))
+    # CSS may reference the other assets by their fingerprinted names
+    return sorted(found, key=lambda path: (path.endswith('.css'), path))
+
+
+def _fingerprinted(path, content):
+    stem, extension = posixpath.splitext(path)
+    return f"{DIST_DIR}/{stem}.{hashlib.sha256(content).hexdigest()[:12]}{extension}"
+
+
+def _rewrite_css(content, path, output, manifest):
+    """Point url(...) references in a stylesheet at the fingerprinted files"""
+    def replace(match):
+        target = match.group(2).strip()
+        if ':' in target or target.startswith(('/', '#')):
+            return match.group(0)
+        clean = target.split('?', 1)[0].split('#', 1)[0]
+        resolved = posixpath.normpath(posixpath.join(posixpath.dirname(path), clean))
+        if resolved not in manifest:
+            return match.group(0)
+        return f"url({posixpath.relpath(manifest[resolved], posixpath.dirname(output))})"
+
+    return _CSS_URL.sub(replace, content.decode('utf-8')).encode('utf-8')
+
+
+def _optimize_png(content):
+    """Losslessly re-encoded PNG, if that's smaller"""
+    from io import BytesIO
+    from PIL import Image  # Only the build needs Pillow
+
+    with Image.open(BytesIO(content)) as image:
+        buffer = BytesIO()
+        image.save(buffer, 'PNG', optimize=True)
+    optimized = buffer.getvalue()
+    return optimized if len(optimized) < len(content) else content
+
+
+def _compressed(content):
+    """(suffix, bytes) for each encoding that makes the file smaller"""
+    variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+    try:
+        import brotli
+    except ImportError:  # Optional: without it only .gz files are written
+        pass
+    else:
+        variants.append(('.br', brotli.compress(content, quality=11)))
+    return [(suffix, data) for suffix, data in variants if len(data) < len(content)]
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(content)
+    os.replace(temporary, path)
+
+
+def build_assets(static_folder, clean=False):
+    """Fingerprint and precompress the static assets, returns build statistics
+
+    Only assets whose fingerprinted copy doesn't exist yet are written.
+    Files from earlier builds are kept (pages cached by clients or served by
+    workers that haven't restarted yet may still reference them) unless
+    clean is set. The manifest is replaced last, in one step.
+    """
+    manifest = {}
+    stats = {'files': 0, 'built': 0, 'bytes': 0, 'compressed_bytes': 0}
+    for path in _source_files(static_folder):
+        with open(os.path.join(static_folder, path), 'rb') as f:
+            content = f.read()
+
+        extension = posixpath.splitext(path)[1].lower()
+        if extension == '.css':
+            # Hash the rewritten stylesheet so it changes when a referenced file does
+            content = _rewrite_css(content, path, _fingerprinted(path, content), manifest)
+        # Named before PNG optimization, so an unchanged file isn't
+        # optimized and compressed again on every build
+        output = _fingerprinted(path, content)
+        manifest[path] = output
+        stats['files'] += 1
+        if os.path.exists(os.path.join(static_folder, output)):
+            continue
+
+        if extension == '.png':
+            content = _optimize_png(content)
+        _write(os.path.join(static_folder, output), content)
+        stats['built'] += 1
+        stats['bytes'] += len(content)
+
+        if extension in COMPRESSIBLE:
+            for suffix, data in _compressed(content):
+                _write(os.path.join(static_folder, output + suffix), data)
+                stats['compressed_bytes'] += len(data)
+
+    dist = os.path.join(static_folder, DIST_DIR)
+    os.makedirs(dist, exist_ok=True)
+    temporary = os.path.join(dist, f"{MANIFEST}.tmp")
+    with open(temporary, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temporary, os.path.join(dist, MANIFEST))
+
+    if clean:
+        stats['removed'] = _remove_unlisted(dist, static_folder, set(manifest.values()))
+    return stats
+
+
+def _remove_unlisted(dist, static_folder, keep):
+    removed = 0
+    for root, _, files in os.walk(dist):
+        for name in files:
+            full_path = os.path.join(root, name)
+            relative = os.path.relpath(full_path, static_folder).replace(os.sep, '/')
+            base = relative[:-3] if relative.endswith(('.gz', '.br')) else relative
+            if name != MANIFEST and base not in keep:
+                os.remove(full_path)
+                removed += 1
+    return removed
+
+
+def load_manifest(app):
+    """Source path -> fingerprinted path from the last build ({} if none or disabled)"""
+    manifest = app.extensions.get('asset_manifest')
+    if manifest is None:
+        manifest = {}
+        path = os.path.join(app.static_folder, DIST_DIR, MANIFEST)
+        if app.config.get('ASSET_FINGERPRINTS', True) and os.path.exists(path):
+            with open(path) as f:
+                manifest = json.load(f)
+        app.extensions['asset_manifest'] = manifest
+    return manifest
+
+
+def _fingerprint_url(endpoint, values):
+    """url_for('static', filename=...) -> the fingerprinted copy, when there is one"""
+    if endpoint == 'static' and 'filename' in values:
+        values['filename'] = load_manifest(current_app).get(values['filename'], values['filename'])
+
+
+def serve_static(filename):
+    """Static files; fingerprinted ones are immutable and served precompressed if accepted"""
+    if not filename.startswith(f"{DIST_DIR}/"):
+        return current_app.send_static_file(filename)
+
+    static_folder = current_app.static_folder
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = None
+    for encoding, suffix in ENCODINGS:
+        if request.accept_encodings[encoding] and os.path.isfile(os.path.join(static_folder, filename + suffix)):
+            response = send_from_directory(
+                static_folder, filename + suffix, mimetype=mimetype, download_name=posixpath.basename(filename)
+            )
+            response.headers['Content-Encoding'] = encoding
+            break
+    if response is None:
+        response = send_from_directory(static_folder, filename, mimetype=mimetype)
+
+    response.headers['Cache-Control'] = IMMUTABLE
+    if posixpath.splitext(filename)[1].lower() in COMPRESSIBLE:
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_assets(app):
+    """Use fingerprinted asset URLs and serve them with long-lived caching"""
+    app.url_defaults(_fingerprint_url)
+    app.view_functions['static'] = serve_static
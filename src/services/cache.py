@@ -0,0 +1,186 @@
+from flask import current_app, request
+from src.services.metrics import record_cache
+from collections import OrderedDict
+from functools import wraps
+from importlib import import_module
+import threading
+import time
+
+
+class LRUBackend:
+    """In-process, size-bounded LRU cache with optional per-entry TTL
+
+    Any object with the same get/set/delete/incr/get_counter/clear methods
+    can be used as a cache backend instead.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, max_counters=65536):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_counters = max_counters
+        self._data = OrderedDict()
+        self._counters = OrderedDict()
+        self._counter_floor = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key):
+        # Counters live in their own, larger LRU. An evicted counter raises
+        # the floor that unknown counters start from, so its next value is
+        # never one that older cached results were stored under.
+        with self._lock:
+            value = self._counters.get(key, self._counter_floor) + 1
+            self._counters[key] = value
+            self._counters.move_to_end(key)
+            while len(self._counters) > self.max_counters:
+                _, evicted = self._counters.popitem(last=False)
+                self._counter_floor = max(self._counter_floor, evicted)
+            return value
+
+    def get_counter(self, key):
+        with self._lock:
+            value = self._counters.get(key)
+            if value is None:
+                return self._counter_floor
+            self._counters.move_to_end(key)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._counters.clear()
+            self._counter_floor = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+def make_backend(app, namespace, maxsize, ttl=None):
+    """An LRUBackend, or a TieredBackend sharing entries and invalidations when CACHE_REDIS_URL is set"""
+    url = app.config.get('CACHE_REDIS_URL')
+    if not url:
+        return LRUBackend(maxsize=maxsize, ttl=ttl)
+    from src.services.shared_cache import tiered_backend
+
+    return tiered_backend(
+        url, namespace, maxsize=maxsize, ttl=ttl or app.config.get('CACHE_SHARED_TTL'),
+        local_ttl=app.config.get('CACHE_LOCAL_TTL', 30), prefix=app.config.get('CACHE_KEY_PREFIX', 'linkak:'),
+        channel=app.config.get('CACHE_CHANNEL', 'linkak:cache-invalidation')
+    )
+
+
+class ResultCache:
+    """Caches endpoint responses keyed by (scope, query params, data version)
+
+    Every scope (e.g. a user or a short URL) has a version counter stored in
+    the backend. Writers bump the version when the underlying data changes,
+    which makes all older entries for that scope unreachable; they then age
+    out of the LRU. Counters of a per-process backend are per process too,
+    so without CACHE_REDIS_URL entries also expire after RESULT_CACHE_TTL
+    seconds, bounding how long other workers serve results from before a
+    bump.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or LRUBackend()
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configure the backend from RESULT_CACHE_BACKEND ('module:Class'), else make_backend()"""
+        backend_path = app.config.get('RESULT_CACHE_BACKEND')
+        if backend_path:
+            module_name, class_name = backend_path.split(':')
+            backend_class = getattr(import_module(module_name), class_name)
+            self.backend = backend_class(**app.config.get('RESULT_CACHE_OPTIONS', {}))
+        else:
+            ttl = None if app.config.get('CACHE_REDIS_URL') else app.config.get('RESULT_CACHE_TTL', 30)
+            self.backend = make_backend(app, 'result', app.config.get('RESULT_CACHE_SIZE', 1024), ttl=ttl)
+        app.extensions['result_cache'] = self
+
+    def version(self, scope, scope_id, local_only=False):
+        """Current data version of a scope
+
+        With local_only a shared backend answers from memory only, or returns
+        None if it would have to ask the server.
+        """
+        if local_only and hasattr(self.backend, 'get_local_counter'):
+            return self.backend.get_local_counter(f"ver:{scope}:{scope_id}")
+        return self.backend.get_counter(f"ver:{scope}:{scope_id}")
+
+    def bump(self, scope, scope_id):
+        """Advance a scope's data version, invalidating every cached result for it"""
+        return self.backend.incr(f"ver:{scope}:{scope_id}")
+
+    def _record(self, endpoint, hit):
+        record_cache(f"result.{endpoint}", hit)
+        with self._stats_lock:
+            stats = self._stats.setdefault(endpoint, {'hits': 0, 'misses': 0})
+            stats['hits' if hit else 'misses'] += 1
+
+    def stats(self):
+        """Per-endpoint hit/miss counts and hit ratio"""
+        with self._stats_lock:
+            return {
+                endpoint: dict(counts, hit_ratio=counts['hits'] / (counts['hits'] + counts['misses']))
+                for endpoint, counts in self._stats.items()
+            }
+
+    def cached(self, endpoint, scope, scope_id, vary=None):
+        """Decorator caching a view's successful JSON response
+
+        scope_id is called with the view kwargs to find the scope instance;
+        vary may return extra key material (e.g. today's date).
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                instance = scope_id(**kwargs)
+                params = '&'.join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+                key = f"res:{endpoint}:{scope}:{instance}:v{self.version(scope, instance)}:{params}"
+                if vary is not None:
+                    key = f"{key}:{vary()}"
+
+                cached_response = self.backend.get(key)
+                if cached_response is not None:
+                    self._record(endpoint, True)
+                    body, mimetype = cached_response
+                    response = current_app.response_class(body, mimetype=mimetype)
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                self._record(endpoint, False)
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code == 200:
+                    self.backend.set(key, (response.get_data(), response.mimetype))
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+
+result_cache = ResultCache()
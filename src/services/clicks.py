@@ -0,0 +1,118 @@
+from flask import current_app
+from src.models.user import Link, LinkClick
+from src.models.shorturl import ShortURL, URLAnalytics
+from src.services.cache import result_cache
+import os
+import threading
+
+
+class _PendingBumps:
+    """Cache version bumps for clicked URLs and users, applied at most once per interval
+
+    Every click changes url_details and the analytics summary, but bumping
+    their versions on each redirect would make every click a cache write
+    (and, with a shared cache, a round trip plus a broadcast). Scopes
+    clicked within the interval are bumped once when it ends.
+    """
+
+    def __init__(self):
+        self._scopes = set()
+        self._timer = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def add(self, scopes, interval):
+        if not interval:
+            for scope in scopes:
+                result_cache.bump(*scope)
+            return
+        with self._lock:
+            self._scopes.update(scopes)
+            # A timer started before a fork doesn't run in the child
+            if self._timer is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._timer = threading.Timer(interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            scopes, self._scopes = self._scopes, set()
+            self._timer = None
+        for scope in scopes:
+            result_cache.bump(*scope)
+
+
+_pending_bumps = _PendingBumps()
+
+
+def _increment(model, counts):
+    """click_count += n for every id, one UPDATE per distinct n"""
+    by_count = {}
+    for target_id, count in counts.items():
+        by_count.setdefault(count, []).append(target_id)
+    for count, ids in by_count.items():
+        # Increment in SQL so concurrent redirects don't lose updates
+        model.query.filter(model.id.in_(ids)).update(
+            {model.click_count: model.click_count + count},
+            synchronize_session=False
+        )
+
+
+def record_clicks(events):
+    """Store a batch of click events and bump the click counters
+
+    Each event is a dict with kind ('url' or 'link'), target_id (short URL
+    or link id), owner_id (the link owner, for links), referrer,
+    user_agent, ip_address and optionally click_time.
+    """
+    session = ShortURL.query.session
+    url_counts = {}
+    link_counts = {}
+    owners = set()
+    for event in events:
+        if event['kind'] == 'url':
+            record = URLAnalytics(
+                short_url_id=event['target_id'],
+                referrer=event.get('referrer'),
+                user_agent=event.get('user_agent'),
+                ip_address=event.get('ip_address')
+            )
+            url_counts[event['target_id']] = url_counts.get(event['target_id'], 0) + 1
+        else:
+            record = LinkClick(
+                link_id=event['target_id'],
+                user_id=event['owner_id'],
+                referrer=event.get('referrer'),
+                user_agent=event.get('user_agent'),
+                ip_address=event.get('ip_address')
+            )
+            link_counts[event['target_id']] = link_counts.get(event['target_id'], 0) + 1
+            owners.add(event['owner_id'])
+        if event.get('click_time'):
+            record.click_time = event['click_time']
+        session.add(record)
+
+    _increment(ShortURL, url_counts)
+    _increment(Link, link_counts)
+    session.commit()
+
+    # Link click-through rates are read straight from the click events
+    scopes = {('url', url_id) for url_id in url_counts} | {('user', user_id) for user_id in owners}
+    _pending_bumps.add(scopes, current_app.config.get('CLICK_BUMP_INTERVAL', 1.0))
+
+
+def record_url_click(short_url_id, referrer=None, user_agent=None, ip_address=None):
+    """Store a click event for a short URL and bump its click counter"""
+    record_clicks([{
+        'kind': 'url', 'target_id': short_url_id,
+        'referrer': referrer, 'user_agent': user_agent, 'ip_address': ip_address
+    }])
+
+
+def record_link_click(link_id, user_id, referrer=None, user_agent=None, ip_address=None):
+    """Store a click event for a profile link (owned by user_id) and bump its click counter"""
+    record_clicks([{
+        'kind': 'link', 'target_id': link_id, 'owner_id': user_id,
+        'referrer': referrer, 'user_agent': user_agent, 'ip_address': ip_address
+    }])
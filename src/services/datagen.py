@@ -0,0 +1,322 @@
+from src.extensions import db, _sqlite_pragmas
+from src.models.user import User, Link
+from src.models.shorturl import ShortURL, URLAnalytics, detect_client
+from src.models.menu import Menu, MenuCategory, MenuItem
+from src.services import workers
+from src.services.ordering import even_keys
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, create_engine, func
+from werkzeug.security import generate_password_hash
+import logging
+import os
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+# Synthetic volumes for scale testing. Rows are bulk inserted with
+# executemany (pymysql turns that into multi-row INSERTs) with explicit ids
+# continuing after the existing ones, so nothing has to be read back.
+# Clicks are generated in parallel processes, each with its own connection.
+
+PASSWORD = 'password'  # Every generated account's password
+
+# (value, weight) mixes for the generated clicks
+USER_AGENTS = [
+    ('Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1', 30),
+    ('Mozilla/5.0 (Linux; Android 13; Pixel 7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0 Mobile Safari/537.36', 25),
+    ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0 Safari/537.36', 20),
+    ('Mozilla/5.0 (Macintosh; Intel Mac OS X 13_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.6 Safari/605.1.15', 8),
+    ('Mozilla/5.0 (X11; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/118.0', 4),
+    ('Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/118.0', 4),
+    ('Mozilla/5.0 (iPad; CPU OS 16_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.6 Mobile/15E148 Safari/604.1', 4),
+    ('Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)', 3),
+    ('curl/8.1.2', 2),
+]
+REFERRERS = [
+    (None, 40),
+    ('https://www.google.com/', 18),
+    ('https://t.co/', 12),
+    ('https://www.instagram.com/', 10),
+    ('https://www.facebook.com/', 8),
+    ('https://www.linkedin.com/', 5),
+    ('https://www.reddit.com/', 4),
+    ('https://news.ycombinator.com/', 2),
+    ('https://mail.example.com/newsletter', 1),
+]
+LOCATIONS = [
+    (('US', 'New York'), 20), (('US', 'San Francisco'), 10), (('GB', 'London'), 12),
+    (('DE', 'Berlin'), 8), (('FR', 'Paris'), 7), (('IN', 'Bengaluru'), 10),
+    (('BR', 'Sao Paulo'), 7), (('JP', 'Tokyo'), 6), (('NG', 'Lagos'), 5),
+    (('AU', 'Sydney'), 5), ((None, None), 10),
+]
+LINK_CATEGORIES = ['Social', 'Work', 'Personal', 'Shop', None]
+CODE_ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+
+
+def _next_id(model):
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def _insert(model, rows, batch_size):
+    """executemany INSERT of rows (dicts with the same keys) in batches"""
+    table = model.__table__
+    for offset in range(0, len(rows), batch_size):
+        db.session.execute(table.insert(), rows[offset:offset + batch_size])
+        db.session.commit()
+
+
+def synthetic_code(id):
+    """Unique 8-character short code for a generated id
+
+    Multiplying by a constant coprime to 62**8 scatters consecutive ids
+    over the whole code space (it's a bijection), so codes look random and
+    never collide with each other.
+    """
+    value = (id * 9_769_837_103) % 62 ** 8
+    digits = []
+    for _ in range(8):
+        value, digit = divmod(value, 62)
+        digits.append(CODE_ALPHABET[digit])
+    return ''.join(digits)
+
+
+def generate_entities(users=1000, links_per_user=10, urls_per_user=20, menus=200, categories=6, items=10,
+                      days=90, seed=42, batch_size=5000):
+    """Insert users, links, short URLs and menus, returns (counts, short URL ids)"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    password_hash = generate_password_hash(PASSWORD)  # Hashing per user would dominate the run
+
+    def created():
+        return now - timedelta(seconds=rng.uniform(0, days * 86400))
+
+    first_user = _next_id(User)
+    user_ids = list(range(first_user, first_user + users))
+    user_rows = []
+    for user_id in user_ids:
+        stamp = created()
+        user_rows.append({
+            'id': user_id,
+            'username': f"user{user_id:07d}",
+            'email': f"user{user_id:07d}@example.com",
+            'password_hash': password_hash,
+            'full_name': f"User {user_id}",
+            'bio': 'Generated account',
+            'is_active': True,
+            'is_public': True,
+            'is_admin': False,
+            'theme': 'default',
+            'created_at': stamp,
+            'updated_at': stamp,
+        })
+    _insert(User, user_rows, batch_size)
+
+    keys = even_keys(links_per_user)
+    link_rows = []
+    next_link = _next_id(Link)
+    for user_id in user_ids:
+        for order, key in enumerate(keys):
+            stamp = created()
+            link_rows.append({
+                'id': next_link,
+                'title': f"Link {order + 1}",
+                'url': f"https://example.com/u{user_id}/{order}",
+                'user_id': user_id,
+                'category': rng.choice(LINK_CATEGORIES),
+                'is_active': rng.random() > 0.05,
+                'is_featured': order < 2,
+                'display_order': order,
+                'sort_key': key,
+                'click_count': 0,
+                'link_type': 'standard',
+                'created_at': stamp,
+                'updated_at': stamp,
+            })
+            next_link += 1
+    _insert(Link, link_rows, batch_size)
+
+    first_url = _next_id(ShortURL)
+    url_ids = list(range(first_url, first_url + users * urls_per_user))
+    _insert(ShortURL, [{
+        'id': url_id,
+        'original_url': f"https://example.com/articles/{url_id}?utm_source=linkak",
+        'short_code': synthetic_code(url_id),
+        'user_id': user_ids[(url_id - first_url) // urls_per_user],
+        'created_at': now - timedelta(days=days),
+        'click_count': 0,
+        'is_active': rng.random() > 0.02,
+    } for url_id in url_ids], batch_size)
+
+    menu_rows, category_rows, item_rows = [], [], []
+    next_menu, next_category, next_item = _next_id(Menu), _next_id(MenuCategory), _next_id(MenuItem)
+    for _ in range(menus):
+        stamp = created()
+        menu_rows.append({
+            'id': next_menu, 'name': 'Menu', 'user_id': rng.choice(user_ids),
+            'business_name': f"Business {next_menu}", 'theme': 'default',
+            'is_published': rng.random() < 0.8, 'created_at': stamp, 'updated_at': stamp,
+        })
+        for c in range(categories):
+            category_rows.append({
+                'id': next_category, 'name': f"Category {c + 1}", 'menu_id': next_menu,
+                'display_order': c, 'created_at': stamp, 'updated_at': stamp,
+            })
+            for i in range(items):
+                item_rows.append({
+                    'id': next_item, 'name': f"Item {c + 1}.{i + 1}", 'description': 'Generated item',
+                    'price': round(rng.uniform(2, 40), 2), 'category_id': next_category,
+                    'is_available': rng.random() > 0.1, 'is_featured': i == 0, 'display_order': i,
+                    'created_at': stamp, 'updated_at': stamp,
+                })
+                next_item += 1
+            next_category += 1
+        next_menu += 1
+    _insert(Menu, menu_rows, batch_size)
+    _insert(MenuCategory, category_rows, batch_size)
+    _insert(MenuItem, item_rows, batch_size)
+
+    counts = {
+        'users': users, 'links': len(link_rows), 'short_urls': len(url_ids),
+        'menus': len(menu_rows), 'menu_categories': len(category_rows), 'menu_items': len(item_rows),
+    }
+    return counts, url_ids
+
+
+def _cdf(weights):
+    import numpy as np
+
+    weights = np.asarray(weights, dtype=float)
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+
+def _click_chunk(uri, pragmas, url_ids, first_id, position, count, total, chunk, seed, zipf, days, end, batch_size):
+    """Generate and insert clicks position .. position + count of total; runs in a worker process
+
+    Ids and click times both grow with the position, as they do for real
+    clicks. Returns the number of clicks per entry of url_ids.
+    """
+    import numpy as np
+
+    _sqlite_pragmas.clear()
+    _sqlite_pragmas.update(pragmas)
+    engine = create_engine(uri)
+    table = URLAnalytics.__table__
+
+    rng = np.random.default_rng([seed, chunk])
+    # url_ids is ordered most popular first; rank k gets weight 1 / k**zipf
+    popularity = _cdf(1.0 / np.arange(1, len(url_ids) + 1) ** zipf)
+    agents = [(agent, *detect_client(agent)) for agent, _ in USER_AGENTS]
+    agent_cdf = _cdf([weight for _, weight in USER_AGENTS])
+    referrers = [referrer for referrer, _ in REFERRERS]
+    referrer_cdf = _cdf([weight for _, weight in REFERRERS])
+    locations = [location for location, _ in LOCATIONS]
+    location_cdf = _cdf([weight for _, weight in LOCATIONS])
+    start = end - timedelta(days=days)
+    url_array = np.asarray(url_ids)
+    totals = np.zeros(len(url_ids), dtype=np.int64)
+
+    try:
+        for offset in range(0, count, batch_size):
+            size = min(batch_size, count - offset)
+            ranks = np.minimum(np.searchsorted(popularity, rng.random(size)), len(url_ids) - 1)
+            totals += np.bincount(ranks, minlength=len(url_ids))
+            agent_index = np.searchsorted(agent_cdf, rng.random(size))
+            referrer_index = np.searchsorted(referrer_cdf, rng.random(size))
+            location_index = np.searchsorted(location_cdf, rng.random(size))
+            seconds = (position + offset + np.arange(size) + rng.random(size)) / total * days * 86400
+            ips = rng.integers(1, 255, size=(size, 4))
+
+            rows = []
+            for n in range(size):
+                agent, device_type, browser, os_name = agents[agent_index[n]]
+                country, city = locations[location_index[n]]
+                rows.append({
+                    'id': first_id + position + offset + n,
+                    'short_url_id': int(url_array[ranks[n]]),
+                    'click_time': start + timedelta(seconds=float(seconds[n])),
+                    'referrer': referrers[referrer_index[n]],
+                    'user_agent': agent,
+                    'ip_address': '.'.join(map(str, ips[n])),
+                    'country': country,
+                    'city': city,
+                    'device_type': device_type,
+                    'browser': browser,
+                    'os': os_name,
+                })
+            with engine.begin() as connection:
+                connection.execute(table.insert(), rows)
+    finally:
+        engine.dispose()
+    return totals
+
+
+def generate_clicks(url_ids, clicks=1_000_000, zipf=1.1, days=90, seed=42, batch_size=5000, processes=None):
+    """Insert URLAnalytics clicks spread over the last days with Zipfian URL popularity
+
+    The clicks are split into chunks generated by a process pool; each
+    chunk is seeded from (seed, chunk number) so a run is reproducible for
+    the same arguments. Short URL click counts are updated to match.
+    """
+    import numpy as np
+
+    if not url_ids or clicks <= 0:
+        return 0
+
+    engine = db.engine
+    sqlite = engine.dialect.name == 'sqlite'
+    if processes is None:
+        # SQLite allows one writer at a time, so extra processes only queue up
+        processes = 1 if sqlite else min(8, os.cpu_count() or 1)
+    pragmas = dict(_sqlite_pragmas)
+    if sqlite:
+        pragmas['synchronous'] = 'OFF'  # Bulk load; a crash means regenerating anyway
+        pragmas.setdefault('busy_timeout', 30000)
+
+    # Which URLs are popular is random too, not just the lowest ids
+    popularity_order = list(np.random.default_rng([seed, 0xC11C]).permutation(url_ids))
+    first_id = _next_id(URLAnalytics)
+    chunk_size = max(batch_size, -(-clicks // (processes * 4)))
+    chunks = [(offset, min(chunk_size, clicks - offset)) for offset in range(0, clicks, chunk_size)]
+    end = datetime.utcnow()
+
+    pool = workers.get_process_pool('datagen', processes)
+    futures = [
+        pool.submit(
+            _click_chunk, engine.url.render_as_string(hide_password=False), pragmas, popularity_order,
+            first_id, offset, count, clicks, number + 1, seed, zipf, days, end, batch_size
+        )
+        for number, (offset, count) in enumerate(chunks)
+    ]
+    totals = np.zeros(len(url_ids), dtype=np.int64)
+    done = 0
+    for future in futures:
+        totals += future.result()
+        done += 1
+        logger.info("Inserted click chunk %d/%d", done, len(futures))
+
+    updates = [{'url_id': int(url_id), 'clicks': int(total)} for url_id, total in zip(popularity_order, totals) if total]
+    table = ShortURL.__table__
+    statement = table.update().where(table.c.id == bindparam('url_id')).values(
+        click_count=table.c.click_count + bindparam('clicks')
+    )
+    for offset in range(0, len(updates), batch_size):
+        db.session.execute(statement, updates[offset:offset + batch_size])
+        db.session.commit()
+    return clicks
+
+
+def generate_dataset(users=1000, links_per_user=10, urls_per_user=20, menus=200, categories=6, items=10,
+                     clicks=1_000_000, zipf=1.1, days=90, seed=42, batch_size=5000, processes=None):
+    """Generate a production-sized dataset, returns row counts and the seconds taken"""
+    started = time.perf_counter()
+    counts, url_ids = generate_entities(
+        users=users, links_per_user=links_per_user, urls_per_user=urls_per_user, menus=menus,
+        categories=categories, items=items, days=days, seed=seed, batch_size=batch_size
+    )
+    counts['url_analytics'] = generate_clicks(
+        url_ids, clicks=clicks, zipf=zipf, days=days, seed=seed, batch_size=batch_size, processes=processes
+    )
+    counts['seconds'] = round(time.perf_counter() - started, 1)
+    return counts
@@ -0,0 +1,84 @@
+from flask_login import UserMixin
+from src.models.user import User
+from src.services.cache import LRUBackend, make_backend
+from src.services.metrics import record_cache
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+# Columns copied into the cached snapshot (everything but the password hash)
+SNAPSHOT_FIELDS = (
+    'id', 'username', 'email', 'full_name', 'bio', 'profile_image', 'profile_image_variants',
+    'is_public', 'is_admin', 'theme', 'social_links', 'custom_domain', 'profile_settings', 'created_at', 'updated_at'
+)
+
+_identities = LRUBackend(maxsize=4096, ttl=60)
+
+
+class UserSnapshot(UserMixin):
+    """Detached, read-only copy of a User row used as current_user
+
+    Reads work like on User; to change the account, load the real row with
+    load() and commit it, which invalidates the cached snapshot.
+    """
+
+    def __init__(self, user):
+        for field in SNAPSHOT_FIELDS:
+            setattr(self, field, getattr(user, field))
+        self._is_active = bool(user.is_active)
+
+    @property
+    def is_active(self):
+        return self._is_active
+
+    def load(self):
+        """The full User model for this snapshot"""
+        return User.query.get(self.id)
+
+    # Read-only helpers shared with the model
+    get_social_links = User.get_social_links
+    get_profile_settings = User.get_profile_settings
+    get_profile_image_variants = User.get_profile_image_variants
+    to_dict = User.to_dict
+
+
+def init_identity_cache(app):
+    """Size and TTL of the identity cache from IDENTITY_CACHE_SIZE / IDENTITY_CACHE_TTL"""
+    global _identities
+    _identities = make_backend(
+        app, 'identity', app.config.get('IDENTITY_CACHE_SIZE', 4096), app.config.get('IDENTITY_CACHE_TTL', 60)
+    )
+
+
+def load_identity(user_id):
+    """flask-login user loader: a cached snapshot, reading the users table only on a miss"""
+    snapshot = _identities.get(user_id)
+    record_cache('identity', snapshot is not None)
+    if snapshot is None:
+        user = User.query.get(user_id)
+        if user is None:
+            return None
+        snapshot = UserSnapshot(user)
+        _identities.set(user_id, snapshot)
+    return snapshot
+
+
+def invalidate_identity(user_id):
+    """Drop a user's cached snapshot"""
+    _identities.delete(user_id)
+
+
+# Any committed ORM change to a User drops its snapshot. Bulk UPDATEs bypass
+# these events and must call invalidate_identity themselves.
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _mark_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_user_ids', set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        invalidate_identity(user_id)
@@ -0,0 +1,129 @@
+from flask import current_app
+from src.services import workers
+import json
+import os
+
+# Variant name -> maximum width in pixels, largest first so each size is
+# downscaled from the previous one instead of from the original
+IMAGE_VARIANTS = (
+    ('full', 1200),
+    ('card', 480),
+    ('thumb', 160),
+)
+
+# Output formats: (extension, Pillow format, save options)
+IMAGE_FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpeg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+
+def to_public_path(file_path, static_root):
+    """Convert a path inside the static folder to its public URL path"""
+    relative = os.path.relpath(file_path, static_root).replace(os.sep, '/')
+    return f"/static/{relative}"
+
+
+def existing_variants(base_path, static_root):
+    """Variants previously generated for a blob, or None if any are missing"""
+    from PIL import Image
+
+    variants = {}
+    for name, _ in IMAGE_VARIANTS:
+        entry = {}
+        for extension, _, _ in IMAGE_FORMATS:
+            output_path = f"{base_path}_{name}.{extension}"
+            if not os.path.exists(output_path):
+                return None
+            entry[extension] = to_public_path(output_path, static_root)
+        with Image.open(output_path) as image:
+            entry['width'], entry['height'] = image.size
+        variants[name] = entry
+    return variants
+
+
+def generate_variants(source_path, static_root):
+    """Decode an image once and write resized, metadata-free WebP/JPEG variants"""
+    # Imported lazily so processes that never touch uploads don't pay for Pillow
+    from PIL import Image, ImageOps
+
+    base_path = os.path.splitext(source_path)[0]
+    variants = existing_variants(base_path, static_root)
+    if variants:
+        # Same content was uploaded before, its variants are already on disk
+        return variants
+
+    variants = {}
+    with Image.open(source_path) as original:
+        # Large JPEGs can be decoded at a reduced scale directly
+        original.draft('RGB', (IMAGE_VARIANTS[0][1], IMAGE_VARIANTS[0][1]))
+        image = ImageOps.exif_transpose(original)
+
+        # Flatten transparency onto white so the JPEG fallback looks right
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.split()[-1])
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        # Drop EXIF/ICC/comments; nothing is passed through to the encoders
+        image.info = {}
+
+        for name, max_width in IMAGE_VARIANTS:
+            if image.width > max_width:
+                height = max(1, round(image.height * max_width / image.width))
+                image = image.resize((max_width, height), Image.LANCZOS)
+
+            entry = {'width': image.width, 'height': image.height}
+            for extension, image_format, options in IMAGE_FORMATS:
+                output_path = f"{base_path}_{name}.{extension}"
+                image.save(output_path, image_format, **options)
+                entry[extension] = to_public_path(output_path, static_root)
+
+            variants[name] = entry
+
+    return variants
+
+
+def process_model_image(model, object_id, image_attr, variants_attr, source_path, public_path):
+    """Background job: build variants for an uploaded image and store them on the model"""
+    variants = generate_variants(source_path, current_app.static_folder)
+
+    obj = model.query.get(object_id)
+    # Skip if the row is gone or a newer upload has replaced this one
+    if obj is None or getattr(obj, image_attr) != public_path:
+        return None
+
+    setattr(obj, variants_attr, json.dumps(variants))
+    setattr(obj, image_attr, variants['full']['jpeg'])
+    model.query.session.commit()
+
+    # The original blob may be shared with other rows, so it is left for the
+    # upload garbage collector rather than removed here
+    return variants
+
+
+def enqueue_image_processing(model, object_id, image_attr, variants_attr, source_path, public_path):
+    """Queue variant generation for an uploaded image on the image worker pool"""
+    app = current_app._get_current_object()
+    return workers.submit(
+        'images', app, process_model_image,
+        model, object_id, image_attr, variants_attr, source_path, public_path,
+        max_workers=app.config.get('IMAGE_WORKERS', 2)
+    )
+
+
+def build_srcset(variants, image_format='webp'):
+    """Template filter: turn a variants dict (or its JSON) into a srcset attribute value"""
+    if isinstance(variants, str):
+        try:
+            variants = json.loads(variants)
+        except json.JSONDecodeError:
+            return ''
+    if not variants:
+        return ''
+
+    entries = sorted(variants.values(), key=lambda entry: entry['width'])
+    return ', '.join(f"{entry[image_format]} {entry['width']}w" for entry in entries if image_format in entry)
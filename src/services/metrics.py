@@ -0,0 +1,121 @@
+from flask import Response, current_app, g, has_request_context, jsonify, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+import hmac
+import os
+import time
+
+# With PROMETHEUS_MULTIPROC_DIR set (see gunicorn.conf.py) every process
+# writes its samples to files in that directory and /metrics adds them up.
+
+REQUEST_LATENCY = Histogram(
+    'linkak_request_duration_seconds', 'Request latency', ['endpoint', 'method'],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+)
+REQUESTS = Counter('linkak_requests_total', 'Requests by status', ['endpoint', 'method', 'status'])
+DB_QUERIES = Counter('linkak_db_queries_total', 'SQL statements executed')
+DB_QUERY_SECONDS = Counter('linkak_db_query_seconds_total', 'Time spent executing SQL')
+REQUEST_DB_QUERIES = Histogram(
+    'linkak_request_db_queries', 'SQL statements per request', ['endpoint'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+)
+REQUEST_DB_SECONDS = Histogram(
+    'linkak_request_db_seconds', 'Time spent in SQL per request', ['endpoint'],
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 5)
+)
+POOL_CHECKOUT_SECONDS = Histogram(
+    'linkak_db_pool_checkout_seconds', 'Wait for a pooled database connection',
+    buckets=(.0001, .0005, .001, .005, .01, .05, .1, .5, 1, 5, 30)
+)
+CACHE_LOOKUPS = Counter('linkak_cache_lookups_total', 'Cache lookups', ['cache', 'result'])
+CLICK_QUEUE_DEPTH = Gauge(
+    'linkak_click_queue_depth', 'Click events waiting to be written', multiprocess_mode='livesum'
+)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited (including connecting)"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started)
+
+
+def record_cache(cache, hit):
+    """Count a hit or miss of one of the in-process caches"""
+    CACHE_LOOKUPS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def record_request(endpoint, method, status, seconds):
+    """Count a request served outside Flask (the ASGI fast path)"""
+    REQUEST_LATENCY.labels(endpoint, method).observe(seconds)
+    REQUESTS.labels(endpoint, method, str(status)).inc()
+
+
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_started
+    DB_QUERIES.inc()
+    DB_QUERY_SECONDS.inc(elapsed)
+    if has_request_context():
+        g.metrics_queries = g.get('metrics_queries', 0) + 1
+        g.metrics_query_seconds = g.get('metrics_query_seconds', 0.0) + elapsed
+
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+
+
+def _finish_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    endpoint = request.endpoint or 'unmatched'
+    REQUEST_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - started)
+    REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+    REQUEST_DB_QUERIES.labels(endpoint).observe(g.get('metrics_queries', 0))
+    REQUEST_DB_SECONDS.labels(endpoint).observe(g.get('metrics_query_seconds', 0.0))
+    return response
+
+
+def metrics_view():
+    """Prometheus exposition of every metric, summed over processes in multiprocess mode"""
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), headers={'Content-Type': CONTENT_TYPE_LATEST})
+
+
+def init_metrics(app):
+    """Instrument requests, SQL and the connection pool and serve /metrics (unless METRICS_ENABLED is off)"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        # Copy: the options dict is shared with the config class
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(app.config['SQLALCHEMY_ENGINE_OPTIONS'], poolclass=TimedQueuePool)
+
+    # Engine-wide, so only attached once however many apps are created
+    if not event.contains(Engine, 'before_cursor_execute', _query_started):
+        event.listen(Engine, 'before_cursor_execute', _query_started)
+        event.listen(Engine, 'after_cursor_execute', _query_finished)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,212 @@
+from src.extensions import db
+from src.models.user import User, Link, LinkClick
+from src.models.shorturl import ShortURL, URLAnalytics
+from src.models.menu import Menu, MenuCategory, MenuItem
+from src.models.advanced_features import AdvancedAnalytics, Collaboration
+from src.services.scheduler import due_jobs_query
+from src.services.ordering import LINK_ORDER, even_keys
+from sqlalchemy import MetaData, Table, Column, String, DateTime, bindparam, event, inspect, select
+from sqlalchemy.schema import CreateColumn
+from datetime import date, datetime, timedelta
+
+# Applied migrations are recorded here, one row per version
+_meta = MetaData()
+schema_migrations = Table(
+    'schema_migrations', _meta,
+    Column('version', String(32), primary_key=True),
+    Column('description', String(255), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+def _create_missing_columns(connection):
+    """ALTER TABLE ADD COLUMN for model columns the database doesn't have yet"""
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+            added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def _create_missing_indexes(connection):
+    """CREATE INDEX for model indexes the database doesn't have yet"""
+    inspector = inspect(connection)
+    created = []
+    for table in db.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(connection)
+                created.append(index.name)
+    return created
+
+
+def baseline(connection):
+    """Bring any earlier schema up to the models: new tables, columns and hot-path indexes
+
+    Databases created by db.create_all() before migrations existed are
+    missing the columns added since (image variants, link sort keys,
+    scheduler leases) and every secondary index.
+    """
+    db.metadata.create_all(connection)
+    _create_missing_columns(connection)
+    _create_missing_indexes(connection)
+
+
+def profile_visibility(connection):
+    """users.is_public, so hiding a profile no longer deactivates the account
+
+    Existing accounts are public. Scheduled profile jobs used to toggle
+    is_active; accounts they hid stay inactive until reactivated.
+    """
+    _create_missing_columns(connection)
+    connection.execute(User.__table__.update().where(User.__table__.c.is_public.is_(None)).values(is_public=True))
+
+
+def backfill_link_sort_keys(connection, batch_size=1000):
+    """Ordering keys for links created before links.sort_key existed
+
+    Only users with unkeyed links are touched. Their lists are respaced in
+    display order: keyed links first, then the unkeyed ones by
+    display_order.
+    """
+    links = Link.__table__
+    user_ids = [user_id for (user_id,) in connection.execute(
+        select(links.c.user_id).where(links.c.sort_key.is_(None)).distinct()
+    )]
+    update = links.update().where(links.c.id == bindparam('link_id')).values(sort_key=bindparam('key'))
+    for start in range(0, len(user_ids), batch_size):
+        rows = connection.execute(select(links.c.id, links.c.user_id).where(
+            links.c.user_id.in_(user_ids[start:start + batch_size])
+        ).order_by(
+            links.c.user_id, links.c.sort_key.is_(None), links.c.sort_key, links.c.display_order, links.c.id
+        ))
+        per_user = {}
+        for link_id, user_id in rows:
+            per_user.setdefault(user_id, []).append(link_id)
+        mappings = [
+            {'link_id': link_id, 'key': key}
+            for link_ids in per_user.values()
+            for link_id, key in zip(link_ids, even_keys(len(link_ids)))
+        ]
+        if mappings:
+            connection.execute(update, mappings)
+
+
+# (version, description, upgrade function) in the order they are applied.
+# Each runs in its own transaction together with its schema_migrations row;
+# append new entries, never edit applied ones.
+MIGRATIONS = [
+    ('0001', 'Baseline schema with hot-path composite indexes', baseline),
+    ('0002', 'Profile visibility flag separate from account activation', profile_visibility),
+    ('0003', 'Backfill ordering keys of links created before sort_key', backfill_link_sort_keys),
+]
+
+
+def applied_versions(connection):
+    _meta.create_all(connection)
+    return {row.version for row in connection.execute(select(schema_migrations.c.version))}
+
+
+def pending_migrations(engine=None):
+    """Migrations not yet applied to the database"""
+    engine = engine or db.engine
+    with engine.begin() as connection:
+        applied = applied_versions(connection)
+    return [migration for migration in MIGRATIONS if migration[0] not in applied]
+
+
+def upgrade(engine=None):
+    """Apply every pending migration, returns the versions applied"""
+    engine = engine or db.engine
+    applied = []
+    for version, description, migrate in pending_migrations(engine):
+        with engine.begin() as connection:
+            migrate(connection)
+            connection.execute(schema_migrations.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow()
+            ))
+        applied.append(version)
+    return applied
+
+
+# Queries on the request and worker hot paths, checked by explain_hot_queries().
+# Each takes sample values so the planner sees realistic bound parameters.
+HOT_QUERIES = {
+    'dashboard links': lambda s: Link.query.filter_by(user_id=s['user_id']).order_by(*LINK_ORDER),
+    'profile links': lambda s: Link.query.filter_by(user_id=s['user_id'], is_active=True).order_by(*LINK_ORDER),
+    'short url redirect': lambda s: ShortURL.query.filter_by(short_code='demo'),
+    'user short urls': lambda s: ShortURL.query.filter_by(user_id=s['user_id']).order_by(ShortURL.created_at.desc()),
+    'short url analytics': lambda s: URLAnalytics.query.filter_by(short_url_id=s['id']).order_by(
+        URLAnalytics.click_time.desc()),
+    'user menus': lambda s: Menu.query.filter_by(user_id=s['user_id']).order_by(Menu.created_at.desc()),
+    'menu categories': lambda s: MenuCategory.query.filter_by(menu_id=s['id']).order_by(MenuCategory.display_order),
+    'category items': lambda s: MenuItem.query.filter_by(category_id=s['id']).order_by(MenuItem.display_order),
+    'analytics range': lambda s: AdvancedAnalytics.query.filter(
+        AdvancedAnalytics.user_id == s['user_id'],
+        AdvancedAnalytics.date >= s['today'] - timedelta(days=30),
+        AdvancedAnalytics.date <= s['today']),
+    'link clicks range': lambda s: db.session.query(LinkClick.link_id, db.func.count(LinkClick.id)).filter(
+        LinkClick.user_id == s['user_id'],
+        LinkClick.click_time >= s['now'] - timedelta(days=30)).group_by(LinkClick.link_id),
+    'due scheduled jobs': lambda s: due_jobs_query(s['now']).limit(1000),
+    'collaborator acl': lambda s: Collaboration.query.filter_by(collaborator_id=s['user_id']),
+}
+
+
+def _plan_uses_full_scan(dialect, rows):
+    if dialect == 'sqlite':
+        # "SCAN links" reads the whole table; "SCAN links USING INDEX ..." and
+        # "SEARCH ..." don't
+        return any(row[-1].startswith('SCAN ') and ' USING ' not in row[-1] for row in rows)
+    if dialect == 'mysql':
+        return any(row._mapping.get('type') == 'ALL' for row in rows)
+    return False
+
+
+def explain_hot_queries(samples=None):
+    """EXPLAIN output for every hot query: [{'name', 'sql', 'plan', 'full_scan'}]
+
+    Each query is compiled by running it once and capturing the statement
+    and parameters the driver receives, then explained with the same
+    parameters (EXPLAIN QUERY PLAN on SQLite, EXPLAIN elsewhere).
+    """
+    now = datetime.utcnow()
+    samples = dict({'user_id': 1, 'id': 1, 'today': date.today(), 'now': now}, **(samples or {}))
+    engine = db.engine
+    prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    report = []
+    for name, build in HOT_QUERIES.items():
+        captured.clear()
+        event.listen(engine, 'before_cursor_execute', capture)
+        try:
+            build(samples).all()
+        finally:
+            event.remove(engine, 'before_cursor_execute', capture)
+        statement, parameters = captured[-1]
+
+        rows = db.session.connection().exec_driver_sql(prefix + statement, parameters).fetchall()
+        report.append({
+            'name': name,
+            'sql': statement,
+            'plan': [row[-1] if engine.dialect.name == 'sqlite' else ' '.join(str(value) for value in row if value is not None)
+                     for row in rows],
+            'full_scan': _plan_uses_full_scan(engine.dialect.name, rows),
+        })
+    db.session.rollback()
+    return report
@@ -0,0 +1,214 @@
+from src.models.user import Link, db
+from sqlalchemy import case, inspect, text
+import math
+
+# Ordering keys are base-36 fractions written without the leading "0." and
+# without trailing zeros, so plain string comparison gives numeric order and
+# there is always room for another key between two existing ones. Only
+# lowercase letters and digits are used so case-insensitive MySQL collations
+# sort them the same way as SQLite.
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+
+# Appending or moving to the top keeps lengthening keys by about one digit
+# every five operations; past this length the user's list is respaced with
+# even_keys(). Far below the 255 characters of links.sort_key.
+MAX_KEY_LENGTH = 32
+
+# Display order of a user's links. Links without a key (created before
+# sort_key existed) go after all keyed ones, in their old display_order.
+LINK_ORDER = (Link.sort_key.is_(None), Link.sort_key, Link.display_order, Link.id)
+
+
+def _midpoint(lower, upper):
+    """Key strictly between lower ('' means 0) and upper (None means 1)"""
+    if upper is not None:
+        # Skip the shared prefix, padding lower with zeros
+        n = 0
+        while n < len(upper) and (lower[n] if n < len(lower) else '0') == upper[n]:
+            n += 1
+        if n > 0:
+            return upper[:n] + _midpoint(lower[n:], upper[n:])
+
+    digit_lower = DIGITS.index(lower[0]) if lower else 0
+    digit_upper = DIGITS.index(upper[0]) if upper is not None else BASE
+
+    if digit_upper - digit_lower > 1:
+        return DIGITS[round((digit_lower + digit_upper) / 2)]
+
+    # Adjacent digits: reuse upper's first digit if it's followed by more
+    if upper is not None and len(upper) > 1:
+        return upper[0]
+    return DIGITS[digit_lower] + _midpoint(lower[1:], None)
+
+
+def key_between(lower=None, upper=None):
+    """Ordering key between two keys; None means the start/end of the list"""
+    if lower is not None and upper is not None and lower >= upper:
+        raise ValueError(f"Invalid key range: {lower!r} >= {upper!r}")
+    return _midpoint(lower or '', upper)
+
+
+def even_keys(count):
+    """count evenly spaced keys, used when a whole list is (re)ordered at once"""
+    if count <= 0:
+        return []
+
+    width = max(1, math.ceil(math.log(count + 1, BASE)) + 1)
+    span = BASE ** width
+    keys = []
+    for i in range(1, count + 1):
+        value = span * i // (count + 1)
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        keys.append(''.join(reversed(digits)).rstrip('0'))
+    return keys
+
+
+def rebalance_links(user_id, exclude_id=None):
+    """Respace a user's ordering keys evenly, keeping their order; returns the number of links"""
+    link_ids = [link_id for (link_id,) in Link.query.with_entities(Link.id).filter(
+        Link.user_id == user_id,
+        Link.id != exclude_id
+    ).order_by(*LINK_ORDER)]
+    if not link_ids:
+        return 0
+
+    sort_keys = dict(zip(link_ids, even_keys(len(link_ids))))
+    Link.query.filter(Link.user_id == user_id, Link.id.in_(link_ids)).update({
+        Link.sort_key: case(sort_keys, value=Link.id)
+    }, synchronize_session=False)
+    return len(link_ids)
+
+
+def _has_unkeyed_links(user_id):
+    return db.session.query(Link.query.filter(
+        Link.user_id == user_id, Link.sort_key.is_(None)
+    ).exists()).scalar()
+
+
+def next_link_key(user_id):
+    """Key that places a new link after all of the user's existing links"""
+    if _has_unkeyed_links(user_id):
+        # Key them first, or the new link would be placed before them
+        rebalance_links(user_id)
+    last_key = db.session.query(db.func.max(Link.sort_key)).filter(Link.user_id == user_id).scalar()
+    key = key_between(last_key, None)
+    if len(key) > MAX_KEY_LENGTH:
+        rebalance_links(user_id)
+        return next_link_key(user_id)
+    return key
+
+
+def move_link(link, before_id=None, after_id=None):
+    """Move a single link next to another one
+
+    Only that link's row changes, unless its new key would be longer than
+    MAX_KEY_LENGTH; then the user's other links are respaced first. Links
+    without a key are keyed (in their display order) before moving.
+    """
+    if _has_unkeyed_links(link.user_id):
+        db.session.flush()
+        rebalance_links(link.user_id)
+        db.session.refresh(link)
+
+    siblings = Link.query.with_entities(Link.sort_key).filter(
+        Link.user_id == link.user_id,
+        Link.id != link.id,
+        Link.sort_key.isnot(None)
+    )
+
+    if after_id is not None:
+        anchor = siblings.filter(Link.id == after_id).first()
+        if anchor is None:
+            return None
+        lower = anchor.sort_key
+        upper = siblings.filter(Link.sort_key > lower).order_by(Link.sort_key).first()
+        upper = upper.sort_key if upper else None
+    elif before_id is not None:
+        anchor = siblings.filter(Link.id == before_id).first()
+        if anchor is None:
+            return None
+        upper = anchor.sort_key
+        lower = siblings.filter(Link.sort_key < upper).order_by(Link.sort_key.desc()).first()
+        lower = lower.sort_key if lower else None
+    else:
+        # No anchor: move to the top of the list
+        lower = None
+        upper = siblings.order_by(Link.sort_key).first()
+        upper = upper.sort_key if upper else None
+
+    key = key_between(lower, upper)
+    if len(key) > MAX_KEY_LENGTH:
+        rebalance_links(link.user_id, exclude_id=link.id)
+        return move_link(link, before_id=before_id, after_id=after_id)
+    link.sort_key = key
+    return link.sort_key
+
+
+def bulk_reorder_links(user_id, orders):
+    """Apply a full reorder in one UPDATE ... CASE statement scoped to the user
+
+    orders is a list of (link_id, display_order) pairs. Every link of the
+    user gets a new key: the listed ones in the given order, then the ones
+    left out, in their current order. Returns the number of links listed.
+    """
+    if not orders:
+        return 0
+
+    current = [link_id for (link_id,) in Link.query.with_entities(Link.id).filter(
+        Link.user_id == user_id
+    ).order_by(*LINK_ORDER)]
+    owned = {str(link_id): link_id for link_id in current}
+
+    display_orders = {}
+    for link_id, display_order in sorted(orders, key=lambda pair: pair[1]):
+        link_id = owned.get(str(link_id))
+        if link_id is not None and link_id not in display_orders:
+            display_orders[link_id] = display_order
+    if not display_orders:
+        return 0
+
+    ordered = list(display_orders) + [link_id for link_id in current if link_id not in display_orders]
+    sort_keys = dict(zip(ordered, even_keys(len(ordered))))
+
+    Link.query.filter(Link.user_id == user_id, Link.id.in_(ordered)).update({
+        Link.display_order: case(display_orders, value=Link.id, else_=Link.display_order),
+        Link.sort_key: case(sort_keys, value=Link.id)
+    }, synchronize_session=False)
+    return len(display_orders)
+
+
+def migrate_link_sort_keys(batch_size=1000):
+    """Add links.sort_key if missing and backfill it from display_order"""
+    inspector = inspect(db.engine)
+    columns = [column['name'] for column in inspector.get_columns('links')]
+    if 'sort_key' not in columns:
+        db.session.execute(text('ALTER TABLE links ADD COLUMN sort_key VARCHAR(255)'))
+        db.session.commit()
+
+    indexes = [index['name'] for index in inspector.get_indexes('links')]
+    if 'ix_links_user_sort_key' not in indexes:
+        db.session.execute(text('CREATE INDEX ix_links_user_sort_key ON links (user_id, sort_key)'))
+        db.session.commit()
+
+    rows = Link.query.with_entities(Link.id, Link.user_id).order_by(
+        Link.user_id, Link.display_order, Link.id
+    ).all()
+
+    # Group link ids per user, preserving the current display order
+    per_user = {}
+    for link_id, user_id in rows:
+        per_user.setdefault(user_id, []).append(link_id)
+
+    mappings = []
+    for link_ids in per_user.values():
+        mappings.extend({'id': link_id, 'sort_key': key} for link_id, key in zip(link_ids, even_keys(len(link_ids))))
+
+    for start in range(0, len(mappings), batch_size):
+        db.session.bulk_update_mappings(Link, mappings[start:start + batch_size])
+    db.session.commit()
+
+    return len(mappings)
@@ -0,0 +1,83 @@
+from src.models.user import User, Link
+from src.models.menu import Menu, MenuCategory, MenuItem
+from src.services.cache import result_cache
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+# The public profile and menu pages are cached in the result cache under
+# 'profile' (username), 'menu' (menu id) and 'menu_url' (custom URL)
+# scopes. Committed ORM changes to the rows a page shows bump its scopes.
+# Bulk UPDATEs bypass these events and must call invalidate_profiles().
+
+
+def invalidate_profiles(user_ids):
+    """Retire the cached profile pages of these users"""
+    if not user_ids:
+        return
+    for (username,) in User.query.with_entities(User.username).filter(User.id.in_(list(user_ids))):
+        result_cache.bump('profile', username)
+
+
+def _changed(target, scopes):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_pages', set()).update(scopes)
+
+
+def _history(target, attribute):
+    """Current and previous values of an attribute"""
+    history = inspect(target).attrs[attribute].history
+    return {value for value in (*history.unchanged, *history.added, *history.deleted) if value is not None}
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    _changed(target, {('profile', username) for username in _history(target, 'username')})
+
+
+@event.listens_for(Link, 'after_insert')
+@event.listens_for(Link, 'after_update')
+@event.listens_for(Link, 'after_delete')
+def _link_changed(mapper, connection, target):
+    usernames = connection.execute(select(User.username).where(User.id.in_(_history(target, 'user_id')))).scalars()
+    _changed(target, {('profile', username) for username in usernames})
+
+
+@event.listens_for(Menu, 'after_update')
+@event.listens_for(Menu, 'after_delete')
+def _menu_changed(mapper, connection, target):
+    _changed(target, {('menu', target.id)} | {('menu_url', url) for url in _history(target, 'custom_url')})
+
+
+def _menus(connection, menu_ids):
+    """'menu' and 'menu_url' scopes of these menus"""
+    scopes = set()
+    for menu_id, custom_url in connection.execute(select(Menu.id, Menu.custom_url).where(Menu.id.in_(menu_ids))):
+        scopes.add(('menu', menu_id))
+        if custom_url:
+            scopes.add(('menu_url', custom_url))
+    return scopes
+
+
+@event.listens_for(MenuCategory, 'after_insert')
+@event.listens_for(MenuCategory, 'after_update')
+@event.listens_for(MenuCategory, 'after_delete')
+def _category_changed(mapper, connection, target):
+    _changed(target, _menus(connection, _history(target, 'menu_id')))
+
+
+@event.listens_for(MenuItem, 'after_insert')
+@event.listens_for(MenuItem, 'after_update')
+@event.listens_for(MenuItem, 'after_delete')
+def _item_changed(mapper, connection, target):
+    menu_ids = connection.execute(
+        select(MenuCategory.menu_id).where(MenuCategory.id.in_(_history(target, 'category_id')))
+    ).scalars().all()
+    _changed(target, _menus(connection, menu_ids))
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_committed(session):
+    for scope in session.info.pop('changed_pages', ()):
+        result_cache.bump(*scope)
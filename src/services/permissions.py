@@ -0,0 +1,82 @@
+from flask import current_app, g, has_request_context
+from src.models.advanced_features import Collaboration
+from src.services.cache import result_cache
+from src.services.metrics import record_cache
+
+PERMISSION_LEVELS = ('view', 'edit', 'admin')
+
+# Each level includes the ones before it
+PERMISSION_RANK = {level: rank for rank, level in enumerate(PERMISSION_LEVELS, 1)}
+
+
+def _acl_key(resource_type, resource_id, owner_id):
+    return f"{resource_type}:{resource_id}:{owner_id}"
+
+
+def load_acl(user_id):
+    """Every grant a user holds as {'type:id:owner': level}, from one indexed query
+
+    The owner is part of the key so a grant only counts when it was made by
+    the resource's real owner.
+    """
+    grants = Collaboration.query.with_entities(
+        Collaboration.resource_type,
+        Collaboration.resource_id,
+        Collaboration.owner_id,
+        Collaboration.permission_level
+    ).filter(Collaboration.collaborator_id == user_id)
+
+    acl = {}
+    for resource_type, resource_id, owner_id, level in grants:
+        key = _acl_key(resource_type, resource_id, owner_id)
+        if PERMISSION_RANK.get(level, 0) > PERMISSION_RANK.get(acl.get(key), 0):
+            acl[key] = level
+    return acl
+
+
+def get_acl(user_id):
+    """A user's ACL map, cached in the result cache backend under the user's 'acl' version
+
+    Entries expire after ACL_CACHE_TTL seconds. invalidate_acl() only
+    reaches other processes when the cache is shared (CACHE_REDIS_URL);
+    otherwise the TTL bounds how long they keep a revoked grant.
+    """
+    key = f"acl:{user_id}:v{result_cache.version('acl', user_id)}"
+    acl = result_cache.backend.get(key)
+    record_cache('acl', acl is not None)
+    if acl is None:
+        acl = load_acl(user_id)
+        result_cache.backend.set(key, acl, ttl=current_app.config.get('ACL_CACHE_TTL', 5))
+    return acl
+
+
+def invalidate_acl(user_id):
+    """Drop a collaborator's cached ACL after their grants changed (in every process only with a shared cache)"""
+    result_cache.bump('acl', user_id)
+
+
+def has_permission(user_id, permission, resource_type, resource_id, owner_id):
+    """Can user_id do permission ('view', 'edit', 'admin') on the resource owned by owner_id
+
+    Owners can do everything. Answers are memoized for the rest of the
+    request, and the ACL itself is cached per user, so checks cost at most
+    one query per user and cache version.
+    """
+    if user_id is None:
+        return False
+    if user_id == owner_id:
+        return True
+
+    memo_key = (user_id, permission, resource_type, resource_id, owner_id)
+    memo = None
+    if has_request_context():
+        memo = g.setdefault('permission_memo', {})
+        if memo_key in memo:
+            return memo[memo_key]
+
+    level = get_acl(user_id).get(_acl_key(resource_type, resource_id, owner_id))
+    allowed = PERMISSION_RANK.get(level, 0) >= PERMISSION_RANK[permission]
+
+    if memo is not None:
+        memo[memo_key] = allowed
+    return allowed
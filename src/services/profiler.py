@@ -0,0 +1,130 @@
+from collections import Counter
+from flask import current_app, g, has_request_context, request
+from flask.logging import default_handler
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import logging
+import re
+import time
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger(f"{__name__}.slow")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"\?|%s|%\(\w+\)s|:\w+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement):
+    """Statement with literals and bound values replaced by ?, so repeats of one query compare equal"""
+    shape = _STRING.sub('?', statement)
+    shape = _PLACEHOLDER.sub('?', shape)
+    shape = _NUMBER.sub('?', shape)
+    shape = _IN_LIST.sub('(?)', shape)  # IN lists of any length
+    return _SPACE.sub(' ', shape).strip()
+
+
+def redact_parameters(parameters, executemany=False):
+    """Parameter types in place of their values, for logs"""
+    if executemany:
+        return f"{len(parameters)} parameter sets"
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    return [type(value).__name__ for value in parameters or ()]
+
+
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    context._profiler_started = time.perf_counter()
+
+
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_profiler_started', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+
+    profile = g.get('sql_profile') if has_request_context() else None
+    if profile is not None:
+        profile['count'] += 1
+        profile['seconds'] += elapsed
+        profile['shapes'][statement_shape(statement)] += 1
+        slow_ms = profile['slow_ms']
+    else:
+        slow_ms = _slow_ms()
+
+    if elapsed * 1000 >= slow_ms:
+        slow_logger.warning(
+            "Slow query (%.1f ms)%s: %s; parameters: %s",
+            elapsed * 1000,
+            f" in {request.endpoint}" if has_request_context() else '',
+            statement_shape(statement),
+            redact_parameters(parameters, executemany)
+        )
+
+
+def _slow_ms():
+    try:
+        return current_app.config.get('SLOW_QUERY_MS', 100)
+    except RuntimeError:  # Engine used outside an app context
+        return 100
+
+
+def _start_profile():
+    g.sql_profile = {
+        'count': 0,
+        'seconds': 0.0,
+        'shapes': Counter(),
+        'slow_ms': current_app.config.get('SLOW_QUERY_MS', 100),
+    }
+
+
+def _finish_profile(response):
+    profile = g.pop('sql_profile', None)
+    if profile is None:
+        return response
+
+    threshold = current_app.config.get('SQL_PROFILER_N_PLUS_ONE', 5)
+    duplicates = {shape: count for shape, count in profile['shapes'].items() if count > 1}
+    endpoint = request.endpoint or 'unmatched'
+
+    logger.info(
+        "%s %s (%s): %d queries in %.1f ms, %d repeated statements",
+        request.method, request.path, endpoint, profile['count'], profile['seconds'] * 1000, len(duplicates)
+    )
+    for shape, count in sorted(duplicates.items(), key=lambda item: -item[1]):
+        if count > threshold:
+            logger.warning("Likely N+1 in %s: %d x %s", endpoint, count, shape)
+
+    if current_app.config.get('SQL_PROFILER_HEADER'):
+        response.headers['X-Query-Count'] = str(profile['count'])
+    return response
+
+
+def init_profiler(app):
+    """Profile SQL per request when SQL_PROFILER is on
+
+    Logs each request's query count, SQL time and repeated statements,
+    warns about statements repeated more than SQL_PROFILER_N_PLUS_ONE times,
+    logs queries slower than SLOW_QUERY_MS to the '...profiler.slow' logger
+    and, with SQL_PROFILER_HEADER, sets X-Query-Count on responses.
+    """
+    if not app.config.get('SQL_PROFILER'):
+        return
+
+    # Listeners are only attached when profiling, so it costs nothing otherwise
+    if not event.contains(Engine, 'before_cursor_execute', _query_started):
+        event.listen(Engine, 'before_cursor_execute', _query_started)
+        event.listen(Engine, 'after_cursor_execute', _query_finished)
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+
+    if app.config.get('SLOW_QUERY_LOG') and not slow_logger.handlers:
+        handler = logging.FileHandler(app.config['SLOW_QUERY_LOG'])
+        handler.setFormatter(logging.Formatter('%(asctime)s %(process)d %(message)s'))
+        slow_logger.addHandler(handler)
+    if not logging.getLogger().handlers and not logger.handlers:
+        # Nothing configured logging; print the reports like Flask's own log
+        logger.addHandler(default_handler)
+        logger.setLevel(logging.INFO)
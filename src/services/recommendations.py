@@ -0,0 +1,323 @@
+from flask import current_app
+from src.models.advanced_features import AIRecommendation, AdvancedAnalytics, AnalyticsDimension, RecommendationRun, db
+from src.models.user import User, Link
+from src.services.ordering import LINK_ORDER
+from src.services import workers
+from sqlalchemy import func
+from datetime import date, datetime, timedelta
+import hashlib
+import json
+
+RECOMMENDATION_TYPES = ('layout', 'content', 'theme')
+
+# Days of analytics the recommendations look at
+ANALYTICS_DAYS = 28
+
+# Below this many (user, type) pairs per batch the builders run inline;
+# starting worker processes costs more than it saves
+POOL_THRESHOLD = 200
+
+TOP_POSITIONS = 3
+MIN_CLICKS = 20
+
+
+def load_features(user_ids, today=None):
+    """Everything the builders need for a batch of users, as plain picklable dicts
+
+    One query each for users, links, daily analytics and device breakdowns.
+    """
+    today = today or date.today()
+    start_date = today - timedelta(days=ANALYTICS_DAYS - 1)
+
+    features = {
+        user_id: {'theme': theme or 'default', 'links': [], 'views': 0, 'bounce_rate': None, 'devices': {}}
+        for user_id, theme in User.query.with_entities(User.id, User.theme).filter(User.id.in_(user_ids))
+    }
+
+    links = Link.query.with_entities(
+        Link.user_id, Link.id, Link.title, Link.category, Link.link_type,
+        Link.is_featured, Link.is_active, Link.click_count
+    ).filter(Link.user_id.in_(user_ids)).order_by(Link.user_id, *LINK_ORDER)
+    for row in links:
+        user_links = features[row.user_id]['links']
+        user_links.append({
+            'id': row.id,
+            'title': row.title,
+            'category': row.category,
+            'link_type': row.link_type or 'standard',
+            'is_featured': bool(row.is_featured),
+            'is_active': bool(row.is_active),
+            'clicks': row.click_count or 0,
+            'position': len(user_links)
+        })
+
+    totals = db.session.query(
+        AdvancedAnalytics.user_id,
+        func.sum(AdvancedAnalytics.total_views),
+        func.avg(AdvancedAnalytics.bounce_rate)
+    ).filter(
+        AdvancedAnalytics.user_id.in_(user_ids),
+        AdvancedAnalytics.date >= start_date,
+        AdvancedAnalytics.date <= today
+    ).group_by(AdvancedAnalytics.user_id)
+    for user_id, views, bounce_rate in totals:
+        features[user_id]['views'] = int(views or 0)
+        features[user_id]['bounce_rate'] = round(float(bounce_rate), 2) if bounce_rate is not None else None
+
+    devices = db.session.query(
+        AnalyticsDimension.user_id, AnalyticsDimension.key, func.sum(AnalyticsDimension.count)
+    ).filter(
+        AnalyticsDimension.user_id.in_(user_ids),
+        AnalyticsDimension.period == 'day',
+        AnalyticsDimension.dimension == 'device',
+        AnalyticsDimension.period_start >= start_date
+    ).group_by(AnalyticsDimension.user_id, AnalyticsDimension.key)
+    for user_id, key, count in devices:
+        features[user_id]['devices'][key] = int(count or 0)
+
+    return features
+
+
+# Feature keys each recommendation type depends on; a type is only
+# regenerated when one of its inputs changed
+TYPE_INPUTS = {
+    'layout': ('links',),
+    'content': ('links', 'views'),
+    'theme': ('theme', 'bounce_rate', 'devices', 'views'),
+}
+
+
+def fingerprint(recommendation_type, features):
+    """Stable hash of the inputs of one recommendation type"""
+    inputs = {key: features[key] for key in TYPE_INPUTS[recommendation_type]}
+    payload = json.dumps([recommendation_type, inputs], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _share(part, total):
+    return part / total if total else 0
+
+
+def build_layout(features):
+    """Suggest featuring and moving up the links that get the most clicks"""
+    links = [link for link in features['links'] if link['is_active']]
+    total = sum(link['clicks'] for link in links)
+    if len(links) < 2 or total < MIN_CLICKS:
+        return None
+
+    top = sorted(links, key=lambda link: (-link['clicks'], link['position']))[:TOP_POSITIONS]
+    changes = [
+        {'type': 'move', 'link_id': link['id'], 'title': link['title'], 'position': 'top'}
+        for link in top if link['position'] >= TOP_POSITIONS
+    ]
+    if not top[0]['is_featured']:
+        changes.append({'type': 'feature', 'link_id': top[0]['id'], 'title': top[0]['title']})
+
+    average = total / len(links)
+    changes.extend(
+        {'type': 'unfeature', 'link_id': link['id'], 'title': link['title']}
+        for link in links if link['is_featured'] and link['clicks'] < average / 2
+    )
+    if not changes:
+        return None
+
+    top_share = _share(sum(link['clicks'] for link in top), total)
+    return {
+        'suggestion': 'Put your most clicked links where visitors see them first',
+        'changes': changes,
+        'reasoning': f"Your top {len(top)} links get {top_share:.0%} of all clicks; "
+                     f"featuring them at the top of your profile makes them easier to reach."
+    }
+
+
+def build_content(features):
+    """Suggest reviewing dead links and adding more of the best performing category"""
+    links = [link for link in features['links'] if link['is_active']]
+    total = sum(link['clicks'] for link in links)
+    if not links or total < MIN_CLICKS:
+        return None
+
+    by_category = {}
+    for link in links:
+        category = link['category'] or 'Uncategorized'
+        counts = by_category.setdefault(category, [0, 0])
+        counts[0] += link['clicks']
+        counts[1] += 1
+
+    changes = [
+        {'type': 'review', 'link_id': link['id'], 'title': link['title'], 'reason': 'no clicks'}
+        for link in links if link['clicks'] == 0
+    ]
+
+    # Best category by clicks per link, if it clearly outperforms the average
+    best, (clicks, count) = max(by_category.items(), key=lambda item: item[1][0] / item[1][1])
+    if len(by_category) > 1 and clicks / count > 1.5 * total / len(links):
+        changes.append({'type': 'add', 'category': best, 'label': f"Add more {best} links"})
+
+    if not changes:
+        return None
+
+    reasoning = f"{len(links)} active links received {total} clicks"
+    if features['views']:
+        reasoning += f" from {features['views']} profile views in the last {ANALYTICS_DAYS} days"
+    return {
+        'suggestion': 'Focus your profile on the content your visitors click',
+        'changes': changes,
+        'reasoning': reasoning + '.'
+    }
+
+
+def build_theme(features):
+    """Suggest theme tweaks from the device mix and bounce rate"""
+    devices = features['devices']
+    visits = sum(devices.values())
+    if visits < MIN_CLICKS:
+        return None
+
+    changes = []
+    reasons = []
+    mobile_share = _share(devices.get('mobile', 0) + devices.get('tablet', 0), visits)
+    if mobile_share >= 0.6:
+        changes.extend([
+            {'type': 'layout', 'element': 'buttons', 'value': 'full-width'},
+            {'type': 'font', 'element': 'body', 'value': 'large'}
+        ])
+        reasons.append(f"{mobile_share:.0%} of your visitors are on mobile devices")
+
+    bounce_rate = features['bounce_rate']
+    if bounce_rate is not None and bounce_rate > 0.6:
+        changes.append({'type': 'color', 'element': 'primary', 'value': '#3a86ff'})
+        if features['theme'] == 'default':
+            changes.append({'type': 'theme', 'element': 'profile', 'value': 'professional-dark'})
+        reasons.append(f"{bounce_rate:.0%} of visits leave without clicking a link")
+
+    if not changes:
+        return None
+    return {
+        'suggestion': 'Adjust your theme to how visitors actually view your profile',
+        'changes': changes,
+        'reasoning': '; '.join(reasons) + '.'
+    }
+
+
+BUILDERS = {
+    'layout': build_layout,
+    'content': build_content,
+    'theme': build_theme,
+}
+
+
+def build_recommendation(recommendation_type, features):
+    """Pure function run in the worker processes"""
+    return BUILDERS[recommendation_type](features)
+
+
+def _build_all(pending, max_workers=None):
+    """Run the builders for [(user_id, type, features)], in a process pool for large batches"""
+    types = [recommendation_type for _, recommendation_type, _ in pending]
+    inputs = [features for _, _, features in pending]
+    if len(pending) < POOL_THRESHOLD:
+        return list(map(build_recommendation, types, inputs))
+    pool = workers.get_process_pool('recommendations-cpu', max_workers)
+    return list(pool.map(build_recommendation, types, inputs, chunksize=max(1, len(pending) // 32)))
+
+
+def generate_batch(user_ids, types=RECOMMENDATION_TYPES, force=False, max_workers=None):
+    """Regenerate recommendations for a batch of users whose inputs changed
+
+    Previous unapplied recommendations of a regenerated type are replaced.
+    Returns (generated, skipped) counts of (user, type) pairs.
+    """
+    features = load_features(user_ids)
+    runs = {
+        (run.user_id, run.recommendation_type): run
+        for run in RecommendationRun.query.filter(
+            RecommendationRun.user_id.in_(list(features)),
+            RecommendationRun.recommendation_type.in_(types)
+        )
+    }
+
+    pending = []
+    fingerprints = {}
+    for user_id, user_features in features.items():
+        for recommendation_type in types:
+            digest = fingerprint(recommendation_type, user_features)
+            run = runs.get((user_id, recommendation_type))
+            if not force and run is not None and run.fingerprint == digest:
+                continue
+            fingerprints[(user_id, recommendation_type)] = digest
+            pending.append((user_id, recommendation_type, user_features))
+
+    skipped = len(features) * len(types) - len(pending)
+    if not pending:
+        return 0, skipped
+
+    results = _build_all(pending, max_workers)
+
+    # Replace stale suggestions type by type with one DELETE each
+    for recommendation_type in types:
+        stale_users = [user_id for user_id, pending_type, _ in pending if pending_type == recommendation_type]
+        if stale_users:
+            AIRecommendation.query.filter(
+                AIRecommendation.user_id.in_(stale_users),
+                AIRecommendation.recommendation_type == recommendation_type,
+                AIRecommendation.is_applied == False
+            ).delete(synchronize_session=False)
+
+    now = datetime.utcnow()
+    for (user_id, recommendation_type, _), data in zip(pending, results):
+        if data is not None:
+            db.session.add(AIRecommendation(user_id, recommendation_type, data))
+        run = runs.get((user_id, recommendation_type))
+        if run is None:
+            run = RecommendationRun(user_id, recommendation_type, fingerprints[(user_id, recommendation_type)])
+            db.session.add(run)
+        else:
+            run.fingerprint = fingerprints[(user_id, recommendation_type)]
+        run.generated_at = now
+
+    db.session.commit()
+    return len(pending), skipped
+
+
+def _user_batches(user_ids, batch_size):
+    """Batches of the given user ids, or of every active user by keyset pagination"""
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        for offset in range(0, len(user_ids), batch_size):
+            yield user_ids[offset:offset + batch_size]
+        return
+
+    last_id = 0
+    while True:
+        batch = [row.id for row in User.query.with_entities(User.id).filter(
+            User.id > last_id, User.is_active == True
+        ).order_by(User.id).limit(batch_size)]
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]
+
+
+def run_recommendations(user_ids=None, types=RECOMMENDATION_TYPES, force=False, batch_size=500, max_workers=None):
+    """Generate recommendations for the given users (default: every active user) batch by batch"""
+    stats = {'generated': 0, 'skipped': 0}
+    for batch in _user_batches(user_ids, batch_size):
+        generated, skipped = generate_batch(batch, types, force, max_workers)
+        stats['generated'] += generated
+        stats['skipped'] += skipped
+    return stats
+
+
+def enqueue_recommendations(user_id, types=RECOMMENDATION_TYPES):
+    """Queue recommendation generation for one user on the background pool"""
+    app = current_app._get_current_object()
+    return workers.submit('recommendations', app, run_recommendations, user_ids=[user_id], types=types)
+
+
+def start_recommendation_worker(app, interval=3600):
+    """Periodically refresh recommendations for every user whose data changed"""
+    return workers.start_periodic(
+        'recommendations-batch', app, run_recommendations,
+        interval, max_workers=app.config.get('RECOMMENDATION_PROCESSES')
+    )
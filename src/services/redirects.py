@@ -0,0 +1,291 @@
+from src.extensions import db
+from src.models.user import User, Link
+from src.models.shorturl import ShortURL
+from src.services.cache import LRUBackend, make_backend, result_cache
+from src.services.clicks import record_clicks
+from src.services.metrics import CLICK_QUEUE_DEPTH, record_cache
+from sqlalchemy import select
+from sqlalchemy.exc import DataError, IntegrityError
+from datetime import datetime, timedelta
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Resolved redirect targets. Entries carry the 'redirect' version they were
+# read at, so invalidate_* calls (shared through the result cache backend)
+# retire them; the TTL bounds staleness for changes made elsewhere. With
+# CACHE_REDIS_URL set, entries and versions are shared between processes.
+_redirects = LRUBackend(maxsize=10000, ttl=60)
+
+# Returned by peek_* when the answer isn't cached and needs the database
+NOT_CACHED = object()
+
+
+def _load_row(statement):
+    # Always from the primary: a lagging replica row would stay cached for the TTL
+    row = db.session.execute(statement, bind_arguments={'bind': db.engine}).first()
+    return tuple(row) if row else None
+
+
+def init_redirect_cache(app):
+    """Size and TTL of the redirect cache from REDIRECT_CACHE_SIZE / REDIRECT_CACHE_TTL"""
+    global _redirects
+    _redirects = make_backend(
+        app, 'redirect', app.config.get('REDIRECT_CACHE_SIZE', 10000), app.config.get('REDIRECT_CACHE_TTL', 60)
+    )
+
+
+def invalidate_short_code(code):
+    """Forget the cached target of a short code (after create, update or delete)"""
+    result_cache.bump('redirect', code)
+
+
+def invalidate_user_links(user_id):
+    """Forget the cached targets of a user's profile links"""
+    result_cache.bump('redirect', f"user:{user_id}")
+
+
+def _short_code_result(row):
+    """(status, short URL id, target) from a cached row; None for unknown codes"""
+    if row is None:
+        return None
+    url_id, original_url, is_active, expires_at = row
+    if not is_active or (expires_at and expires_at < datetime.utcnow()):
+        return 410, url_id, None
+    return 302, url_id, original_url
+
+
+def _cached(key, local_only):
+    if local_only and hasattr(_redirects, 'get_local'):
+        return _redirects.get_local(key)
+    return _redirects.get(key)
+
+
+def peek_short_code(code, local_only=False):
+    """Cached resolve_short_code() result, or NOT_CACHED; never touches the database
+
+    local_only skips a shared cache tier, so the call never blocks on the network.
+    """
+    entry = _cached(f"s:{code}", local_only)
+    if entry is None or entry[0] != result_cache.version('redirect', code, local_only):
+        if not local_only:
+            record_cache('redirect', False)
+        return NOT_CACHED
+    record_cache('redirect', True)
+    return _short_code_result(entry[1])
+
+
+def _short_code_columns():
+    return select(ShortURL.id, ShortURL.original_url, ShortURL.is_active, ShortURL.expires_at)
+
+
+def load_short_code(code):
+    """resolve_short_code() from the database, refreshing the cache"""
+    version = result_cache.version('redirect', code)
+    row = _load_row(_short_code_columns().where(ShortURL.short_code == code))
+    _redirects.set(f"s:{code}", (version, row))
+    return _short_code_result(row)
+
+
+def resolve_short_code(code):
+    """(302, id, target), (410, id, None) for inactive/expired codes, or None if unknown"""
+    result = peek_short_code(code)
+    return load_short_code(code) if result is NOT_CACHED else result
+
+
+def _link_result(row):
+    """(status, link id, owner id, target) from a cached row; None if not redirectable"""
+    if row is None:
+        return None
+    link_id, user_id, url, link_active, user_active, user_public = row
+    if not (link_active and user_active and user_public):
+        return None
+    return 302, link_id, user_id, url
+
+
+def peek_link(username, link_id, local_only=False):
+    """Cached resolve_link() result, or NOT_CACHED; never touches the database"""
+    # 'link:' rather than 'l:' since rows gained User.is_public; a shared
+    # cache may still hold the shorter rows under the old keys
+    entry = _cached(f"link:{username}:{link_id}", local_only)
+    # Unknown links are only cached for the TTL; known ones follow their owner's version
+    if entry is None or (entry[1] is not None and entry[0] != result_cache.version('redirect', f"user:{entry[1][1]}", local_only)):
+        if not local_only:
+            record_cache('redirect', False)
+        return NOT_CACHED
+    record_cache('redirect', True)
+    return _link_result(entry[1])
+
+
+def load_link(username, link_id):
+    """resolve_link() from the database, refreshing the cache"""
+    row = _load_row(select(
+        Link.id, Link.user_id, Link.url, Link.is_active, User.is_active, User.is_public
+    ).join(User, Link.user_id == User.id).where(
+        Link.id == link_id,
+        User.username == username
+    ))
+    version = result_cache.version('redirect', f"user:{row[1]}") if row else None
+    _redirects.set(f"link:{username}:{link_id}", (version, row))
+    return _link_result(row)
+
+
+def resolve_link(username, link_id):
+    """(302, link id, owner id, target) for an active link of an active user, else None"""
+    result = peek_link(username, link_id)
+    return load_link(username, link_id) if result is NOT_CACHED else result
+
+
+def warm_redirect_cache(limit=1000):
+    """Preload the most-clicked short codes, returns how many were loaded
+
+    Two queries in all. Like load_short_code(), versions are read before
+    the rows, so a change committed in between is never cached as current.
+    """
+    codes = [code for (code,) in db.session.query(ShortURL.short_code).order_by(
+        ShortURL.click_count.desc()
+    ).limit(limit)]
+    versions = {code: result_cache.version('redirect', code) for code in codes}
+    rows = db.session.execute(
+        _short_code_columns().add_columns(ShortURL.short_code).where(ShortURL.short_code.in_(codes)),
+        bind_arguments={'bind': db.engine}
+    ).all() if codes else []
+    for row in rows:
+        code = row[-1]
+        _redirects.set(f"s:{code}", (versions[code], tuple(row[:-1])))
+    return len(rows)
+
+
+class ClickBuffer:
+    """Collects click events and writes them in batches from a background thread
+
+    Events use the same tables and counters as record_url_click and
+    record_link_click, so the analytics ETL picks them up unchanged. A
+    batch that fails to write (e.g. a lock timeout or deadlock) is queued
+    again; events are only dropped after max_attempts failed writes, or
+    when more than max_queued events are waiting. A batch the database
+    rejects (e.g. a click on a link deleted meanwhile) is split in halves
+    until the rejected events are isolated; only those are dropped, the
+    rest is written. Events still unwritten
+    max_delay seconds after the click are dropped too, since the analytics
+    ETL may already have moved past their click_time.
+    """
+
+    def __init__(self, app, interval=0.5, max_events=500, max_attempts=5, max_queued=100000, max_delay=None):
+        self.app = app
+        self.interval = interval
+        self.max_events = max_events
+        self.max_attempts = max_attempts
+        self.max_queued = max_queued
+        self.max_delay = max_delay
+        self._events = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def add(self, kind, target_id, owner_id=None, referrer=None, user_agent=None, ip_address=None):
+        """Queue one click: kind is 'url' (target_id = short URL id) or 'link' (owner_id required)"""
+        event = {
+            'kind': kind, 'target_id': target_id, 'owner_id': owner_id, 'referrer': referrer,
+            'user_agent': user_agent, 'ip_address': ip_address, 'click_time': datetime.utcnow()
+        }
+        with self._lock:
+            self._events.append(event)
+            full = len(self._events) >= self.max_events
+        CLICK_QUEUE_DEPTH.inc()
+        if full:
+            self._wake.set()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='linkak-click-buffer', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the thread after writing whatever is still queued"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def flush(self):
+        """Write the queued events now, returns how many were written (None if the write failed)"""
+        with self._lock:
+            events, self._events = self._events, []
+        if self.max_delay is not None:
+            events = self._drop_late(events)
+        if not events:
+            return 0
+        with self.app.app_context():
+            rejected, failed = self._write(events)
+        if rejected:
+            CLICK_QUEUE_DEPTH.dec(len(rejected))
+            logger.error("Dropped %s click events the database rejected", len(rejected))
+        if failed:
+            self._requeue(failed)
+        written = len(events) - len(rejected) - len(failed)
+        CLICK_QUEUE_DEPTH.dec(written)
+        return None if failed else written
+
+    def _write(self, events):
+        """Write events, bisecting batches the database rejects, returns (rejected, failed)
+
+        rejected are events the database refused on their own; failed are
+        events not written for other reasons (e.g. a lock timeout), to retry.
+        """
+        try:
+            record_clicks(events)
+            return [], []
+        except (IntegrityError, DataError):
+            db.session.rollback()
+            if len(events) == 1:
+                return events, []
+            middle = len(events) // 2
+            first, second = self._write(events[:middle]), self._write(events[middle:])
+            return first[0] + second[0], first[1] + second[1]
+        except Exception:
+            db.session.rollback()
+            logger.warning("Writing %s click events failed, will retry", len(events), exc_info=True)
+            return [], events
+
+    def _drop_late(self, events):
+        """Events clicked less than max_delay seconds ago; the others are dropped"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.max_delay)
+        kept = [event for event in events if event['click_time'] >= cutoff]
+        if len(kept) < len(events):
+            CLICK_QUEUE_DEPTH.dec(len(events) - len(kept))
+            logger.error("Dropped %s click events not written within %ss", len(events) - len(kept), self.max_delay)
+        return kept
+
+    def _requeue(self, events):
+        """Put a failed batch back in front of the queue, dropping what is out of attempts or room"""
+        retry = []
+        for event in events:
+            event['attempts'] = event.get('attempts', 0) + 1
+            if event['attempts'] < self.max_attempts:
+                retry.append(event)
+        with self._lock:
+            # Newer clicks are kept over the oldest retries when the queue is full
+            room = max(0, self.max_queued - len(self._events))
+            dropped = len(events) - min(len(retry), room)
+            self._events[:0] = retry[len(retry) - room:] if len(retry) > room else retry
+        if dropped:
+            CLICK_QUEUE_DEPTH.dec(dropped)
+            logger.error("Dropped %s click events after repeated write failures", dropped)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self.flush() is None:
+                self._stopped.wait(self.interval)  # Back off instead of retrying on every wake-up
+        # Final writes, with the remaining attempts for batches that failed before
+        for _ in range(self.max_attempts):
+            if self.flush() is not None:
+                break
+            time.sleep(self.interval)
@@ -0,0 +1,238 @@
+import fnmatch
+import socketserver
+import threading
+import time
+
+# A small in-memory server speaking the Redis protocol (RESP), covering the
+# commands the shared cache uses: strings with expiry, counters, SCAN and
+# pub/sub. It's a stand-in for development and for testing multi-process
+# setups (`flask cache-server`), not for production: there is no
+# persistence, eviction or authentication.
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class _Store:
+    """Keys, expiry times and channel subscribers shared by all connections"""
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.channels = {}
+        self.lock = threading.Lock()
+
+    def _alive(self, key):
+        expires_at = self.expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def get(self, key):
+        return self.data[key] if self._alive(key) else None
+
+    def set(self, key, value, ttl=None):
+        self.data[key] = value
+        if ttl is None:
+            self.expires.pop(key, None)
+        else:
+            self.expires[key] = time.monotonic() + ttl
+
+    def delete(self, key):
+        existed = self._alive(key)
+        self.data.pop(key, None)
+        self.expires.pop(key, None)
+        return existed
+
+    def keys(self):
+        return [key for key in list(self.data) if self._alive(key)]
+
+
+def _encode(value):
+    """RESP encoding of a reply"""
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, bool):
+        return b':1\r\n' if value else b':0\r\n'
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, str):  # Status reply
+        return f"+{value}\r\n".encode()
+    if isinstance(value, (bytes, bytearray)):
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+    if isinstance(value, ProtocolError):
+        return f"-ERR {value}\r\n".encode()
+    return b'*%d\r\n' % len(value) + b''.join(_encode(item) for item in value)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    disable_nagle_algorithm = True  # Replies and pub/sub messages go out immediately
+
+    def setup(self):
+        super().setup()
+        self.store = self.server.store
+        self.subscriptions = set()
+        self.write_lock = threading.Lock()
+
+    def send(self, payload):
+        with self.write_lock:
+            self.wfile.write(payload)
+            self.wfile.flush()
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            return line.split()  # Inline command, e.g. from telnet
+        arguments = []
+        for _ in range(int(line[1:])):
+            header = self.rfile.readline()
+            if not header.startswith(b'$'):
+                raise ProtocolError('expected a bulk string')
+            arguments.append(self.rfile.read(int(header[1:]) + 2)[:-2])
+        return arguments
+
+    def handle(self):
+        try:
+            while True:
+                arguments = self.read_command()
+                if arguments is None:
+                    break
+                if not arguments:
+                    continue
+                try:
+                    reply = self.execute(arguments[0].decode().upper(), arguments[1:])
+                except ProtocolError as e:
+                    reply = e
+                except (ValueError, IndexError):
+                    reply = ProtocolError('syntax error')
+                if reply is not _NO_REPLY:
+                    self.send(_encode(reply))
+        except (OSError, ValueError, ProtocolError):
+            pass  # Client went away or sent garbage: drop the connection
+        finally:
+            with self.store.lock:
+                for channel in self.subscriptions:
+                    self.store.channels.get(channel, set()).discard(self)
+
+    def execute(self, command, args):
+        store = self.store
+        if self.subscriptions and command not in ('SUBSCRIBE', 'UNSUBSCRIBE', 'PING'):
+            raise ProtocolError(f"'{command.lower()}' not allowed while subscribed")
+
+        if command == 'PING':
+            if self.subscriptions:
+                return [b'pong', args[0] if args else b'']
+            return args[0] if args else 'PONG'
+        if command == 'ECHO':
+            return args[0]
+        if command in ('SELECT', 'CLIENT', 'AUTH'):
+            return 'OK'
+
+        if command == 'SUBSCRIBE':
+            for channel in args:
+                with store.lock:
+                    store.channels.setdefault(channel, set()).add(self)
+                self.subscriptions.add(channel)
+                self.send(_encode([b'subscribe', channel, len(self.subscriptions)]))
+            return _NO_REPLY
+        if command == 'UNSUBSCRIBE':
+            for channel in args or list(self.subscriptions):
+                with store.lock:
+                    store.channels.get(channel, set()).discard(self)
+                self.subscriptions.discard(channel)
+                self.send(_encode([b'unsubscribe', channel, len(self.subscriptions)]))
+            return _NO_REPLY
+        if command == 'PUBLISH':
+            channel, message = args
+            with store.lock:
+                receivers = list(store.channels.get(channel, ()))
+            payload = _encode([b'message', channel, message])
+            delivered = 0
+            for receiver in receivers:
+                try:
+                    receiver.send(payload)
+                    delivered += 1
+                except OSError:
+                    pass
+            return delivered
+
+        with store.lock:
+            if command == 'GET':
+                return store.get(args[0])
+            if command == 'MGET':
+                return [store.get(key) for key in args]
+            if command == 'SET':
+                key, value, options = args[0], args[1], [arg.upper() for arg in args[2:]]
+                ttl = None
+                if b'EX' in options:
+                    ttl = int(args[2 + options.index(b'EX') + 1])
+                elif b'PX' in options:
+                    ttl = int(args[2 + options.index(b'PX') + 1]) / 1000
+                exists = store.get(key) is not None
+                if (b'NX' in options and exists) or (b'XX' in options and not exists):
+                    return None
+                store.set(key, value, ttl)
+                return 'OK'
+            if command == 'DEL':
+                return sum(store.delete(key) for key in args)
+            if command == 'EXISTS':
+                return sum(store.get(key) is not None for key in args)
+            if command in ('INCR', 'INCRBY'):
+                amount = int(args[1]) if command == 'INCRBY' else 1
+                try:
+                    value = int(store.get(args[0]) or 0) + amount
+                except ValueError:
+                    raise ProtocolError('value is not an integer or out of range')
+                store.data[args[0]] = str(value).encode()
+                return value
+            if command == 'EXPIRE':
+                if store.get(args[0]) is None:
+                    return 0
+                store.expires[args[0]] = time.monotonic() + int(args[1])
+                return 1
+            if command == 'TTL':
+                if store.get(args[0]) is None:
+                    return -2
+                expires_at = store.expires.get(args[0])
+                return -1 if expires_at is None else max(0, round(expires_at - time.monotonic()))
+            if command == 'SCAN':
+                options = [arg.upper() for arg in args]
+                pattern = args[options.index(b'MATCH') + 1].decode('latin-1') if b'MATCH' in options else '*'
+                matched = [key for key in store.keys() if fnmatch.fnmatchcase(key.decode('latin-1'), pattern)]
+                return [b'0', matched]  # Everything in one round
+            if command == 'DBSIZE':
+                return len(store.keys())
+            if command in ('FLUSHDB', 'FLUSHALL'):
+                store.data.clear()
+                store.expires.clear()
+                return 'OK'
+        raise ProtocolError(f"unknown command '{command.lower()}'")
+
+
+_NO_REPLY = object()
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    """Threaded in-memory Redis-protocol server; port 0 picks a free port"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=6379):
+        self.store = _Store()
+        super().__init__((host, port), _Handler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self):
+        """Serve from a background thread, returns self"""
+        threading.Thread(target=self.serve_forever, daemon=True, name='linkak-resp-server').start()
+        return self
@@ -0,0 +1,249 @@
+from src.models.advanced_features import AdvancedAnalytics, AnalyticsRollup, AnalyticsDimension, db
+from src.services.cache import result_cache
+from sqlalchemy import and_, or_, func
+from datetime import timedelta
+import calendar
+
+ROLLUP_PERIODS = ('week', 'month')
+DIMENSION_PERIODS = ('day', 'week', 'month')
+
+# Dimension name -> AdvancedAnalytics getter for its JSON breakdown
+DIMENSIONS = {
+    'device': 'get_device_data',
+    'location': 'get_location_data',
+    'referrer': 'get_referrer_data',
+}
+
+SCALAR_FIELDS = ('views', 'visitors', 'bounce_rate', 'time_on_page', 'days')
+
+
+def period_start(day, period):
+    """First day of the day/week/month bucket containing day"""
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def snapshot(record):
+    """Values of a daily AdvancedAnalytics row that feed the rollups"""
+    return {
+        'views': record.total_views or 0,
+        'visitors': record.unique_visitors or 0,
+        'bounce_rate': record.bounce_rate or 0.0,
+        'time_on_page': record.avg_time_on_page or 0.0,
+        'days': 1,
+        'dimensions': {name: getattr(record, getter)() for name, getter in DIMENSIONS.items()}
+    }
+
+
+def diff(new, old=None):
+    """Delta between two snapshots of the same daily row (old=None for a new row)"""
+    if old is None:
+        return new
+
+    delta = {field: new[field] - old[field] for field in SCALAR_FIELDS}
+    delta['dimensions'] = {}
+    for name in DIMENSIONS:
+        new_counts = new['dimensions'].get(name, {})
+        old_counts = old['dimensions'].get(name, {})
+        delta['dimensions'][name] = {
+            key: new_counts.get(key, 0) - old_counts.get(key, 0)
+            for key in set(new_counts) | set(old_counts)
+        }
+    return delta
+
+
+def apply_deltas(deltas):
+    """Fold (user_id, day, delta) triples into the day/week/month tiers
+
+    Affected rollup and dimension rows are loaded with one query per table
+    and updated in place. The caller owns the transaction and commits.
+    """
+    if not deltas:
+        return
+
+    user_ids = {user_id for user_id, _, _ in deltas}
+    starts = set()
+    for _, day, _ in deltas:
+        starts.update(period_start(day, period) for period in DIMENSION_PERIODS)
+
+    rollups = {
+        (row.user_id, row.period, row.period_start): row
+        for row in AnalyticsRollup.query.filter(
+            AnalyticsRollup.user_id.in_(user_ids),
+            AnalyticsRollup.period_start.in_(starts)
+        )
+    }
+    dimensions = {
+        (row.user_id, row.period, row.period_start, row.dimension, row.key): row
+        for row in AnalyticsDimension.query.filter(
+            AnalyticsDimension.user_id.in_(user_ids),
+            AnalyticsDimension.period_start.in_(starts)
+        )
+    }
+
+    for user_id, day, delta in deltas:
+        for period in ROLLUP_PERIODS:
+            key = (user_id, period, period_start(day, period))
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollup = AnalyticsRollup(*key)
+                db.session.add(rollup)
+                rollups[key] = rollup
+
+            rollup.total_views += delta['views']
+            rollup.unique_visitors += delta['visitors']
+            rollup.bounce_rate_sum += delta['bounce_rate']
+            rollup.time_on_page_sum += delta['time_on_page']
+            rollup.day_count += delta['days']
+
+        for period in DIMENSION_PERIODS:
+            start = period_start(day, period)
+            for dimension, counts in delta['dimensions'].items():
+                for name, count in counts.items():
+                    if not count:
+                        continue
+                    key = (user_id, period, start, dimension, str(name)[:255])
+                    row = dimensions.get(key)
+                    if row is None:
+                        row = AnalyticsDimension(*key)
+                        db.session.add(row)
+                        dimensions[key] = row
+                    row.count += count
+
+
+def rebuild_rollups(user_id=None, chunk_size=1000):
+    """Recompute every rollup tier from the daily rows (for backfills and repairs)"""
+    rollups = AnalyticsRollup.query
+    dimensions = AnalyticsDimension.query
+    daily = AdvancedAnalytics.query
+    if user_id is not None:
+        rollups = rollups.filter_by(user_id=user_id)
+        dimensions = dimensions.filter_by(user_id=user_id)
+        daily = daily.filter_by(user_id=user_id)
+
+    rollups.delete(synchronize_session=False)
+    dimensions.delete(synchronize_session=False)
+    db.session.commit()
+    if user_id is not None:
+        result_cache.bump('user', user_id)
+
+    # Keyset pagination so each chunk is committed independently
+    processed = 0
+    last_id = 0
+    while True:
+        records = daily.filter(AdvancedAnalytics.id > last_id).order_by(AdvancedAnalytics.id).limit(chunk_size).all()
+        if not records:
+            break
+
+        apply_deltas([(record.user_id, record.date, snapshot(record)) for record in records])
+        db.session.commit()
+        for touched in {record.user_id for record in records}:
+            result_cache.bump('user', touched)
+
+        processed += len(records)
+        last_id = records[-1].id
+
+    return processed
+
+
+def _weeks_and_days(start_date, end_date, buckets):
+    """Cover [start_date, end_date] with whole Monday-based weeks plus leftover days"""
+    cursor = start_date
+    while cursor <= end_date:
+        if cursor.weekday() == 0 and cursor + timedelta(days=6) <= end_date:
+            buckets['week'].append(cursor)
+            cursor += timedelta(days=7)
+        else:
+            buckets['day'].append(cursor)
+            cursor += timedelta(days=1)
+
+
+def covering_buckets(start_date, end_date):
+    """Split [start_date, end_date] into the fewest whole months, weeks and days"""
+    buckets = {period: [] for period in DIMENSION_PERIODS}
+
+    # Whole months first, then weeks/days for the partial months at either end
+    first_month = start_date if start_date.day == 1 else (
+        start_date.replace(day=28) + timedelta(days=4)).replace(day=1)
+    cursor = first_month
+    while True:
+        month_end = cursor.replace(day=calendar.monthrange(cursor.year, cursor.month)[1])
+        if month_end > end_date:
+            break
+        buckets['month'].append(cursor)
+        cursor = month_end + timedelta(days=1)
+
+    if buckets['month']:
+        _weeks_and_days(start_date, first_month - timedelta(days=1), buckets)
+        _weeks_and_days(cursor, end_date, buckets)
+    else:
+        _weeks_and_days(start_date, end_date, buckets)
+
+    return buckets
+
+
+def summarize_range(user_id, start_date, end_date):
+    """Totals and dimension breakdowns for a date range, read from the coarsest buckets"""
+    buckets = covering_buckets(start_date, end_date)
+    totals = dict.fromkeys(SCALAR_FIELDS, 0)
+
+    rollup_conditions = [
+        and_(AnalyticsRollup.period == period, AnalyticsRollup.period_start.in_(buckets[period]))
+        for period in ROLLUP_PERIODS if buckets[period]
+    ]
+    if rollup_conditions:
+        row = db.session.query(
+            func.sum(AnalyticsRollup.total_views),
+            func.sum(AnalyticsRollup.unique_visitors),
+            func.sum(AnalyticsRollup.bounce_rate_sum),
+            func.sum(AnalyticsRollup.time_on_page_sum),
+            func.sum(AnalyticsRollup.day_count)
+        ).filter(AnalyticsRollup.user_id == user_id, or_(*rollup_conditions)).one()
+        for field, value in zip(SCALAR_FIELDS, row):
+            totals[field] += value or 0
+
+    # Leftover single days come straight from the daily rows' scalar columns
+    if buckets['day']:
+        row = db.session.query(
+            func.sum(AdvancedAnalytics.total_views),
+            func.sum(AdvancedAnalytics.unique_visitors),
+            func.sum(func.coalesce(AdvancedAnalytics.bounce_rate, 0)),
+            func.sum(func.coalesce(AdvancedAnalytics.avg_time_on_page, 0)),
+            func.count(AdvancedAnalytics.id)
+        ).filter(AdvancedAnalytics.user_id == user_id, AdvancedAnalytics.date.in_(buckets['day'])).one()
+        for field, value in zip(SCALAR_FIELDS, row):
+            totals[field] += value or 0
+
+    dimension_conditions = [
+        and_(AnalyticsDimension.period == period, AnalyticsDimension.period_start.in_(starts))
+        for period, starts in buckets.items() if starts
+    ]
+    breakdowns = {name: {} for name in DIMENSIONS}
+    if dimension_conditions:
+        rows = db.session.query(
+            AnalyticsDimension.dimension,
+            AnalyticsDimension.key,
+            func.sum(AnalyticsDimension.count)
+        ).filter(
+            AnalyticsDimension.user_id == user_id,
+            or_(*dimension_conditions)
+        ).group_by(AnalyticsDimension.dimension, AnalyticsDimension.key).all()
+        for dimension, key, count in rows:
+            if count:
+                breakdowns.setdefault(dimension, {})[key] = int(count)
+
+    days = totals['days']
+    return {
+        'summary': {
+            'total_views': int(totals['views']),
+            'total_visitors': int(totals['visitors']),
+            'avg_bounce_rate': totals['bounce_rate'] / days if days else 0,
+            'avg_time_on_page': totals['time_on_page'] / days if days else 0
+        },
+        'device_data': breakdowns['device'],
+        'location_data': breakdowns['location'],
+        'referrer_data': breakdowns['referrer']
+    }
@@ -0,0 +1,414 @@
+from src.models.advanced_features import ScheduledContent, db
+from src.models.user import User, Link
+from src.services.cache import result_cache
+from src.services.identity import invalidate_identity
+from src.services.pages import invalidate_profiles
+from src.services.redirects import invalidate_user_links
+from sqlalchemy import or_
+from sqlalchemy.exc import StatementError
+from datetime import datetime, timedelta
+import heapq
+import logging
+import os
+import socket
+import threading
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Fields a scheduled 'update' may change, per target model
+LINK_UPDATE_FIELDS = ('title', 'url', 'description', 'icon', 'category', 'is_active', 'is_featured')
+PROFILE_UPDATE_FIELDS = ('full_name', 'bio', 'theme', 'custom_domain')
+
+BATCH_SIZE = 1000
+
+# Jobs claimed per round and how long a claim is valid without renewal.
+# Leases use the worker's clock, so keep them well above clock skew
+# between nodes.
+CLAIM_SIZE = 5000
+LEASE_SECONDS = 60
+
+
+def make_worker_id():
+    """Unique id for a scheduler worker (host, process and a random suffix)"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def due_jobs_query(until):
+    """Pending jobs due at or before until, served by ix_scheduled_content_due"""
+    return ScheduledContent.query.filter(
+        ScheduledContent.is_executed == False,
+        ScheduledContent.scheduled_time <= until
+    ).order_by(ScheduledContent.scheduled_time, ScheduledContent.id)
+
+
+def _coerce(model, field, value, required=False):
+    """value checked against model's column for field; raises ValueError"""
+    column = model.__table__.c[field]
+    if isinstance(column.type, db.Boolean):
+        # JSON booleans, or 0/1
+        if value in (True, False) and not isinstance(value, float):
+            return bool(value)
+        raise ValueError(f"{field} must be true or false")
+    if value is None:
+        if required or not column.nullable:
+            raise ValueError(f"{field} is required")
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be a string")
+    if (required or not column.nullable) and not value.strip():
+        raise ValueError(f"{field} is required")
+    length = getattr(column.type, 'length', None)
+    if length and len(value) > length:
+        raise ValueError(f"{field} is longer than {length} characters")
+    return value
+
+
+def job_changes(job):
+    """(target, changes) for one job; raises ValueError if the job cannot be applied
+
+    Links are targeted by content_id; theme and profile jobs target the
+    job owner's User row. Values are checked against the target columns,
+    so a stored job can't fail when it is applied.
+    """
+    data = job.get_content_data()
+
+    if job.content_type == 'link':
+        if not isinstance(job.content_id, int) or isinstance(job.content_id, bool):
+            raise ValueError('content_id must be the id of a link')
+        model = Link
+        target = ('link', job.content_id)
+        fields = LINK_UPDATE_FIELDS
+        toggle_field = 'is_active'
+    elif job.content_type == 'theme':
+        if job.action == 'deactivate':
+            return ('user', job.user_id), {'theme': 'default'}
+        if job.action not in ('activate', 'update'):
+            raise ValueError(f"Unsupported action {job.action!r} for theme")
+        return ('user', job.user_id), {'theme': _coerce(User, 'theme', data.get('theme'), required=True)}
+    elif job.content_type == 'profile':
+        model = User
+        target = ('user', job.user_id)
+        fields = PROFILE_UPDATE_FIELDS
+        # Hides the public profile; is_active would lock the owner out of their account
+        toggle_field = 'is_public'
+    else:
+        raise ValueError(f"Unsupported content_type {job.content_type!r}")
+
+    if job.action == 'activate':
+        return target, {toggle_field: True}
+    if job.action == 'deactivate':
+        return target, {toggle_field: False}
+    if job.action == 'update':
+        changes = {key: _coerce(model, key, data[key]) for key in fields if key in data}
+        if not changes:
+            raise ValueError(f"content_data has none of the fields {', '.join(fields)}")
+        return target, changes
+    raise ValueError(f"Unsupported action {job.action!r} for {job.content_type}")
+
+
+def _in_savepoint(write):
+    """Run write() in a SAVEPOINT, returns False if the database rejected it (and it was rolled back)"""
+    try:
+        with db.session.begin_nested():
+            write()
+    except StatementError as e:
+        logger.warning("Scheduled update rejected: %s", getattr(e, "orig", None) or e)
+        return False
+    return True
+
+
+def _apply(model, states):
+    """Write folded per-row states with as few statements as possible
+
+    Rows that end up with identical changes (e.g. thousands of links
+    activated at the same minute) share one UPDATE ... WHERE id IN (...);
+    the remaining distinct updates go through one executemany. Each
+    statement runs in a savepoint; if the database rejects it, its rows
+    are written one by one so only the rejected rows lose their update.
+    Returns the ids of those rows.
+    """
+    groups = {}
+    for row_id, changes in states.items():
+        groups.setdefault(tuple(sorted(changes.items())), []).append(row_id)
+
+    individual = []
+    for changes, row_ids in groups.items():
+        if len(row_ids) > 1:
+            if not _in_savepoint(lambda: model.query.filter(model.id.in_(row_ids)).update(
+                {getattr(model, key): value for key, value in changes},
+                synchronize_session=False
+            )):
+                individual.extend(dict(changes, id=row_id) for row_id in row_ids)
+        else:
+            individual.append(dict(changes, id=row_ids[0]))
+
+    failed = []
+    if individual and not _in_savepoint(lambda: db.session.bulk_update_mappings(model, individual)):
+        for mapping in individual:
+            if not _in_savepoint(lambda: db.session.bulk_update_mappings(model, [mapping])):
+                failed.append(mapping['id'])
+    return failed
+
+
+def apply_jobs(jobs, worker_id=None):
+    """Apply a batch of due jobs set-based and mark them executed
+
+    Jobs are folded per target row in schedule order, so the latest job for
+    a row wins while earlier updates to other fields are kept. Invalid jobs,
+    jobs that target rows the owner doesn't have and jobs whose row update
+    the database rejects are marked executed without effect. With a
+    worker_id the batch only commits if this worker still holds every job's
+    claim; otherwise it is rolled back and None is returned. Returns the
+    number of jobs applied.
+    """
+    # Set-based equivalent of ScheduledContent.mark_executed for the whole
+    # batch. Done first: it checks the claim, and the savepoints in _apply
+    # must be nested in an open transaction.
+    executed = ScheduledContent.query.filter(
+        ScheduledContent.id.in_([job.id for job in jobs]),
+        ScheduledContent.is_executed == False
+    )
+    if worker_id is not None:
+        executed = executed.filter(ScheduledContent.claimed_by == worker_id)
+    marked = executed.update(
+        {ScheduledContent.is_executed: True, ScheduledContent.execution_time: datetime.utcnow(),
+         ScheduledContent.lease_until: None},
+        synchronize_session=False
+    )
+    if worker_id is not None and marked != len(jobs):
+        # Our lease expired and another worker reclaimed (part of) the batch
+        db.session.rollback()
+        logger.warning("Lost claim on scheduled jobs, rolled back batch of %s", len(jobs))
+        return None
+
+    link_ids = {job.content_id for job in jobs if job.content_type == 'link' and isinstance(job.content_id, int)}
+    link_owners = dict(
+        Link.query.with_entities(Link.id, Link.user_id).filter(Link.id.in_(link_ids)).all()
+    ) if link_ids else {}
+
+    states = {'link': {}, 'user': {}}
+    row_jobs = {}
+    touched_users = set()
+    for job in jobs:
+        try:
+            (kind, row_id), changes = job_changes(job)
+        except ValueError as e:
+            logger.warning("Skipping scheduled job %s: %s", job.id, e)
+            continue
+        if kind == 'link' and link_owners.get(row_id) != job.user_id:
+            logger.warning("Skipping scheduled job %s: link %s not owned by user %s", job.id, row_id, job.user_id)
+            continue
+        states[kind].setdefault(row_id, {}).update(changes)
+        row_jobs.setdefault((kind, row_id), []).append(job.id)
+        touched_users.add(job.user_id)
+
+    failed = [('link', row_id) for row_id in _apply(Link, states['link'])]
+    failed += [('user', row_id) for row_id in _apply(User, states['user'])]
+    for kind, row_id in failed:
+        logger.error("Scheduled jobs %s failed: %s %s rejected the update", row_jobs[(kind, row_id)], kind, row_id)
+    db.session.commit()
+
+    for user_id in touched_users:
+        result_cache.bump('user', user_id)
+        invalidate_user_links(user_id)
+    invalidate_profiles(touched_users)
+    # Bulk updates skip the ORM events that refresh cached identities
+    for user_id in states['user']:
+        invalidate_identity(user_id)
+    return sum(len(job_ids) for job_ids in row_jobs.values()) - sum(len(row_jobs[row]) for row in failed)
+
+
+def _claimable(due_by, now):
+    """Jobs due by due_by that are unclaimed or whose lease expired before now"""
+    return (
+        ScheduledContent.is_executed == False,
+        ScheduledContent.scheduled_time <= due_by,
+        or_(ScheduledContent.lease_until.is_(None), ScheduledContent.lease_until < now)
+    )
+
+
+def claim_jobs(worker_id, due_by=None, limit=CLAIM_SIZE, lease_seconds=LEASE_SECONDS):
+    """Atomically claim up to limit jobs due by due_by, returns (job ids, claim token)
+
+    Candidates are picked first, then claimed with one conditional UPDATE
+    that re-checks the claimable condition, so a row claimed concurrently by
+    another worker is simply not updated. The ids we actually won are read
+    back by claim token. Expired leases of crashed workers are reclaimed the
+    same way. Where the database supports it (MySQL 8, PostgreSQL) the
+    candidate select uses SKIP LOCKED so workers pick disjoint rows instead
+    of racing for the same ones. The token is None when nothing is due.
+    """
+    now = datetime.utcnow()
+    due_by = due_by or now
+    # A fresh token per claim tells this round's rows apart from older ones
+    token = f"{worker_id}#{uuid.uuid4().hex[:8]}"
+
+    candidates = ScheduledContent.query.with_entities(
+        ScheduledContent.id, ScheduledContent.claimed_by
+    ).filter(
+        *_claimable(due_by, now)
+    ).order_by(ScheduledContent.scheduled_time, ScheduledContent.id).limit(limit)
+    if db.session.bind.dialect.name in ('mysql', 'postgresql'):
+        candidates = candidates.with_for_update(skip_locked=True)
+    candidates = candidates.all()
+    if not candidates:
+        db.session.rollback()
+        return [], None
+
+    candidate_ids = [row.id for row in candidates]
+    ScheduledContent.query.filter(ScheduledContent.id.in_(candidate_ids), *_claimable(due_by, now)).update(
+        {ScheduledContent.claimed_by: token, ScheduledContent.lease_until: now + timedelta(seconds=lease_seconds)},
+        synchronize_session=False
+    )
+    db.session.commit()
+
+    job_ids = [row.id for row in ScheduledContent.query.with_entities(ScheduledContent.id).filter(
+        ScheduledContent.id.in_(candidate_ids),
+        ScheduledContent.claimed_by == token
+    ).order_by(ScheduledContent.scheduled_time, ScheduledContent.id)]
+
+    reclaimed = sum(1 for row in candidates if row.claimed_by is not None)
+    if reclaimed:
+        logger.info("Reclaimed %s scheduled jobs with expired leases", reclaimed)
+    return job_ids, token
+
+
+def renew_lease(token, job_ids, lease_seconds=LEASE_SECONDS):
+    """Extend the lease on claimed jobs that are still pending, returns how many were renewed"""
+    if not job_ids:
+        return 0
+    renewed = ScheduledContent.query.filter(
+        ScheduledContent.id.in_(job_ids),
+        ScheduledContent.claimed_by == token,
+        ScheduledContent.is_executed == False
+    ).update(
+        {ScheduledContent.lease_until: datetime.utcnow() + timedelta(seconds=lease_seconds)},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return renewed
+
+
+def run_due_jobs(now=None, batch_size=BATCH_SIZE, worker_id=None, claim_size=CLAIM_SIZE,
+                 lease_seconds=LEASE_SECONDS):
+    """Claim and execute every job due by now, one batch per transaction
+
+    Safe to run from any number of processes and nodes at once: each job is
+    executed by the single worker holding its lease, and the lease on the
+    rest of a claim is renewed after every committed batch.
+    """
+    now = now or datetime.utcnow()
+    worker_id = worker_id or make_worker_id()
+    processed = 0
+    while True:
+        job_ids, token = claim_jobs(worker_id, now, claim_size, lease_seconds)
+        if token is None:
+            return processed
+
+        for offset in range(0, len(job_ids), batch_size):
+            batch_ids = job_ids[offset:offset + batch_size]
+            jobs = ScheduledContent.query.filter(
+                ScheduledContent.id.in_(batch_ids)
+            ).order_by(ScheduledContent.scheduled_time, ScheduledContent.id).all()
+            try:
+                applied = apply_jobs(jobs, worker_id=token)
+            except Exception:
+                db.session.rollback()
+                raise
+            if applied is None:
+                break
+            processed += len(jobs)
+            renew_lease(token, job_ids[offset + batch_size:], lease_seconds)
+
+
+class Scheduler:
+    """Background worker that sleeps until the next scheduled job is due
+
+    Upcoming jobs within the horizon are kept in a min-heap of
+    (scheduled_time, id). The heap is reloaded from the due-range index at
+    least every refresh seconds, which picks up jobs created by other
+    processes (the web workers); jobs created in this process wake the
+    worker immediately via notify().
+    """
+
+    def __init__(self, app, horizon=300, batch_size=BATCH_SIZE, refresh=30):
+        self.app = app
+        self.horizon = horizon
+        self.refresh = refresh
+        self.batch_size = batch_size
+        self.worker_id = make_worker_id()
+        self._heap = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name='linkak-scheduler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def notify(self, scheduled_time, job_id=None):
+        """Tell the worker about a new or changed job"""
+        with self._lock:
+            heapq.heappush(self._heap, (scheduled_time, job_id or 0))
+        self._wake.set()
+
+    def _reload(self, now):
+        upcoming = ScheduledContent.query.with_entities(
+            ScheduledContent.scheduled_time, ScheduledContent.id
+        ).filter(
+            ScheduledContent.is_executed == False,
+            ScheduledContent.scheduled_time > now,
+            ScheduledContent.scheduled_time <= now + timedelta(seconds=self.horizon)
+        ).order_by(ScheduledContent.scheduled_time).limit(self.batch_size).all()
+        heap = [tuple(row) for row in upcoming]
+        heapq.heapify(heap)
+        with self._lock:
+            self._heap = heap
+
+    def _seconds_until_next(self, now):
+        # Entries already due are left for the next run, which reloads the heap
+        with self._lock:
+            if not self._heap:
+                return self.refresh
+            return max(0, min(self.refresh, (self._heap[0][0] - now).total_seconds()))
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            now = datetime.utcnow()
+            with self.app.app_context():
+                try:
+                    run_due_jobs(now, self.batch_size, worker_id=self.worker_id)
+                    self._reload(now)
+                except Exception:
+                    logger.exception("Scheduled content run failed")
+                finally:
+                    db.session.remove()
+            self._wake.wait(self._seconds_until_next(datetime.utcnow()))
+
+
+_scheduler = None
+
+
+def start_scheduler(app, horizon=300, refresh=30):
+    """Start the scheduled content worker for this process"""
+    global _scheduler
+    _scheduler = Scheduler(app, horizon=horizon, refresh=refresh).start()
+    return _scheduler
+
+
+def notify_scheduler(scheduled_time, job_id=None):
+    """Wake this process's scheduler, if one is running, about a new job
+
+    Web workers have none: the flask run-workers process finds their jobs
+    on its next refresh.
+    """
+    if _scheduler is not None:
+        _scheduler.notify(scheduled_time, job_id)
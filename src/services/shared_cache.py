@@ -0,0 +1,333 @@
+from src.services.cache import LRUBackend
+from collections import OrderedDict
+from src.services.metrics import record_cache
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Two-tier caching for multi-process, multi-node deployments. Each process
+# keeps its LRUBackend in front of a shared Redis-protocol server. Deletes,
+# version bumps and clears are published on a pub/sub channel, and every
+# process applies them to its own in-process tier as they arrive, so a
+# write on one node retires stale entries everywhere within milliseconds.
+# While the subscription is down the in-process tier is bypassed, and
+# after (re)subscribing it is emptied, because messages may have been
+# missed in between.
+
+
+class RedisBackend:
+    """Cache backend on a Redis-protocol server, with values pickled
+
+    Use it on its own as RESULT_CACHE_BACKEND, or as the shared tier of a
+    TieredBackend. Server errors are logged and handled as cache misses, so
+    an unavailable cache server slows requests down but doesn't fail them.
+    Only point it at a trusted server: cached values are unpickled.
+    """
+
+    def __init__(self, url='redis://localhost:6379/0', prefix='linkak:', ttl=None, client=None):
+        import redis  # Only needed when a shared cache is configured
+
+        self.errors = redis.RedisError
+        self.client = client or redis.Redis.from_url(
+            url, socket_timeout=0.5, socket_connect_timeout=0.5, health_check_interval=30
+        )
+        self.prefix = prefix
+        self.ttl = ttl
+        self._warned_at = 0
+
+    def _failed(self, operation, error):
+        # At most one warning every 10 seconds while the server is unreachable
+        if time.monotonic() - self._warned_at > 10:
+            self._warned_at = time.monotonic()
+            logger.warning("Shared cache %s failed: %s", operation, error)
+
+    def get(self, key):
+        try:
+            raw = self.client.get(f"{self.prefix}{key}")
+        except self.errors as e:
+            self._failed('get', e)
+            return None
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        try:
+            self.client.set(f"{self.prefix}{key}", pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ex=ttl or self.ttl)
+        except self.errors as e:
+            self._failed('set', e)
+
+    def delete(self, key):
+        try:
+            self.client.delete(f"{self.prefix}{key}")
+        except self.errors as e:
+            self._failed('delete', e)
+
+    def incr(self, key):
+        """New counter value, or None if the server couldn't be reached"""
+        try:
+            return self.client.incr(f"{self.prefix}{key}")
+        except self.errors as e:
+            self._failed('incr', e)
+            return None
+
+    def get_counter(self, key):
+        """Counter value, or None if the server couldn't be reached"""
+        try:
+            return int(self.client.get(f"{self.prefix}{key}") or 0)
+        except self.errors as e:
+            self._failed('get_counter', e)
+            return None
+
+    def clear(self, namespace=''):
+        """Delete every key under the prefix (and namespace)"""
+        try:
+            keys = list(self.client.scan_iter(match=f"{self.prefix}{namespace}*", count=1000))
+            for offset in range(0, len(keys), 1000):
+                self.client.delete(*keys[offset:offset + 1000])
+        except self.errors as e:
+            self._failed('clear', e)
+
+
+class InvalidationBus:
+    """Fans invalidations out to the in-process tiers of every process through pub/sub"""
+
+    def __init__(self, client, channel):
+        self.client = client
+        self.channel = channel
+        self.connected = False
+        self._tiers = {}
+        self._pid = None
+        self._source = None
+        self._lock = threading.Lock()
+
+    def register(self, tier):
+        self._tiers[tier.namespace] = tier
+
+    def ensure_listening(self):
+        """Start the subscriber thread in this process (again after a fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._source = uuid.uuid4().hex
+            self.connected = False
+            threading.Thread(target=self._listen, daemon=True, name='linkak-cache-invalidation').start()
+
+    def publish(self, namespace, operation, key=None, value=None):
+        self.ensure_listening()
+        message = json.dumps({'s': self._source, 'n': namespace, 'o': operation, 'k': key, 'v': value})
+        try:
+            self.client.publish(self.channel, message)
+        except Exception:
+            logger.warning("Could not publish cache invalidation", exc_info=True)
+
+    def _listen(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            pubsub = self.client.pubsub()
+            try:
+                pubsub.subscribe(self.channel)
+                while self._pid == pid:
+                    # Polled rather than listen(), which would trip the client's socket timeout
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    if message['type'] == 'subscribe':
+                        # Anything cached before now may have missed invalidations
+                        self._clear_local()
+                        self.connected = True
+                    elif message['type'] == 'message':
+                        self._apply(message['data'])
+            except Exception:
+                logger.warning("Cache invalidation subscription lost, retrying", exc_info=True)
+            finally:
+                self.connected = False
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+            time.sleep(1)
+
+    def _apply(self, data):
+        message = json.loads(data)
+        if message['s'] == self._source:
+            return  # Already applied locally
+        tier = self._tiers.get(message['n'])
+        if tier is not None:
+            tier.apply(message['o'], message['k'], message['v'])
+
+    def _clear_local(self):
+        for tier in list(self._tiers.values()):
+            tier.apply('clear', None, None)
+
+
+class TieredBackend:
+    """In-process LRU in front of a shared RedisBackend, kept coherent through an InvalidationBus
+
+    Keys must be strings or integers. Entries are read from the local tier,
+    then from the shared one. Version counters are cached locally for up to
+    counter_ttl seconds; bumps made in other processes arrive through the
+    bus before that. At most max_counters of them are kept; the others are
+    read from the server again.
+
+    Deletes are numbered as they are applied. A value fetched from the
+    server only fills the local tier if no delete of its key (or clear)
+    was applied during the fetch, so a delete can't be undone by a read
+    that was already in flight.
+    """
+
+    def __init__(self, shared, bus, namespace, maxsize=1024, ttl=None, local_ttl=30, counter_ttl=5,
+                 max_counters=65536):
+        self.shared = shared
+        self.bus = bus
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local_ttl = min(ttl, local_ttl) if ttl else local_ttl
+        self.local = LRUBackend(maxsize=maxsize, ttl=self.local_ttl)
+        self.counter_ttl = counter_ttl
+        self.max_counters = max_counters
+        self._counters = OrderedDict()
+        # Key -> number of its last delete; forgotten keys count as deleted at _deleted_floor
+        self._deletes = 0
+        self._deleted = OrderedDict()
+        self._deleted_floor = 0
+        self._lock = threading.Lock()
+        bus.register(self)
+
+    def _key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def get_local(self, key):
+        """The in-process tier only; never waits for the network"""
+        self.bus.ensure_listening()
+        if not self.bus.connected:
+            return None
+        return self.local.get(key)
+
+    def _last_delete(self, key):
+        with self._lock:
+            return self._deleted.get(key, self._deleted_floor)
+
+    def _forget_local(self, key):
+        """Delete a key from the local tier, numbering the delete"""
+        with self._lock:
+            self._deletes += 1
+            self._deleted[key] = self._deletes
+            self._deleted.move_to_end(key)
+            while len(self._deleted) > self.local.maxsize:
+                _, number = self._deleted.popitem(last=False)
+                self._deleted_floor = max(self._deleted_floor, number)
+        self.local.delete(key)
+
+    def get(self, key):
+        value = self.get_local(key)
+        if value is not None:
+            return value
+        last_delete = self._last_delete(key)
+        value = self.shared.get(self._key(key))
+        record_cache(f"shared.{self.namespace}", value is not None)
+        # Skip the local copy if the key was deleted while the server was asked
+        if value is not None and self._last_delete(key) == last_delete:
+            self.local.set(key, value)
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.local.set(key, value, min(ttl, self.local_ttl) if ttl else None)
+        self.shared.set(self._key(key), value, ttl or self.ttl)
+
+    def delete(self, key):
+        self._forget_local(key)
+        self.shared.delete(self._key(key))
+        self.bus.publish(self.namespace, 'del', key)
+
+    def incr(self, key):
+        value = self.shared.incr(self._key(key))
+        if value is None:
+            # Shared server unreachable: forget everything this process cached instead
+            self.apply('clear', None, None)
+            return None
+        self._remember_counter(key, value, latest=True)
+        self.bus.publish(self.namespace, 'ver', key, value)
+        return value
+
+    def get_local_counter(self, key):
+        """Counter from the in-process tier, or None if it has to be read from the server"""
+        self.bus.ensure_listening()
+        with self._lock:
+            cached = self._counters.get(key)
+        if cached is not None and self.bus.connected and time.monotonic() - cached[1] < self.counter_ttl:
+            return cached[0]
+        return None
+
+    def get_counter(self, key):
+        value = self.get_local_counter(key)
+        if value is not None:
+            return value
+        with self._lock:
+            cached = self._counters.get(key)
+        value = self.shared.get_counter(self._key(key))
+        if value is None:
+            return cached[0] if cached is not None else 0
+        self._remember_counter(key, value)
+        with self._lock:
+            cached = self._counters.get(key)
+        return cached[0] if cached is not None else value
+
+    def _remember_counter(self, key, value, latest=False):
+        """Cache a counter value; latest for values this process just wrote"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._counters.get(key)
+            # Counters only grow, so a smaller value is an older one (a read
+            # that raced a bump message) unless the cached value has expired,
+            # e.g. after the server lost its data
+            if latest or cached is None or value >= cached[0] or now - cached[1] >= self.counter_ttl:
+                self._counters[key] = (value, now)
+                self._counters.move_to_end(key)
+                while len(self._counters) > self.max_counters:
+                    self._counters.popitem(last=False)
+
+    def clear(self):
+        self.apply('clear', None, None)
+        self.shared.clear(f"{self.namespace}:")
+        self.bus.publish(self.namespace, 'clear')
+
+    def apply(self, operation, key, value):
+        """Apply an invalidation to the in-process tier"""
+        if operation == 'del':
+            self._forget_local(key)
+        elif operation == 'ver':
+            self._remember_counter(key, value)
+        elif operation == 'clear':
+            with self._lock:
+                self._counters.clear()
+                self._deletes += 1
+                self._deleted.clear()
+                self._deleted_floor = self._deletes
+            self.local.clear()
+
+    def __len__(self):
+        return len(self.local)
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def tiered_backend(url, namespace, maxsize=1024, ttl=None, local_ttl=30, prefix='linkak:',
+                   channel='linkak:cache-invalidation'):
+    """TieredBackend for a namespace; all namespaces of a URL share one client and bus"""
+    with _shared_lock:
+        entry = _shared.get(url)
+        if entry is None:
+            shared = RedisBackend(url, prefix=prefix)
+            entry = _shared[url] = (shared, InvalidationBus(shared.client, channel))
+    shared, bus = entry
+    return TieredBackend(shared, bus, namespace, maxsize=maxsize, ttl=ttl, local_ttl=local_ttl)
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# What a gunicorn worker does on boot: import the app module and build the app.
+# Prints the two phases so they can be reported separately.
+BOOT_SCRIPT = (
+    "import time; started = time.perf_counter()\n"
+    "from src.main import create_app\n"
+    "imported = time.perf_counter(); create_app()\n"
+    "print(imported - started, time.perf_counter() - imported)\n"
+)
+
+
+def parse_importtime(output):
+    """[(module, self_us, cumulative_us)] from python -X importtime output"""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # Header line
+        modules.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    return modules
+
+
+def startup_report(top=15):
+    """Cold start of a fresh interpreter importing and creating the app
+
+    Returns total/import/create_app times in milliseconds, the heaviest
+    packages (self time summed per top-level package) and the heaviest
+    single modules.
+    """
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT],
+        cwd=ROOT, env=dict(os.environ, PYTHONPATH=ROOT),
+        capture_output=True, text=True
+    )
+    total = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'startup failed')
+
+    import_seconds, create_seconds = (float(value) for value in result.stdout.split()[-2:])
+    modules = parse_importtime(result.stderr)
+
+    packages = {}
+    for name, self_us, _ in modules:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+
+    return {
+        'total_ms': round(total * 1000, 1),
+        'import_ms': round(import_seconds * 1000, 1),
+        'create_app_ms': round(create_seconds * 1000, 1),
+        'packages': sorted(((name, round(us / 1000, 1)) for name, us in packages.items()),
+                           key=lambda item: item[1], reverse=True)[:top],
+        'modules': sorted(((name, round(self_us / 1000, 1)) for name, self_us, _ in modules),
+                          key=lambda item: item[1], reverse=True)[:top],
+    }
@@ -0,0 +1,141 @@
+from flask import current_app
+from werkzeug.utils import secure_filename
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+# Blobs live under static/uploads/blobs/<first two hex chars>/<sha256><ext>
+BLOB_SUBDIR = os.path.join('uploads', 'blobs')
+CHUNK_SIZE = 64 * 1024
+TEMP_PREFIX = '.upload-'
+
+# Matches the content hash in a public blob path or variant path
+BLOB_DIGEST_RE = re.compile(r'/uploads/blobs/[0-9a-f]{2}/([0-9a-f]{64})')
+
+
+def blob_root(static_root=None):
+    """Absolute directory holding content-addressed blobs"""
+    return os.path.join(static_root or current_app.static_folder, BLOB_SUBDIR)
+
+
+def _extension(filename):
+    """Normalized, safe file extension taken from the client filename"""
+    extension = os.path.splitext(secure_filename(filename or ''))[1].lower()
+    if extension == '.jpg':
+        extension = '.jpeg'
+    return extension if re.fullmatch(r'\.[a-z0-9]{1,8}', extension) else ''
+
+
+def store_upload(file_storage):
+    """Stream an upload to disk while hashing it, returns (disk path, public path)
+
+    Identical content always maps to the same path, so re-uploading a file
+    that is already stored just reuses the existing blob.
+    """
+    root = blob_root()
+    os.makedirs(root, exist_ok=True)
+
+    hasher = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=root, prefix=TEMP_PREFIX)
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            while True:
+                chunk = file_storage.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                temp_file.write(chunk)
+
+        digest = hasher.hexdigest()
+        relative = f"{digest[:2]}/{digest}{_extension(file_storage.filename)}"
+        final_path = os.path.join(root, relative)
+
+        if os.path.exists(final_path):
+            # Duplicate content: keep the existing blob and refresh its mtime
+            # so an in-progress sweep treats it as recently used
+            os.remove(temp_path)
+            os.utime(final_path)
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(temp_path, final_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return final_path, f"/static/uploads/blobs/{relative}"
+
+
+def digests_in(value):
+    """Extract every blob digest referenced by a path or JSON variants string"""
+    if not value:
+        return set()
+    return set(BLOB_DIGEST_RE.findall(value))
+
+
+def referenced_digests():
+    """Mark phase: collect the digests of every blob still referenced by a model"""
+    from src.models.user import User
+    from src.models.menu import Menu, MenuItem
+
+    columns = (
+        (User, User.profile_image),
+        (User, User.profile_image_variants),
+        (Menu, Menu.business_logo),
+        (MenuItem, MenuItem.image),
+        (MenuItem, MenuItem.image_variants),
+    )
+
+    marked = set()
+    for model, column in columns:
+        rows = model.query.with_entities(column).filter(column.isnot(None)).yield_per(1000)
+        for (value,) in rows:
+            marked.update(digests_in(value))
+    return marked
+
+
+def collect_garbage(grace_seconds=3600, dry_run=False):
+    """Mark-and-sweep unreferenced blobs (and their variants) from upload storage
+
+    Files younger than grace_seconds are never removed, so uploads that have
+    been written but not yet committed to a row survive the sweep.
+    """
+    root = blob_root()
+    stats = {'scanned': 0, 'removed': 0, 'bytes_freed': 0}
+    if not os.path.isdir(root):
+        return stats
+
+    marked = referenced_digests()
+    cutoff = time.time() - grace_seconds
+
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            stats['scanned'] += 1
+
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+
+            if stat.st_mtime > cutoff:
+                continue
+
+            # Leftover temp files from crashed uploads are always garbage
+            if not filename.startswith(TEMP_PREFIX) and filename[:64] in marked:
+                continue
+
+            stats['removed'] += 1
+            stats['bytes_freed'] += stat.st_size
+            if not dry_run:
+                try:
+                    os.remove(path)
+                except OSError:
+                    logger.warning("Could not remove orphaned upload %s", path)
+
+    return stats
@@ -0,0 +1,121 @@
+from flask import current_app, g
+from src.models.user import APIToken, db
+from src.services.cache import result_cache
+from src.services.identity import load_identity
+from datetime import datetime, timedelta
+import calendar
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+
+TOKEN_PREFIX = 'lk'
+
+# How long the in-process revocation list is trusted before re-reading it.
+# Revocations in this process (or through a shared result cache backend)
+# take effect immediately.
+REVOCATION_TTL = 30
+
+_revocations = {'version': None, 'loaded_at': 0.0, 'prefixes': frozenset()}
+_revocations_lock = threading.Lock()
+
+
+def _signing_key():
+    secret = current_app.config.get('API_TOKEN_SECRET') or current_app.config['SECRET_KEY']
+    # Derive a dedicated key so tokens can't be confused with other signatures
+    return hmac.new(secret.encode('utf-8'), b'linkak-api-token', hashlib.sha256).digest()
+
+
+def _sign(payload):
+    return hmac.new(_signing_key(), payload.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def issue_token(user_id, name, expires_days=None):
+    """Create an API token, returns (APIToken row, token string)
+
+    Tokens look like lk_<prefix>_<user id>_<expiry epoch or 0>_<signature>;
+    everything needed to authenticate is inside the token, the row only
+    lists and revokes it. The caller commits.
+    """
+    prefix = secrets.token_hex(6)
+    expires_at = datetime.utcnow() + timedelta(days=int(expires_days)) if expires_days else None
+    expires = calendar.timegm(expires_at.timetuple()) if expires_at else 0
+
+    payload = f"{TOKEN_PREFIX}_{prefix}_{user_id}_{expires}"
+    token = APIToken(user_id, name, prefix, expires_at=expires_at)
+    db.session.add(token)
+    return token, f"{payload}_{_sign(payload)}"
+
+
+def parse_token(raw):
+    """(prefix, user id) for a validly signed, unexpired token, else None; no database access"""
+    parts = raw.split('_')
+    if len(parts) != 5 or parts[0] != TOKEN_PREFIX:
+        return None
+    _, prefix, user_id, expires, signature = parts
+
+    payload = f"{TOKEN_PREFIX}_{prefix}_{user_id}_{expires}"
+    if not hmac.compare_digest(_sign(payload), signature):
+        return None
+    if not (user_id.isdigit() and expires.isdigit()):
+        return None
+    if int(expires) and int(expires) < time.time():
+        return None
+    return prefix, int(user_id)
+
+
+def revoked_prefixes():
+    """Cached set of revoked token prefixes, re-read when stale or after a revocation"""
+    version = result_cache.version('api_tokens', 'revoked')
+    with _revocations_lock:
+        fresh = (
+            _revocations['version'] == version and
+            time.monotonic() - _revocations['loaded_at'] < REVOCATION_TTL
+        )
+        if fresh:
+            return _revocations['prefixes']
+
+    now = datetime.utcnow()
+    prefixes = frozenset(
+        row.prefix for row in APIToken.query.with_entities(APIToken.prefix).filter(
+            APIToken.revoked_at.isnot(None),
+            # Expired tokens are rejected by their signed expiry already
+            (APIToken.expires_at.is_(None)) | (APIToken.expires_at > now)
+        )
+    )
+    with _revocations_lock:
+        _revocations.update(version=version, loaded_at=time.monotonic(), prefixes=prefixes)
+    return prefixes
+
+
+def revoke_token(token):
+    """Revoke a token (the caller commits, then calls revocations_changed)"""
+    token.revoked_at = datetime.utcnow()
+
+
+def revocations_changed():
+    """Make every process reload the revocation list"""
+    result_cache.bump('api_tokens', 'revoked')
+
+
+def load_user_from_token(request):
+    """flask-login request loader for API calls with an Authorization: Bearer token"""
+    if not request.path.startswith('/api/'):
+        return None
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return None
+
+    parsed = parse_token(header[7:].strip())
+    if parsed is None:
+        return None
+    prefix, user_id = parsed
+    if prefix in revoked_prefixes():
+        return None
+
+    user = load_identity(user_id)
+    if user is None or not user.is_active:
+        return None
+    g.api_token_prefix = prefix
+    return user
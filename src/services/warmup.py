@@ -0,0 +1,38 @@
+from src.extensions import db
+from src.services.redirects import warm_redirect_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def reset_engines(app):
+    """Give a forked worker its own connection pools
+
+    close=False drops the pools inherited from the parent without closing
+    their sockets, which the parent may still own.
+    """
+    binds = [None] + list(app.config.get('SQLALCHEMY_BINDS') or {})
+    with app.app_context():
+        for bind in binds:
+            db.get_engine(app, bind=bind).dispose(close=False)
+
+
+def precompile_templates(app):
+    """Compile every Jinja template into the environment's cache, returns how many"""
+    compiled = 0
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        try:
+            app.jinja_env.get_template(name)
+            compiled += 1
+        except Exception:
+            logger.exception("Could not compile template %s", name)
+    return compiled
+
+
+def warm_worker(app):
+    """Prepare a freshly forked worker before it takes traffic"""
+    reset_engines(app)
+    templates = precompile_templates(app)
+    with app.app_context():
+        redirects = warm_redirect_cache(limit=app.config.get('WARMUP_REDIRECTS', 1000))
+    return {'redirects': redirects, 'templates': templates}
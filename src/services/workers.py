@@ -0,0 +1,73 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import logging
+import multiprocessing
+import threading
+
+logger = logging.getLogger(__name__)
+
+_executors = {}
+_lock = threading.Lock()
+
+
+def get_executor(name, max_workers=2):
+    """Get (or lazily create) a named background thread pool"""
+    with _lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"linkak-{name}")
+            _executors[name] = executor
+        return executor
+
+
+def get_process_pool(name, max_workers=None):
+    """Get (or lazily create) a named process pool for CPU-bound, picklable work
+
+    Processes are spawned rather than forked so they never inherit the
+    parent's threads, locks or database connections.
+    """
+    with _lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+            _executors[name] = executor
+        return executor
+
+
+def submit(name, app, func, *args, max_workers=2, **kwargs):
+    """Run func(*args, **kwargs) inside an app context on a named pool"""
+    def run():
+        with app.app_context():
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                logger.exception("Background job %s failed", getattr(func, '__name__', func))
+                raise
+
+    return get_executor(name, max_workers).submit(run)
+
+
+def start_periodic(name, app, func, interval, **kwargs):
+    """Run func(**kwargs) every interval seconds on a daemon thread, returns a stop event"""
+    stop_event = threading.Event()
+
+    def loop():
+        while not stop_event.is_set():
+            with app.app_context():
+                try:
+                    func(**kwargs)
+                except Exception:
+                    logger.exception("Periodic job %s failed", name)
+            stop_event.wait(interval)
+
+    thread = threading.Thread(target=loop, name=f"linkak-{name}", daemon=True)
+    thread.start()
+    return stop_event
+
+
+def shutdown(wait=True):
+    """Shut down every background pool (used by tests and worker exit hooks)"""
+    with _lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait)
@@ -0,0 +1,11 @@
+"""Production WSGI entry point
+
+    gunicorn -c gunicorn.conf.py src.wsgi:app
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.main import create_app
+
+app = create_app()